@@ -0,0 +1,47 @@
+from typing import Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    # Database
+    database_url: str = "sqlite:///./event_booking.db"
+    async_database_url: Optional[str] = None  # defaults to database_url with the aiosqlite/asyncpg driver
+    db_echo: bool = False
+    create_schema_on_startup: bool = False  # prefer running `python -m app.seed` once
+    # Connection pool (server databases such as PostgreSQL)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout_seconds: float = 30
+    db_pool_recycle_seconds: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int = 5000
+    db_write_concurrency: Optional[int] = None  # async booking commits in flight; default 1 on SQLite, db_pool_size otherwise
+    # SQLite pragmas
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+
+    # Background jobs (app/services/jobs.py); every worker process runs the scheduler
+    background_jobs_enabled: bool = True
+
+    # Waiting room defaults for POST /organizer/events/{id}/waiting-room
+    waiting_room_admit_rate: float = 20.0  # customers per second
+    waiting_room_token_ttl_seconds: float = 120.0
+
+    # Request metrics (GET /metrics)
+    metrics_enabled: bool = True
+    slow_query_log_ms: Optional[float] = None  # log statements slower than this, with their parameters
+
+    # Password hashing
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_nice: int = 10  # run workers at lower CPU priority than request handling
+    password_hash_queue_limit: int = 16  # waiting jobs allowed on top of the busy workers
+    password_hash_retry_after_seconds: int = 1
+
+
+settings = Settings()
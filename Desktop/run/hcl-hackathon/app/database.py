@@ -1,19 +1,123 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from app.config import settings
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./event_booking.db"
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside the booking writer instead of failing with
+    # "database is locked"; busy_timeout makes writers wait rather than error out.
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    cursor.close()
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+def _sqlite_pool_args(url):
+    # File databases use a QueuePool; size it from settings like a server DB so
+    # concurrent requests are not capped at SQLAlchemy's default 5 + 10.
+    if url.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+    }
+
+def build_engine(database_url: str = None):
+    url = make_url(database_url or settings.database_url)
+    if url.get_backend_name() == "sqlite":
+        engine = create_engine(
+            url,
+            echo=settings.db_echo,
+            connect_args={"check_same_thread": False, "timeout": settings.sqlite_busy_timeout_ms / 1000},
+            **_sqlite_pool_args(url),
+        )
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+        return engine
+
+    connect_args = {}
+    if url.get_backend_name() == "postgresql":
+        connect_args["options"] = f"-c statement_timeout={int(settings.db_statement_timeout_ms)}"
+    return create_engine(
+        url,
+        echo=settings.db_echo,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=connect_args,
+    )
+
+# Async drivers for the request path; the sync engine stays for scripts and startup work.
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+def async_url(database_url: str = None):
+    if settings.async_database_url and database_url is None:
+        return make_url(settings.async_database_url)
+    url = make_url(database_url or settings.database_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver and url.get_driver_name() != driver:
+        url = url.set(drivername=f"{url.get_backend_name()}+{driver}")
+    return url
+
+def build_async_engine(database_url: str = None):
+    url = async_url(database_url)
+    if url.get_backend_name() == "sqlite":
+        engine = create_async_engine(
+            url,
+            echo=settings.db_echo,
+            connect_args={"timeout": settings.sqlite_busy_timeout_ms / 1000},
+            **_sqlite_pool_args(url),
+        )
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+        return engine
+
+    connect_args = {}
+    if url.get_driver_name() == "asyncpg":
+        connect_args["server_settings"] = {"statement_timeout": str(int(settings.db_statement_timeout_ms))}
+    return create_async_engine(
+        url,
+        echo=settings.db_echo,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=connect_args,
+    )
+
+SQLALCHEMY_DATABASE_URL = settings.database_url
+
+engine = build_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = build_async_engine()
+# expire_on_commit=False: handlers return ORM objects after commit and async
+# sessions cannot lazy-load the expired attributes during serialization.
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
+def init_db(bind=None):
+    # Explicit schema creation step (seed script, app startup when enabled, benchmarks).
+    from app.models import models  # noqa: F401  registers the tables on Base.metadata
+    from app.migrations import ensure_columns, ensure_indexes, ensure_search_index
+    Base.metadata.create_all(bind=bind or engine)
+    ensure_columns(bind or engine)
+    ensure_indexes(bind or engine)
+    ensure_search_index(bind or engine)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,12 +1,45 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.database import engine, Base
+from fastapi.responses import PlainTextResponse
+from app.config import settings
+from app.database import SessionLocal, async_engine, engine, init_db
 from app.routers import auth, admin, organizer, customer, entry_manager, support
-from app.models import models
+from app.services.seat_availability import seat_availability
+from app.services.event_search import facet_index
+from app.services.mass_refund import mass_refunds
+from app.services.jobs import job_runner
+from app.utils.security import shutdown_password_pool
+from app.utils.metrics import InstrumentedRoute, MetricsMiddleware, request_metrics
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.create_schema_on_startup:
+        init_db()
 
-app = FastAPI(title="Online Event Ticket Booking Platform")
+    # Warm the seat availability index for events that are on sale, and the
+    # search facet index.
+    db = SessionLocal()
+    try:
+        seat_availability.rebuild_all(db)
+        facet_index.rebuild(db)
+        # Carry on with mass refunds a restart interrupted.
+        mass_refunds.resume_all(db)
+    finally:
+        db.close()
+    if settings.background_jobs_enabled:
+        job_runner.start()
+    yield
+    job_runner.stop()
+    mass_refunds.shutdown()
+    shutdown_password_pool()
+    await async_engine.dispose()
+
+app = FastAPI(title="Online Event Ticket Booking Platform", lifespan=lifespan)
+app.router.route_class = InstrumentedRoute
+
+request_metrics.configure(settings.metrics_enabled, settings.slow_query_log_ms)
+request_metrics.instrument(engine, async_engine)
+app.add_middleware(MetricsMiddleware)
 
 # Include Routers
 app.include_router(auth.router)
@@ -19,3 +52,8 @@ app.include_router(support.router)
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Online Event Ticket Booking Platform API"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # Prometheus text format, unauthenticated like a usual scrape target.
+    return request_metrics.prometheus()
@@ -0,0 +1,84 @@
+from typing import List
+
+from sqlalchemy import inspect, text
+
+from app.database import Base, engine
+
+# create_all() only builds indexes and columns for tables it creates, so databases
+# created before an index or nullable column was declared need this step. Safe to
+# run repeatedly:
+#   python -m app.migrations
+
+def ensure_columns(bind=None) -> List[str]:
+    from app.models import models  # noqa: F401  registers the tables on Base.metadata
+    bind = bind or engine
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            if not column.nullable:
+                raise RuntimeError(f"Cannot add NOT NULL column {table.name}.{column.name} automatically")
+            column_type = column.type.compile(dialect=bind.dialect)
+            with bind.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            added.append(f"{table.name}.{column.name}")
+    return added
+
+def ensure_indexes(bind=None) -> List[str]:
+    from app.models import models  # noqa: F401  registers the tables on Base.metadata
+    bind = bind or engine
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind)
+                created.append(index.name)
+    if created:
+        # Refresh planner statistics so the new indexes are actually chosen.
+        with bind.begin() as conn:
+            conn.execute(text("ANALYZE"))
+    return created
+
+def ensure_search_index(bind=None) -> bool:
+    # Creates the event full-text index table and fills it from existing events.
+    from sqlalchemy.orm import Session
+    from app.services import event_search
+    bind = bind or engine
+    if not event_search.create_search_table(bind):
+        return False
+    with Session(bind) as db:
+        event_search.rebuild_index(db)
+        db.commit()
+    return True
+
+def backfill_event_counters() -> int:
+    # Events created before event_counters existed get their row computed from live data.
+    from app.database import SessionLocal
+    from app.models.models import Event, EventCounter
+    from app.services.event_counters import rebuild_counters
+    db = SessionLocal()
+    try:
+        missing = [row.id for row in db.query(Event.id).outerjoin(EventCounter, EventCounter.event_id == Event.id).filter(EventCounter.event_id.is_(None))]
+        return rebuild_counters(db, missing)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    from app.database import init_db
+    added = ensure_columns()
+    created = ensure_indexes()
+    init_db()  # creates new tables such as event_counters and the search index
+    print(f"Added columns: {', '.join(added)}" if added else "All columns already exist")
+    print(f"Created indexes: {', '.join(created)}" if created else "All indexes already exist")
+    print(f"Backfilled counters for {backfill_event_counters()} events")
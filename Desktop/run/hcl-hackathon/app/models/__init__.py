@@ -1 +1 @@
-from .models import User, Venue, Event, Seat, Order, Ticket, RefundRequest, SupportCase, EntryLog, UserRole, OrderStatus, TicketStatus, EventStatus, RefundStatus, SupportStatus, SeatStatus
+from .models import User, Venue, Event, EventCounter, Seat, Order, Ticket, RefundRequest, SupportCase, EntryLog, UserRole, OrderStatus, TicketStatus, EventStatus, RefundStatus, SupportStatus, SeatStatus
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Enum, UniqueConstraint
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Enum, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 import datetime
@@ -33,6 +33,11 @@ class RefundStatus(str, enum.Enum):
     APPROVED = "approved"
     REJECTED = "rejected"
 
+class MassRefundStatus(str, enum.Enum):
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
 class SupportStatus(str, enum.Enum):
     OPEN = "open"
     IN_PROGRESS = "in_progress"
@@ -72,12 +77,28 @@ class Event(Base):
     ticket_price = Column(Float)
     max_tickets_per_user = Column(Integer)
     status = Column(String, default=EventStatus.UPCOMING)
-    venue_id = Column(Integer, ForeignKey("venues.id"))
+    venue_id = Column(Integer, ForeignKey("venues.id"), index=True)
+
+    __table_args__ = (
+        # (status, rowid) order matches the id-keyset pagination of the catalogue.
+        Index("ix_events_status", "status"),
+    )
 
     venue = relationship("Venue", back_populates="events")
     seats = relationship("Seat", back_populates="event")
     orders = relationship("Order", back_populates="event")
 
+class EventCounter(Base):
+    # Denormalized per-event totals, updated in the same transaction as the
+    # bookings/refunds/seat changes they summarize.
+    __tablename__ = "event_counters"
+    event_id = Column(Integer, ForeignKey("events.id"), primary_key=True)
+    seats_total = Column(Integer, default=0, nullable=False)
+    seats_booked = Column(Integer, default=0, nullable=False)
+    confirmed_revenue = Column(Float, default=0.0, nullable=False)
+    refunds_approved = Column(Integer, default=0, nullable=False)
+    refunded_amount = Column(Float, default=0.0, nullable=False)
+
 class Seat(Base):
     __tablename__ = "seats"
     id = Column(Integer, primary_key=True, index=True)
@@ -85,6 +106,11 @@ class Seat(Base):
     seat_number = Column(String)
     status = Column(String, default=SeatStatus.AVAILABLE)
 
+    __table_args__ = (
+        # Serves per-event seat lists/counts and the available-seats filter.
+        Index("ix_seats_event_id_status", "event_id", "status"),
+    )
+
     event = relationship("Event", back_populates="seats")
     ticket = relationship("Ticket", back_populates="seat", uselist=False)
 
@@ -97,6 +123,15 @@ class Order(Base):
     payment_mode = Column(String)
     order_status = Column(String, default=OrderStatus.PENDING)
     booking_time = Column(DateTime, default=datetime.datetime.utcnow)
+    idempotency_key = Column(String, nullable=True) # client Idempotency-Key header, if sent
+
+    __table_args__ = (
+        Index("ix_orders_user_id_event_id", "user_id", "event_id"),
+        Index("ix_orders_event_id_order_status", "event_id", "order_status"),
+        Index("ux_orders_user_id_idempotency_key", "user_id", "idempotency_key", unique=True),
+        # Pending-order expiry sweep (app/services/jobs.py).
+        Index("ix_orders_order_status_booking_time", "order_status", "booking_time"),
+    )
 
     customer = relationship("User", back_populates="orders")
     event = relationship("Event", back_populates="orders")
@@ -106,8 +141,8 @@ class Order(Base):
 class Ticket(Base):
     __tablename__ = "tickets"
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"))
-    seat_id = Column(Integer, ForeignKey("seats.id"))
+    order_id = Column(Integer, ForeignKey("orders.id"), index=True)
+    seat_id = Column(Integer, ForeignKey("seats.id"), index=True)
     ticket_code = Column(String, unique=True, default=lambda: str(uuid.uuid4()))
     status = Column(String, default=TicketStatus.ACTIVE)
     generated_at = Column(DateTime, default=datetime.datetime.utcnow)
@@ -119,17 +154,35 @@ class Ticket(Base):
 class RefundRequest(Base):
     __tablename__ = "refund_requests"
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"))
+    order_id = Column(Integer, ForeignKey("orders.id"), index=True)
     reason = Column(String)
     status = Column(String, default=RefundStatus.PENDING)
     resolution_note = Column(String, nullable=True)
 
     order = relationship("Order", back_populates="refund_request")
 
+class MassRefundJob(Base):
+    # Event-wide refund after a cancellation, one row per event. Progress is
+    # committed with each chunk, so a restarted worker carries on after last_order_id.
+    __tablename__ = "mass_refund_jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(Integer, ForeignKey("events.id"), unique=True)
+    status = Column(String, default=MassRefundStatus.RUNNING)
+    resolution_note = Column(String, nullable=True) # set on refund requests the job approves
+    orders_total = Column(Integer, default=0)
+    orders_refunded = Column(Integer, default=0)
+    tickets_cancelled = Column(Integer, default=0)
+    refunded_amount = Column(Float, default=0.0)
+    last_order_id = Column(Integer, default=0)
+    error = Column(String, nullable=True)
+    started_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
 class SupportCase(Base):
     __tablename__ = "support_cases"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     subject = Column(String)
     description = Column(String)
     status = Column(String, default=SupportStatus.OPEN)
@@ -140,9 +193,59 @@ class SupportCase(Base):
 class EntryLog(Base):
     __tablename__ = "entry_logs"
     id = Column(Integer, primary_key=True, index=True)
-    ticket_id = Column(Integer, ForeignKey("tickets.id"))
+    ticket_id = Column(Integer, ForeignKey("tickets.id"), index=True)
     validated_by = Column(Integer, ForeignKey("users.id"))
-    validation_time = Column(DateTime, default=datetime.datetime.utcnow)
+    validation_time = Column(DateTime, default=datetime.datetime.utcnow, index=True) # archive_entry_logs cutoff
     status = Column(String) # valid/invalid
 
     ticket = relationship("Ticket", back_populates="entry_log")
+
+class EntryLogArchive(Base):
+    # Entry logs older than the retention window, moved here in batches by the
+    # archive_entry_logs job so entry_logs stays small.
+    __tablename__ = "entry_logs_archive"
+    id = Column(Integer, primary_key=True) # same id as in entry_logs
+    ticket_id = Column(Integer, index=True)
+    validated_by = Column(Integer)
+    validation_time = Column(DateTime)
+    status = Column(String)
+    archived_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class Job(Base):
+    # Periodic background jobs (app/services/jobs.py), one row per job. A worker
+    # runs a job only while it holds the lease, so with several processes each
+    # run happens once.
+    __tablename__ = "jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True)
+    interval_seconds = Column(Float)
+    next_run_at = Column(DateTime)
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    runs = Column(Integer, default=0)
+    last_started_at = Column(DateTime, nullable=True)
+    last_finished_at = Column(DateTime, nullable=True)
+    last_result = Column(String, nullable=True) # JSON returned by the job
+    last_error = Column(String, nullable=True)
+
+class ChangeLogEntry(Base):
+    # Append-only outbox of order, ticket, refund and event changes, written in
+    # the same transaction as the change itself (app/services/change_log.py).
+    # The id is the sequence number consumers read by; AUTOINCREMENT so SQLite
+    # never hands out an id again after pruning.
+    __tablename__ = "change_log"
+    __table_args__ = {"sqlite_autoincrement": True}
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    topic = Column(String) # e.g. order.confirmed, ticket.used, refund.approved
+    entity_id = Column(Integer)
+    event_id = Column(Integer, nullable=True)
+    payload = Column(String) # JSON
+
+class ChangeLogConsumer(Base):
+    # Checkpoint per downstream consumer: every entry up to `position` is processed.
+    __tablename__ = "change_log_consumers"
+    name = Column(String, primary_key=True)
+    position = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
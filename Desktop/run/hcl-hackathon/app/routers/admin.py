@@ -1,40 +1,134 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.models.models import Venue, Event, UserRole, EventStatus
-from app.schemas.schemas import VenueCreate, VenueResponse, EventCreate, EventResponse, EventUpdateStatus
+from app.schemas.schemas import VenueCreate, VenueResponse, EventCreate, EventResponse, EventUpdateStatus, MassRefundCreate, MassRefundResponse, JobResponse, ChangeLogBatch, ChangeLogAck, ChangeLogConsumerResponse
 from app.utils.deps import RoleChecker
+from app.utils.metrics import InstrumentedRoute
+from app.services import change_log, event_counters, event_search
+from app.utils.catalogue_cache import catalogue_cache
+from app.utils.user_cache import user_cache
+from app.services.idempotency import idempotency_store
+from app.services.mass_refund import mass_refunds
+from app.services.seat_stream import seat_feed
+from app.services.jobs import job_runner
+from app.utils.metrics import request_metrics
 
-router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(RoleChecker([UserRole.ADMIN]))])
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(RoleChecker([UserRole.ADMIN]))], route_class=InstrumentedRoute)
 
 @router.post("/venues", response_model=VenueResponse)
-def add_venue(venue_in: VenueCreate, db: Session = Depends(get_db)):
+async def add_venue(venue_in: VenueCreate, db: AsyncSession = Depends(get_async_db)):
     db_venue = Venue(**venue_in.dict())
     db.add(db_venue)
-    db.commit()
-    db.refresh(db_venue)
+    await db.commit()
+    await db.refresh(db_venue)
     return db_venue
 
 @router.post("/events", response_model=EventResponse)
-def add_event(event_in: EventCreate, db: Session = Depends(get_db)):
+async def add_event(event_in: EventCreate, db: AsyncSession = Depends(get_async_db)):
     # Check if venue exists
-    venue = db.query(Venue).get(event_in.venue_id)
+    venue = await db.get(Venue, event_in.venue_id)
     if not venue:
         raise HTTPException(status_code=404, detail="Venue not found")
     
     db_event = Event(**event_in.dict())
     db.add(db_event)
-    db.commit()
-    db.refresh(db_event)
+    await db.flush()
+    await db.run_sync(event_counters.create_counter, db_event.id)
+    await db.run_sync(event_search.index_events, [db_event.id])
+    await db.commit()
+    catalogue_cache.bump()
+    await db.refresh(db_event)
     return db_event
 
 @router.patch("/events/{event_id}/status", response_model=EventResponse)
-def update_event_status(event_id: int, status_in: EventUpdateStatus, db: Session = Depends(get_db)):
-    event = db.query(Event).get(event_id)
+async def update_event_status(event_id: int, status_in: EventUpdateStatus, db: AsyncSession = Depends(get_async_db)):
+    event = await db.get(Event, event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     
+    cancelled = status_in.status == EventStatus.CANCELLED and event.status != EventStatus.CANCELLED
+    if status_in.status != event.status:
+        await db.run_sync(change_log.record, [change_log.entry("event.status_changed", event_id, event_id, status=status_in.status.value, previous_status=event.status)])
     event.status = status_in.status
-    db.commit()
-    db.refresh(event)
+    await db.commit()
+    catalogue_cache.bump()
+    if cancelled:
+        # Refund every order in the background; progress at GET .../mass-refund.
+        await db.run_sync(mass_refunds.start, event_id)
+    await db.refresh(event)
     return event
+
+@router.post("/events/{event_id}/mass-refund", response_model=MassRefundResponse, status_code=status.HTTP_202_ACCEPTED)
+async def start_mass_refund(event_id: int, refund_in: MassRefundCreate = MassRefundCreate(), db: AsyncSession = Depends(get_async_db)):
+    # Resumes a failed run, or refunds orders left over after a completed one.
+    return await db.run_sync(mass_refunds.start, event_id, refund_in.resolution_note)
+
+@router.get("/events/{event_id}/mass-refund", response_model=MassRefundResponse)
+async def view_mass_refund(event_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(mass_refunds.get, event_id)
+
+@router.get("/change-log", response_model=ChangeLogBatch)
+async def read_change_log(
+    after: int = Query(0, ge=0, description="Sequence number to read after"),
+    limit: int = Query(change_log.DEFAULT_BATCH_SIZE, ge=1, le=change_log.MAX_BATCH_SIZE),
+    topic: Optional[List[str]] = Query(None, description="Topic prefixes to keep, e.g. order. or ticket.used"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Stateless read; consumers below keep their position server-side.
+    return await db.run_sync(change_log.batch, after, limit, topic)
+
+@router.get("/change-log/consumers", response_model=list[ChangeLogConsumerResponse])
+async def view_change_log_consumers(db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(change_log.list_consumers)
+
+@router.get("/change-log/consumers/{name}/batch", response_model=ChangeLogBatch)
+async def read_change_log_batch(
+    name: str,
+    limit: int = Query(change_log.DEFAULT_BATCH_SIZE, ge=1, le=change_log.MAX_BATCH_SIZE),
+    topic: Optional[List[str]] = Query(None, description="Topic prefixes to keep, e.g. order. or ticket.used"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Entries after the consumer's checkpoint (registering it on first use).
+    # Reading again without an ack returns the same batch.
+    return await db.run_sync(change_log.consumer_batch, name, limit, topic)
+
+@router.post("/change-log/consumers/{name}/ack", response_model=ChangeLogConsumerResponse)
+async def ack_change_log_batch(name: str, ack_in: ChangeLogAck, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(change_log.ack, name, ack_in.position)
+
+@router.delete("/change-log/consumers/{name}", status_code=status.HTTP_204_NO_CONTENT)
+async def remove_change_log_consumer(name: str, db: AsyncSession = Depends(get_async_db)):
+    # A consumer that is gone for good would otherwise hold back pruning.
+    await db.run_sync(change_log.remove_consumer, name)
+
+@router.get("/stats/user-cache")
+async def view_user_cache_stats():
+    return user_cache.stats()
+
+@router.get("/stats/catalogue-cache")
+async def view_catalogue_cache_stats():
+    return catalogue_cache.stats()
+
+@router.get("/stats/seat-feed")
+async def view_seat_feed_stats():
+    return seat_feed.stats()
+
+@router.get("/stats/idempotency")
+async def view_idempotency_stats():
+    return idempotency_store.stats()
+
+@router.get("/stats/slow-queries")
+async def view_slow_queries():
+    # Empty unless SLOW_QUERY_LOG_MS is set.
+    return list(request_metrics.slow_queries)
+
+@router.get("/jobs", response_model=list[JobResponse])
+async def view_jobs(db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(job_runner.list_jobs)
+
+@router.post("/jobs/{name}/run", status_code=status.HTTP_202_ACCEPTED)
+async def run_job(name: str, db: AsyncSession = Depends(get_async_db)):
+    await db.run_sync(job_runner.trigger, name)
+    return {"message": f"Job {name} will run on the next tick"}
@@ -1,33 +1,47 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.models.models import User
 from app.schemas.schemas import UserCreate, UserLogin, UserResponse
-from app.utils.security import get_password_hash, verify_password
+from app.utils.security import ensure_password_capacity, get_password_hash_async, verify_password_async
+from app.utils.user_cache import user_cache
+from app.utils.metrics import InstrumentedRoute
 
-router = APIRouter(prefix="/auth", tags=["Auth"])
+router = APIRouter(prefix="/auth", tags=["Auth"], route_class=InstrumentedRoute)
+
+# The lookup ends its transaction before bcrypt is awaited, so slow hashes
+# never hold a pooled connection.
+async def _find_credentials(db: AsyncSession, email: str):
+    row = (await db.execute(select(User.id, User.email, User.role, User.password).where(User.email == email))).first()
+    await db.rollback()
+    return row
 
 @router.post("/signup", response_model=UserResponse)
-def signup(user_in: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user_in.email).first()
+async def signup(user_in: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    ensure_password_capacity()
+    db_user = await _find_credentials(db, user_in.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
+    password_hash = await get_password_hash_async(user_in.password)
     new_user = User(
         name=user_in.name,
         email=user_in.email,
-        password=get_password_hash(user_in.password),
+        password=password_hash,
         role=user_in.role
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    user_cache.invalidate(new_user.email)
+    await db.refresh(new_user)
     return new_user
 
 @router.post("/login")
-def login(credentials: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == credentials.email).first()
-    if not user or not verify_password(credentials.password, user.password):
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    ensure_password_capacity()
+    user = await _find_credentials(db, credentials.email)
+    if not user or not await verify_password_async(credentials.password, user.password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     return {"message": "Login successful", "email": user.email, "role": user.role}
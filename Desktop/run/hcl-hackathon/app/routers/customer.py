@@ -1,50 +1,206 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models.models import Event, Seat, Order, Ticket, RefundRequest, SupportCase, UserRole, SeatStatus, EventStatus
-from app.schemas.schemas import OrderCreate, OrderResponse, TicketResponse, RefundRequestCreate, SupportCaseCreate, SupportCaseResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import raiseload
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.models.models import Event, Seat, Order, Ticket, RefundRequest, SupportCase, UserRole, SeatStatus, EventStatus, OrderStatus
+from app.schemas.schemas import EventResponse, EventSearchResponse, SeatResponse, OrderCreate, OrderResponse, TicketResponse, RefundRequestCreate, SupportCaseCreate, SupportCaseResponse
 from app.utils.deps import RoleChecker, get_current_user
-from app.services.booking_service import create_booking
+from app.utils.metrics import InstrumentedRoute
+from app.utils.catalogue_cache import catalogue_cache
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, PageParams, page_params, paginate
+from app.services import event_search, seat_stream
+from app.services.booking_service import create_best_available_booking_async, create_booking_async
+from app.services.idempotency import idempotency_store
+from app.services.waiting_room import waiting_rooms
+from app.services.seat_availability import seat_availability
 import datetime
+import hashlib
+from typing import List, Optional
 
-router = APIRouter(prefix="/customer", tags=["Customer"], dependencies=[Depends(RoleChecker([UserRole.CUSTOMER]))])
+router = APIRouter(prefix="/customer", tags=["Customer"], dependencies=[Depends(RoleChecker([UserRole.CUSTOMER]))], route_class=InstrumentedRoute)
 
-@router.get("/events/upcoming")
-def view_upcoming_events(db: Session = Depends(get_db)):
-    return db.query(Event).filter(Event.status == EventStatus.UPCOMING, Event.event_date > datetime.datetime.utcnow()).all()
+EVENT_LIST = TypeAdapter(list[EventResponse])
+ORDER = TypeAdapter(OrderResponse)
+
+@router.get("/events/upcoming", response_model=list[EventResponse])
+async def view_upcoming_events(request: Request, response: Response, page: PageParams = Depends(page_params), db: AsyncSession = Depends(get_async_db)):
+    # Response schemas only read columns; raiseload turns any accidental lazy load
+    # during serialization into an error instead of one query per row.
+    def upcoming():
+        # Past events are filtered here too, so the listing doesn't depend on
+        # the close_past_events job having run.
+        return select(Event).where(Event.status == EventStatus.UPCOMING, Event.event_date > datetime.datetime.utcnow()).options(raiseload("*"))
+
+    if page.stream:
+        return await paginate(db, upcoming(), Event.id, page, response, EventResponse)
+
+    # Pages are cached as JSON bytes per catalogue version (see catalogue_cache).
+    key = (page.after, page.limit)
+    cached = catalogue_cache.get(key)
+    if cached is None:
+        version = catalogue_cache.version
+        rows = await paginate(db, upcoming(), Event.id, page, response, EventResponse)
+        body = EVENT_LIST.dump_json(EVENT_LIST.validate_python(rows, from_attributes=True))
+        stale_at = min((row.event_date for row in rows), default=None)
+        cached = catalogue_cache.put(key, version, body, response.headers.get(NEXT_CURSOR_HEADER), stale_at)
+
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if cached.next_cursor:
+        headers[NEXT_CURSOR_HEADER] = cached.next_cursor
+    if catalogue_cache.matches(request.headers.get("if-none-match"), cached):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+@router.get("/events/search", response_model=EventSearchResponse)
+async def search_events(
+    response: Response,
+    q: Optional[str] = Query(None, max_length=200, description="Words matched against event name, category, venue and city (prefixes match)"),
+    category: List[str] = Query([]),
+    city: List[str] = Query([]),
+    date_from: Optional[datetime.datetime] = None,
+    date_to: Optional[datetime.datetime] = Query(None, description="Exclusive"),
+    price_min: Optional[float] = Query(None, ge=0),
+    price_max: Optional[float] = Query(None, ge=0),
+    facets: bool = Query(True, description="Include the total and per-category / per-city counts"),
+    after: Optional[int] = Query(None, description="Return events with id greater than this cursor"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+):
+    filters = event_search.SearchFilters(q, category, city, date_from, date_to, price_min, price_max)
+    result, next_cursor = await db.run_sync(event_search.search, filters, after, limit, facets)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return result
 
 @router.get("/events/{event_id}/seats/available")
-def view_available_seats(event_id: int, db: Session = Depends(get_db)):
-    return db.query(Seat).filter(Seat.event_id == event_id, Seat.status == SeatStatus.AVAILABLE).all()
+async def view_available_seats(event_id: int, response: Response, view: str = Query("seats", pattern="^(seats|count|ranges|bitmap)$"), page: PageParams = Depends(page_params), db: AsyncSession = Depends(get_async_db)):
+    if view == "seats":
+        stmt = select(Seat).where(Seat.event_id == event_id, Seat.status == SeatStatus.AVAILABLE).options(raiseload("*"))
+        return await paginate(db, stmt, Seat.id, page, response, SeatResponse)
+
+    # Served from the in-memory availability index, no ORM rows involved.
+    bitmap = await db.run_sync(seat_availability.get, event_id)
+    result = {"event_id": event_id, "total_seats": bitmap.total, "available_seats": bitmap.available_count}
+    if view == "ranges":
+        result["ranges"] = bitmap.ranges()
+    elif view == "bitmap":
+        result.update(base_seat_id=bitmap.base_id, size=bitmap.size, encoding="base64-lsb", bitmap=bitmap.packed())
+    return result
+
+@router.get("/events/{event_id}/seats/stream")
+async def stream_seat_changes(
+    event_id: int,
+    cursor: Optional[str] = Query(None, description="Resume after this event id; the Last-Event-ID header takes precedence"),
+    last_event_id: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Server-sent events: a `snapshot` (availability bitmap as in view=bitmap,
+    # plus `seq`), then `seats` deltas. A reconnect with the last event id
+    # replays only the missed deltas while they are still kept.
+    frames = await seat_stream.open_stream(db, event_id, last_event_id or cursor)
+    return StreamingResponse(frames, media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.post("/events/{event_id}/queue")
+async def join_waiting_room(event_id: int, current_user = Depends(get_current_user)):
+    position = waiting_rooms.join(event_id, current_user.id)
+    if position is None:
+        raise HTTPException(status_code=404, detail="Waiting room is not open for this event")
+    return position
+
+@router.get("/events/{event_id}/queue")
+async def view_queue_position(event_id: int, current_user = Depends(get_current_user)):
+    position = waiting_rooms.status(event_id, current_user.id)
+    if position is None:
+        raise HTTPException(status_code=404, detail="Waiting room is not open for this event")
+    return position
 
 @router.post("/orders", response_model=OrderResponse)
-def place_order(order_in: OrderCreate, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    return create_booking(db, current_user.id, order_in.event_id, order_in.seat_ids, order_in.payment_mode)
+async def place_order(order_in: OrderCreate, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user),
+                      idempotency_key: Optional[str] = Header(None, min_length=1, max_length=255),
+                      admission_token: Optional[str] = Header(None, alias="X-Admission-Token")):
+    if idempotency_key is None:
+        return await _admitted_booking(db, current_user.id, order_in, admission_token)
+
+    # Retries with the same key replay the first response; concurrent duplicates
+    # wait for the first one instead of racing it for the same seats.
+    fingerprint = hashlib.sha256(order_in.model_dump_json().encode()).hexdigest()
+    stored_order = False
+
+    async def book():
+        nonlocal stored_order
+        # The key is also saved on the order, so a retry that reaches another
+        # worker (or this one after a restart) still finds the first booking.
+        order = await _order_for_key(db, current_user.id, idempotency_key)
+        if order is None:
+            try:
+                order = await _admitted_booking(db, current_user.id, order_in, admission_token, idempotency_key)
+            except IntegrityError:
+                await db.rollback()
+                order = await _order_for_key(db, current_user.id, idempotency_key)
+                if order is None:
+                    raise
+                stored_order = True
+        else:
+            stored_order = True
+        if stored_order and order.event_id != order_in.event_id:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        return 200, ORDER.dump_json(ORDER.validate_python(order, from_attributes=True))
+
+    status_code, body, replayed = await idempotency_store.run((current_user.id, idempotency_key), fingerprint, book)
+    headers = {"Idempotent-Replayed": "true"} if replayed or stored_order else {}
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
+
+async def _admitted_booking(db: AsyncSession, user_id: int, order_in: OrderCreate, admission_token: Optional[str], idempotency_key: str = None):
+    # While the event's waiting room is open every order spends an admission
+    # token; a failed order gives it back so the customer can pick other seats.
+    if not waiting_rooms.claim(order_in.event_id, user_id, admission_token):
+        raise HTTPException(status_code=403, detail="Admission token required: join the waiting room for this event")
+    try:
+        if order_in.quantity:
+            order = await create_best_available_booking_async(db, user_id, order_in.event_id, order_in.quantity, order_in.payment_mode, order_in.together, idempotency_key=idempotency_key)
+        else:
+            order = await create_booking_async(db, user_id, order_in.event_id, order_in.seat_ids, order_in.payment_mode, idempotency_key=idempotency_key)
+    except BaseException:
+        waiting_rooms.release(order_in.event_id, user_id)
+        raise
+    waiting_rooms.consume(order_in.event_id, user_id)
+    return order
+
+async def _order_for_key(db: AsyncSession, user_id: int, idempotency_key: str):
+    stmt = select(Order).where(Order.user_id == user_id, Order.idempotency_key == idempotency_key).options(raiseload("*"))
+    return (await db.execute(stmt)).scalar_one_or_none()
 
 @router.get("/tickets", response_model=list[TicketResponse])
-def view_my_tickets(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    return db.query(Ticket).join(Order).filter(Order.user_id == current_user.id).all()
+async def view_my_tickets(response: Response, page: PageParams = Depends(page_params), db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user)):
+    stmt = select(Ticket).join(Order).where(Order.user_id == current_user.id).options(raiseload("*"))
+    return await paginate(db, stmt, Ticket.id, page, response, TicketResponse)
 
 @router.post("/refunds")
-def request_refund(refund_in: RefundRequestCreate, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    order = db.query(Order).filter(Order.id == refund_in.order_id, Order.user_id == current_user.id).first()
+async def request_refund(refund_in: RefundRequestCreate, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user)):
+    order = (await db.execute(select(Order.id, Order.order_status).where(Order.id == refund_in.order_id, Order.user_id == current_user.id))).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
+    if order.order_status != OrderStatus.CONFIRMED:
+        raise HTTPException(status_code=400, detail=f"Order is {order.order_status}, only confirmed orders can be refunded")
     
     # Check if already requested
-    existing = db.query(RefundRequest).filter(RefundRequest.order_id == refund_in.order_id).first()
+    existing = (await db.execute(select(RefundRequest.id).where(RefundRequest.order_id == refund_in.order_id))).first()
     if existing:
         raise HTTPException(status_code=400, detail="Refund already requested for this order")
 
     new_refund = RefundRequest(order_id=refund_in.order_id, reason=refund_in.reason)
     db.add(new_refund)
-    db.commit()
+    await db.commit()
     return {"message": "Refund request submitted"}
 
 @router.post("/support", response_model=SupportCaseResponse)
-def raise_support_case(case_in: SupportCaseCreate, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+async def raise_support_case(case_in: SupportCaseCreate, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user)):
     new_case = SupportCase(user_id=current_user.id, **case_in.dict())
     db.add(new_case)
-    db.commit()
-    db.refresh(new_case)
+    await db.commit()
+    await db.refresh(new_case)
     return new_case
@@ -1,18 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models.models import Ticket, EntryLog, UserRole, TicketStatus, EventStatus
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.models.models import Ticket, Order, Event, Seat, EntryLog, UserRole, TicketStatus, EventStatus
+from app.schemas.schemas import TicketScanBatch, OfflineSyncUpload
+from app.services import change_log, entry_service
+from app.services.gate_index import gate_index
 from app.utils.deps import RoleChecker, get_current_user
+from app.utils.metrics import InstrumentedRoute
 import datetime
 
-router = APIRouter(prefix="/entry-manager", tags=["Entry Manager"], dependencies=[Depends(RoleChecker([UserRole.ENTRY_MANAGER]))])
+router = APIRouter(prefix="/entry-manager", tags=["Entry Manager"], dependencies=[Depends(RoleChecker([UserRole.ENTRY_MANAGER]))], route_class=InstrumentedRoute)
 
-@router.post("/tickets/validate/{ticket_code}")
-def validate_ticket(ticket_code: str, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    ticket = db.query(Ticket).filter(Ticket.ticket_code == ticket_code).first()
-    if not ticket:
-        return {"is_valid": False, "message": "Ticket not found"}
-    
+async def _lookup_ticket(db: AsyncSession, ticket_code: str):
+    # One joined query instead of ticket -> order -> event -> seat lazy loads.
+    result = await db.execute(
+        select(Ticket.id, Ticket.status, Order.event_id, Event.name.label("event_name"), Event.event_date, Seat.seat_number)
+        .join(Order, Order.id == Ticket.order_id)
+        .join(Event, Event.id == Order.event_id)
+        .join(Seat, Seat.id == Ticket.seat_id)
+        .where(Ticket.ticket_code == ticket_code)
+    )
+    return result.first()
+
+def _validation_result(ticket):
     # Rule 6: Ticket becomes invalid once marked as used.
     if ticket.status == TicketStatus.USED:
         return {"is_valid": False, "message": "Ticket already used"}
@@ -21,31 +32,136 @@ def validate_ticket(ticket_code: str, db: Session = Depends(get_db), current_use
         return {"is_valid": False, "message": "Ticket is cancelled"}
 
     # Rule 2: Ticket becomes invalid after event date.
-    if ticket.order.event.event_date < datetime.datetime.utcnow():
+    if ticket.event_date < datetime.datetime.utcnow():
         return {"is_valid": False, "message": "Event is over"}
 
     return {
         "is_valid": True, 
         "message": "Ticket is valid",
         "ticket_id": ticket.id,
-        "event_name": ticket.order.event.name,
-        "seat_number": ticket.seat.seat_number
+        "event_name": ticket.event_name,
+        "seat_number": ticket.seat_number
     }
 
+async def _mark_used(db: AsyncSession, ticket_id: int, event_id: int, validated_by: int) -> bool:
+    # Conditional update so concurrent scans/processes can never use a ticket twice.
+    result = await db.execute(
+        update(Ticket)
+        .where(Ticket.id == ticket_id, Ticket.status == TicketStatus.ACTIVE)
+        .values(status=TicketStatus.USED)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        await db.rollback()
+        return False
+
+    # Log entry (Core insert: skips the unit-of-work flush on the hot path)
+    await db.execute(insert(EntryLog).values(ticket_id=ticket_id, validated_by=validated_by, status="valid"))
+    await db.run_sync(change_log.record, [change_log.entry("ticket.used", ticket_id, event_id, validated_by=validated_by, used_at=datetime.datetime.utcnow(), offline=False)])
+    await db.commit()
+    return True
+
+@router.post("/tickets/validate/{ticket_code}")
+async def validate_ticket(ticket_code: str, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user)):
+    ticket = gate_index.get(ticket_code) or await _lookup_ticket(db, ticket_code)
+    if not ticket:
+        return {"is_valid": False, "message": "Ticket not found"}
+    return _validation_result(ticket)
+
 @router.post("/tickets/{ticket_id}/mark-used")
-def mark_ticket_used(ticket_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    ticket = db.query(Ticket).get(ticket_id)
+async def mark_ticket_used(ticket_id: int, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user)):
+    ticket = (await db.execute(
+        select(Ticket.id, Ticket.status, Order.event_id).join(Order, Order.id == Ticket.order_id).where(Ticket.id == ticket_id)
+    )).first()
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
     
-    if ticket.status != TicketStatus.ACTIVE:
-        raise HTTPException(status_code=400, detail=f"Ticket is {ticket.status}")
+    if ticket.status != TicketStatus.ACTIVE or not await _mark_used(db, ticket_id, ticket.event_id, current_user.id):
+        current = await db.scalar(select(Ticket.status).where(Ticket.id == ticket_id))
+        raise HTTPException(status_code=400, detail=f"Ticket is {current}")
 
-    ticket.status = TicketStatus.USED
-    
-    # Log entry
-    log = EntryLog(ticket_id=ticket_id, validated_by=current_user.id, status="valid")
-    db.add(log)
-    db.commit()
-    
+    gate_index.set_status([ticket_id], TicketStatus.USED.value)
     return {"message": "Ticket marked as used"}
+
+@router.post("/gate/scan/{ticket_code}")
+async def scan_ticket(ticket_code: str, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user)):
+    # Validate and mark used in one call. With gate mode on, the check and the
+    # ACTIVE -> USED claim happen in memory and only the write reaches the DB.
+    ticket = gate_index.get(ticket_code)
+    claimed = ticket is not None
+    if not claimed:
+        ticket = await _lookup_ticket(db, ticket_code)
+        if not ticket:
+            return {"is_valid": False, "message": "Ticket not found"}
+    result = _validation_result(ticket)
+    if not result["is_valid"]:
+        return result
+    if claimed and gate_index.claim(ticket_code) != TicketStatus.ACTIVE:
+        return {"is_valid": False, "message": "Ticket already used"}
+
+    try:
+        marked = await _mark_used(db, ticket.id, ticket.event_id, current_user.id)
+    except Exception:
+        await db.rollback()
+        if claimed:
+            gate_index.set_status([ticket.id], TicketStatus.ACTIVE.value)
+        raise
+    if not marked:
+        # The DB disagrees with the index (e.g. another process got there first).
+        current = await db.scalar(select(Ticket.status).where(Ticket.id == ticket.id))
+        gate_index.set_status([ticket.id], current)
+        return {"is_valid": False, "message": "Ticket already used" if current == TicketStatus.USED else f"Ticket is {current}"}
+
+    result["message"] = "Ticket valid, entry recorded"
+    return result
+
+@router.post("/gate/scan-batch")
+async def scan_ticket_batch(batch: TicketScanBatch, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user)):
+    # Many scans, one transaction: one IN lookup, one conditional UPDATE and one
+    # EntryLog insert. A code repeated within the batch is admitted once.
+    results = await db.run_sync(entry_service.record_scans, [(code, None) for code in batch.ticket_codes], current_user.id)
+    return {"admitted": sum(1 for r in results if r["is_valid"]), "results": results}
+
+@router.get("/events/{event_id}/offline-snapshot")
+async def download_offline_snapshot(event_id: int, packed: bool = Query(False, description="Return digests as one base64 blob instead of a hex list"), db: AsyncSession = Depends(get_async_db)):
+    # Sorted, salted hashes of the event's active ticket codes for gate devices
+    # that lose connectivity. Upload their scans later to /offline-sync.
+    snapshot = await db.run_sync(entry_service.offline_snapshot, event_id, packed)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return snapshot
+
+@router.post("/events/{event_id}/offline-sync")
+async def upload_offline_scans(event_id: int, upload: OfflineSyncUpload, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user)):
+    if not (await db.execute(select(Event.id).where(Event.id == event_id))).first():
+        raise HTTPException(status_code=404, detail="Event not found")
+    # Stored times are naive UTC; devices may send any offset.
+    scans = [
+        (scan.ticket_code, scan.scanned_at.astimezone(datetime.timezone.utc).replace(tzinfo=None) if scan.scanned_at.tzinfo else scan.scanned_at)
+        for scan in upload.scans
+    ]
+    results = await db.run_sync(entry_service.record_scans, scans, current_user.id, event_id=event_id, offline=True)
+    return {
+        "device_id": upload.device_id,
+        "accepted": sum(1 for r in results if r["is_valid"]),
+        "duplicates": sum(1 for r in results if r["message"] == "Duplicate entry"),
+        "rejected": sum(1 for r in results if not r["is_valid"] and r["message"] != "Duplicate entry"),
+        "results": results,
+    }
+
+@router.post("/events/{event_id}/gate-mode")
+async def enable_gate_mode(event_id: int, db: AsyncSession = Depends(get_async_db)):
+    loaded = await db.run_sync(gate_index.warm, event_id)
+    if loaded is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return {"event_id": event_id, "tickets_loaded": loaded}
+
+@router.delete("/events/{event_id}/gate-mode")
+async def disable_gate_mode(event_id: int):
+    if not gate_index.drop(event_id):
+        raise HTTPException(status_code=404, detail="Gate mode is not enabled for this event")
+    return {"message": "Gate mode disabled"}
+
+@router.get("/gate-mode")
+async def view_gate_mode():
+    return {"events": gate_index.stats()}
@@ -1,57 +1,119 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models.models import Seat, Event, UserRole, Order, SeatStatus, EventStatus
-from app.schemas.schemas import SeatCreate, SeatResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.models.models import Seat, Event, EventCounter, Venue, UserRole, Order, SeatStatus, EventStatus
+from app.schemas.schemas import SeatCreate, SeatResponse, WaitingRoomSettings
 from app.utils.deps import RoleChecker
+from app.utils.metrics import InstrumentedRoute
+from app.services.seat_service import bulk_create_seats, generate_seat_numbers, layout_size
+from app.services.seat_availability import seat_availability
+from app.services.waiting_room import waiting_rooms
+from app.services import change_log, event_counters
+from app.utils.catalogue_cache import catalogue_cache
 
-router = APIRouter(prefix="/organizer", tags=["Organizer"], dependencies=[Depends(RoleChecker([UserRole.ORGANIZER]))])
+router = APIRouter(prefix="/organizer", tags=["Organizer"], dependencies=[Depends(RoleChecker([UserRole.ORGANIZER]))], route_class=InstrumentedRoute)
 
 @router.post("/events/{event_id}/seats")
-def create_seats(event_id: int, seat_in: SeatCreate, db: Session = Depends(get_db)):
-    event = db.query(Event).get(event_id)
+async def create_seats(event_id: int, seat_in: SeatCreate, db: AsyncSession = Depends(get_async_db)):
+    event = (await db.execute(select(Event.id, Venue.total_capacity).join(Venue, Venue.id == Event.venue_id).where(Event.id == event_id))).first()
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     
+    if bool(seat_in.seat_count) == bool(seat_in.sections):
+        raise HTTPException(status_code=400, detail="Provide either seat_count or sections")
+
     # Check if seats already created or capacity exceeded
-    existing_seats = db.query(Seat).filter(Seat.event_id == event_id).count()
-    if existing_seats + seat_in.seat_count > event.venue.total_capacity:
-         raise HTTPException(status_code=400, detail=f"Cannot exceed venue capacity ({event.venue.total_capacity})")
-
-    new_seats = []
-    for i in range(1, seat_in.seat_count + 1):
-        seat_num = f"S-{existing_seats + i}"
-        new_seat = Seat(event_id=event_id, seat_number=seat_num, status=SeatStatus.AVAILABLE)
-        db.add(new_seat)
-        new_seats.append(new_seat)
-    
-    db.commit()
-    return {"message": f"{seat_in.seat_count} seats created for event {event_id}"}
+    requested = layout_size(seat_in.seat_count, seat_in.sections)
+    existing_seats = await db.scalar(select(func.count()).select_from(Seat).where(Seat.event_id == event_id))
+    if existing_seats + requested > event.total_capacity:
+         raise HTTPException(status_code=400, detail=f"Cannot exceed venue capacity ({event.total_capacity})")
+
+    for section in seat_in.sections or []:
+        if (await db.execute(select(Seat.id).where(Seat.event_id == event_id, Seat.seat_number.startswith(f"{section.name}-R", autoescape=True)).limit(1))).first():
+            raise HTTPException(status_code=400, detail=f"Section {section.name} already exists for this event")
+
+    seat_numbers = generate_seat_numbers(seat_in.seat_count, seat_in.sections, start=existing_seats + 1)
+    created = await db.run_sync(bulk_create_seats, event_id, seat_numbers)
+    seat_availability.invalidate(event_id)
+    return {"message": f"{created} seats created for event {event_id}", "created": created}
 
 @router.get("/events/{event_id}/booking-summary")
-def view_booking_summary(event_id: int, db: Session = Depends(get_db)):
-    event = db.query(Event).get(event_id)
-    if not event:
+async def view_booking_summary(event_id: int, live: bool = False, db: AsyncSession = Depends(get_async_db)):
+    # O(1) read from event_counters; live=true (or an event without a counter row)
+    # computes the same numbers with a single aggregate query.
+    summary = None
+    if not live:
+        row = (await db.execute(select(Event.name, EventCounter).join(EventCounter, EventCounter.event_id == Event.id).where(Event.id == event_id))).first()
+        if row:
+            counter = row.EventCounter
+            summary = {
+                "event_name": row.name,
+                "seats_total": counter.seats_total,
+                "seats_booked": counter.seats_booked,
+                "confirmed_revenue": counter.confirmed_revenue,
+                "refunds_approved": counter.refunds_approved,
+                "refunded_amount": counter.refunded_amount,
+            }
+    if summary is None:
+        summary = await db.run_sync(event_counters.live_summary, event_id)
+    if summary is None:
         raise HTTPException(status_code=404, detail="Event not found")
-    
-    total_seats = db.query(Seat).filter(Seat.event_id == event_id).count()
-    booked_seats = db.query(Seat).filter(Seat.event_id == event_id, Seat.status == SeatStatus.BOOKED).count()
-    total_revenue = sum(order.total_amount for order in event.orders if order.order_status == "confirmed")
 
     return {
-        "event_name": event.name,
-        "total_seats": total_seats,
-        "booked_seats": booked_seats,
-        "available_seats": total_seats - booked_seats,
-        "total_revenue": total_revenue
+        "event_name": summary["event_name"],
+        "total_seats": summary["seats_total"],
+        "booked_seats": summary["seats_booked"],
+        "available_seats": summary["seats_total"] - summary["seats_booked"],
+        "total_revenue": summary["confirmed_revenue"],
+        "refunds_approved": summary["refunds_approved"],
+        "refunded_amount": summary["refunded_amount"],
     }
 
+@router.post("/events/{event_id}/counters/rebuild")
+async def rebuild_event_counters(event_id: int, db: AsyncSession = Depends(get_async_db)):
+    if not await db.run_sync(event_counters.rebuild_counters, [event_id]):
+        raise HTTPException(status_code=404, detail="Event not found")
+    return {"message": "Counters rebuilt"}
+
 @router.post("/events/{event_id}/close-bookings")
-def close_bookings(event_id: int, db: Session = Depends(get_db)):
-    event = db.query(Event).get(event_id)
+async def close_bookings(event_id: int, db: AsyncSession = Depends(get_async_db)):
+    event = await db.get(Event, event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     
+    if event.status != EventStatus.CLOSED:
+        await db.run_sync(change_log.record, [change_log.entry("event.status_changed", event_id, event_id, status=EventStatus.CLOSED.value, previous_status=event.status)])
     event.status = EventStatus.CLOSED
-    db.commit()
+    await db.commit()
+    catalogue_cache.bump()
     return {"message": "Bookings closed for event"}
+
+@router.get("/events/{event_id}/seat-index/check")
+async def check_seat_index(event_id: int, repair: bool = False, db: AsyncSession = Depends(get_async_db)):
+    report = await db.run_sync(seat_availability.check_consistency, event_id)
+    if repair and not report["consistent"]:
+        seat_availability.invalidate(event_id)
+        await db.run_sync(seat_availability.rebuild_event, event_id)
+        report["repaired"] = True
+    return report
+
+@router.post("/events/{event_id}/waiting-room")
+async def open_waiting_room(event_id: int, room_in: WaitingRoomSettings = WaitingRoomSettings(), db: AsyncSession = Depends(get_async_db)):
+    # While open, orders for the event need an admission token from the queue.
+    if not (await db.execute(select(Event.id).where(Event.id == event_id))).first():
+        raise HTTPException(status_code=404, detail="Event not found")
+    return waiting_rooms.open(event_id, room_in.admit_rate, room_in.token_ttl_seconds)
+
+@router.get("/events/{event_id}/waiting-room")
+async def view_waiting_room(event_id: int):
+    stats = waiting_rooms.room_stats(event_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Waiting room is not open for this event")
+    return stats
+
+@router.delete("/events/{event_id}/waiting-room")
+async def close_waiting_room(event_id: int):
+    if not waiting_rooms.close(event_id):
+        raise HTTPException(status_code=404, detail="Waiting room is not open for this event")
+    return {"message": "Waiting room closed"}
@@ -1,34 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.orm import raiseload
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.models.models import SupportCase, RefundRequest, UserRole, RefundStatus, SupportStatus
 from app.schemas.schemas import SupportCaseResponse, SupportCaseUpdate, RefundResponse, RefundUpdate
 from app.utils.deps import RoleChecker
-from app.services.booking_service import process_refund
+from app.utils.metrics import InstrumentedRoute
+from app.utils.pagination import PageParams, page_params, paginate
+from app.services.booking_service import process_refund_async
 
-router = APIRouter(prefix="/support", tags=["Support"], dependencies=[Depends(RoleChecker([UserRole.SUPPORT]))])
+router = APIRouter(prefix="/support", tags=["Support"], dependencies=[Depends(RoleChecker([UserRole.SUPPORT]))], route_class=InstrumentedRoute)
 
 @router.get("/cases", response_model=list[SupportCaseResponse])
-def view_support_cases(db: Session = Depends(get_db)):
-    return db.query(SupportCase).all()
+async def view_support_cases(response: Response, page: PageParams = Depends(page_params), db: AsyncSession = Depends(get_async_db)):
+    return await paginate(db, select(SupportCase).options(raiseload("*")), SupportCase.id, page, response, SupportCaseResponse)
 
 @router.patch("/cases/{case_id}", response_model=SupportCaseResponse)
-def update_case(case_id: int, case_in: SupportCaseUpdate, db: Session = Depends(get_db)):
-    case = db.query(SupportCase).get(case_id)
+async def update_case(case_id: int, case_in: SupportCaseUpdate, db: AsyncSession = Depends(get_async_db)):
+    case = await db.get(SupportCase, case_id)
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
     
     case.status = case_in.status
     if case_in.resolution_note:
         case.resolution_note = case_in.resolution_note
-    db.commit()
-    db.refresh(case)
+    await db.commit()
+    await db.refresh(case)
     return case
 
 @router.get("/refunds", response_model=list[RefundResponse])
-def view_refund_requests(db: Session = Depends(get_db)):
-    return db.query(RefundRequest).all()
+async def view_refund_requests(response: Response, page: PageParams = Depends(page_params), db: AsyncSession = Depends(get_async_db)):
+    return await paginate(db, select(RefundRequest).options(raiseload("*")), RefundRequest.id, page, response, RefundResponse)
 
-@router.post("/refunds/{refund_id}/process")
-def process_refund_request(refund_id: int, refund_in: RefundUpdate, db: Session = Depends(get_db)):
-    return process_refund(db, refund_id, refund_in.status, refund_in.resolution_note)
+@router.post("/refunds/{refund_id}/process", response_model=RefundResponse)
+async def process_refund_request(refund_id: int, refund_in: RefundUpdate, db: AsyncSession = Depends(get_async_db)):
+    return await process_refund_async(db, refund_id, refund_in.status, refund_in.resolution_note)
@@ -1,7 +1,8 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import Any, Dict, List, Optional
 from datetime import datetime
-from app.models.models import UserRole, OrderStatus, TicketStatus, EventStatus, RefundStatus, SupportStatus, SeatStatus
+from app.models.models import UserRole, OrderStatus, TicketStatus, EventStatus, RefundStatus, SupportStatus, SeatStatus, MassRefundStatus
+from app.config import settings
 
 # User Schemas
 class UserBase(BaseModel):
@@ -56,20 +57,51 @@ class EventCreate(EventBase):
 class EventUpdateStatus(BaseModel):
     status: EventStatus
 
+class WaitingRoomSettings(BaseModel):
+    admit_rate: float = Field(default=settings.waiting_room_admit_rate, gt=0) # customers let through per second
+    token_ttl_seconds: float = Field(default=settings.waiting_room_token_ttl_seconds, gt=0) # how long an admitted customer has to order
+
 class EventResponse(EventBase):
     id: int
     status: EventStatus
     class Config:
         from_attributes = True
 
+class EventSearchResult(EventResponse):
+    venue_name: Optional[str] = None
+    city: Optional[str] = None
+
+class FacetCount(BaseModel):
+    value: Optional[str] = None
+    count: int
+
+class EventSearchResponse(BaseModel):
+    results: List[EventSearchResult]
+    total: Optional[int] = None # omitted with facets=false
+    facets: Optional[Dict[str, List[FacetCount]]] = None # facet name -> counts, most frequent first
+
 # Seat Schemas
 class SeatBase(BaseModel):
     event_id: int
     seat_number: str
 
+class SeatSection(BaseModel):
+    name: str = Field(min_length=1, pattern=r"^[A-Za-z0-9]+$")
+    rows: int = Field(gt=0)
+    seats_per_row: int = Field(gt=0)
+
 class SeatCreate(BaseModel):
     event_id: int
-    seat_count: int # To create multiple seats at once
+    seat_count: Optional[int] = Field(default=None, gt=0) # To create multiple seats at once
+    sections: Optional[List[SeatSection]] = None # Structured layout, e.g. [{"name": "A", "rows": 20, "seats_per_row": 30}]
+
+    @model_validator(mode="after")
+    def unique_section_names(self):
+        # Two sections with one name would generate the same seat numbers.
+        names = [section.name for section in self.sections or []]
+        if len(names) != len(set(names)):
+            raise ValueError("Section names must be unique")
+        return self
 
 class SeatResponse(SeatBase):
     id: int
@@ -80,9 +112,17 @@ class SeatResponse(SeatBase):
 # Order Schemas
 class OrderCreate(BaseModel):
     event_id: int
-    seat_ids: List[int]
+    seat_ids: Optional[List[int]] = None
+    quantity: Optional[int] = Field(default=None, gt=0) # best available: the system picks the seats
+    together: bool = True # with quantity: seats adjacent in one row
     payment_mode: str
 
+    @model_validator(mode="after")
+    def seats_or_quantity(self):
+        if (self.seat_ids is None) == (self.quantity is None):
+            raise ValueError("Provide either seat_ids or quantity")
+        return self
+
 class OrderResponse(BaseModel):
     id: int
     user_id: int
@@ -123,6 +163,36 @@ class RefundResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class MassRefundCreate(BaseModel):
+    resolution_note: str = "Event cancelled"
+
+class MassRefundResponse(BaseModel):
+    event_id: int
+    status: MassRefundStatus
+    orders_total: int
+    orders_refunded: int
+    tickets_cancelled: int
+    refunded_amount: float
+    error: Optional[str] = None
+    started_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+    class Config:
+        from_attributes = True
+
+class JobResponse(BaseModel):
+    name: str
+    leased: bool # False: runs in every worker process, state kept in memory
+    interval_seconds: float
+    next_run_at: datetime
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+    runs: int
+    last_started_at: Optional[datetime] = None
+    last_finished_at: Optional[datetime] = None
+    last_result: Optional[str] = None
+    last_error: Optional[str] = None
+
 # Support Schemas
 class SupportCaseCreate(BaseModel):
     subject: str
@@ -147,3 +217,45 @@ class TicketValidationResponse(BaseModel):
     ticket_id: Optional[int] = None
     event_name: Optional[str] = None
     seat_number: Optional[str] = None
+
+# Batch / Offline Gate Scans
+MAX_SCAN_BATCH = 500
+MAX_OFFLINE_SYNC = 5000
+
+class TicketScanBatch(BaseModel):
+    ticket_codes: List[str] = Field(min_length=1, max_length=MAX_SCAN_BATCH)
+
+class OfflineScan(BaseModel):
+    ticket_code: str
+    scanned_at: datetime
+
+class OfflineSyncUpload(BaseModel):
+    device_id: str = Field(min_length=1)
+    scans: List[OfflineScan] = Field(min_length=1, max_length=MAX_OFFLINE_SYNC)
+
+
+# Change Log
+class ChangeLogEntryResponse(BaseModel):
+    id: int # sequence number
+    created_at: datetime
+    topic: str
+    entity_id: int # order, ticket, refund request or event id, depending on the topic
+    event_id: Optional[int] = None
+    payload: Dict[str, Any]
+
+class ChangeLogBatch(BaseModel):
+    consumer: Optional[str] = None
+    checkpoint: Optional[int] = None # consumer's acknowledged position
+    position: int # acknowledge this once the entries are processed (or pass it as `after`)
+    head: int
+    entries: List[ChangeLogEntryResponse]
+
+class ChangeLogAck(BaseModel):
+    position: int = Field(ge=0)
+
+class ChangeLogConsumerResponse(BaseModel):
+    name: str
+    position: int
+    lag: int # entries written since the checkpoint
+    created_at: datetime
+    updated_at: datetime
@@ -1,10 +1,27 @@
+from sqlalchemy import func, select, text
 from sqlalchemy.orm import Session
-from app.database import SessionLocal, engine, Base
-from app.models.models import User, UserRole, Venue, Event, EventStatus
+from app.database import Base, SessionLocal, init_db
+from app.models.models import (
+    User, UserRole, Venue, Event, EventStatus, Seat, SeatStatus, Order, OrderStatus,
+    Ticket, TicketStatus, RefundRequest, RefundStatus, EntryLog, SupportCase, SupportStatus,
+)
+from app.schemas.schemas import SeatSection
+from app.services.seat_service import generate_seat_numbers
 from app.utils.security import get_password_hash
+from app.services import event_search
+from app.services.event_counters import create_counter
+from itertools import islice
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+import argparse
 import datetime
+import multiprocessing
+import os
+import random
+import threading
+import time
 
 def seed_data():
+    init_db()
     db = SessionLocal()
     
     # 1. Seed Users
@@ -47,10 +64,360 @@ def seed_data():
             venue_id=venue.id
         )
         db.add(event)
+        db.flush()
+        create_counter(db, event.id)
+        event_search.index_events(db, [event.id])
 
     db.commit()
     db.close()
     print("Seeding completed successfully!")
 
+
+# Synthetic dataset for load tests and perf work (python -m app.seed --dataset).
+# Per-event rows (seats, orders, tickets, refund requests, entry logs) are
+# generated in worker processes, each event from its own random.Random, and
+# written by this process in event order with ids assigned as they go, so the
+# result is the same for a given seed whatever the number of workers. Rows are
+# plain tuples written with the driver's executemany; the bulk tables'
+# secondary indexes are dropped for the load and rebuilt afterwards.
+SEED_CHUNK_SIZE = 20000
+SEED_PASSWORD = "password"  # every seeded user; hashed once
+SEATS_PER_ROW = 25
+ROWS_PER_SECTION = 20
+CATEGORIES = ["Music", "Sports", "Technology", "Comedy", "Theatre", "Family"]
+CITIES = ["New York", "London", "Mumbai", "Berlin", "Tokyo", "Sydney", "Toronto", "Sao Paulo"]
+# Share of events kept free of orders: the on-sale events booking storms hit.
+ON_SALE_EVENT_SHARE = 0.02
+# Every PAST_EVENT_EVERY-th event is in the past and closed; its confirmed
+# tickets were scanned at the gate (used, with an entry log).
+PAST_EVENT_EVERY = 10
+REFUNDED_ORDER_SHARE = 0.04
+CANCELLED_ORDER_SHARE = 0.01
+PENDING_REFUND_SHARE = 0.01  # of confirmed orders
+NO_SHOW_SHARE = 0.05  # confirmed tickets of past events never scanned
+SUPPORT_CASES_PER_ORDER = 0.05
+# Events handed to the workers ahead of the writer; bounds memory.
+EVENTS_IN_FLIGHT_PER_WORKER = 2
+
+# Column order of the generated tuples.
+SEED_COLUMNS = {
+    "users": ("id", "name", "email", "password", "role"),
+    "venues": ("id", "name", "city", "address", "total_capacity"),
+    "events": ("id", "name", "category", "event_date", "ticket_price", "max_tickets_per_user", "status", "venue_id"),
+    "event_counters": ("event_id", "seats_total", "seats_booked", "confirmed_revenue", "refunds_approved", "refunded_amount"),
+    "seats": ("id", "event_id", "seat_number", "status"),
+    "orders": ("id", "user_id", "event_id", "total_amount", "payment_mode", "order_status", "booking_time"),
+    "tickets": ("id", "order_id", "seat_id", "ticket_code", "status", "generated_at"),
+    "refund_requests": ("id", "order_id", "reason", "status", "resolution_note"),
+    "entry_logs": ("id", "ticket_id", "validated_by", "validation_time", "status"),
+    "support_cases": ("id", "user_id", "subject", "description", "status", "resolution_note"),
+}
+# Tables whose secondary indexes are rebuilt after the load.
+BULK_TABLES = ("seats", "orders", "tickets", "refund_requests", "entry_logs", "support_cases")
+
+
+class EventPlan(NamedTuple):
+    seed: int
+    index: int
+    event_id: int
+    seat_base: int
+    seats: int
+    orders: int
+    price: float
+    event_date: datetime.datetime
+    past: bool
+    customers: Tuple[int, int]  # first id, count
+    entry_managers: Tuple[int, int]
+    now: datetime.datetime
+    text_dates: bool  # SQLite: dates as the text SQLAlchemy would store
+
+
+def seed_emails(role: UserRole) -> str:
+    # Seeded users are "<prefix><n>@seed.local", n counting from 0 per role.
+    return {
+        UserRole.ADMIN: "admin", UserRole.ORGANIZER: "organizer", UserRole.CUSTOMER: "customer",
+        UserRole.ENTRY_MANAGER: "entry", UserRole.SUPPORT: "support",
+    }[role] + "{}@seed.local"
+
+
+def seat_sections(seat_count: int) -> list:
+    # "A".."Z", then "AA".. sections of ROWS_PER_SECTION rows; the last one is
+    # cut short by islice() in generate_event.
+    per_section = ROWS_PER_SECTION * SEATS_PER_ROW
+    sections = []
+    for n in range(-(-seat_count // per_section)):
+        name = ""
+        n += 1
+        while n:
+            n, rest = divmod(n - 1, 26)
+            name = chr(65 + rest) + name
+        sections.append(SeatSection(name=name, rows=ROWS_PER_SECTION, seats_per_row=SEATS_PER_ROW))
+    return sections
+
+
+def _sqlite_datetime(value: datetime.datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def _uuid4_text(bits: int) -> str:
+    # str(uuid.UUID(int=bits, version=4)) without building the UUID object.
+    bits = (bits & ~(0xF000 << 64) | (4 << 76)) & ~(0xC000 << 48) | (0x8000 << 48)
+    h = f"{bits:032x}"
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def generate_event(plan: EventPlan) -> dict:
+    # Runs in a worker. Orders, tickets and entry logs carry event-local ids
+    # (their position in this event's lists); the writer turns them into row ids.
+    rng = random.Random(f"{plan.seed}:{plan.index}")
+    date = _sqlite_datetime if plan.text_dates else (lambda value: value)
+    generated_at = date(plan.now)
+    first_customer, customers = plan.customers
+    first_entry_manager, entry_managers = plan.entry_managers
+    # Enum .value lookups are a measurable share of the loop; take them once.
+    confirmed, cancelled, refunded = OrderStatus.CONFIRMED.value, OrderStatus.CANCELLED.value, OrderStatus.REFUNDED.value
+    active, used, ticket_cancelled = TicketStatus.ACTIVE.value, TicketStatus.USED.value, TicketStatus.CANCELLED.value
+    approved, pending = RefundStatus.APPROVED.value, RefundStatus.PENDING.value
+    sold_until = min(plan.now, plan.event_date)
+    orders, tickets, refunds, entry_logs = [], [], [], []
+    booked = bytearray(plan.seats)
+    counter = {"seats_booked": 0, "confirmed_revenue": 0.0, "refunds_approved": 0, "refunded_amount": 0.0}
+    offset = 0
+    for local_order in range(plan.orders):
+        quantity = min(rng.choice((1, 1, 2, 2, 2, 3, 4, 4)), plan.seats - offset)
+        if quantity <= 0:
+            break  # sold out; the rest of this event's share is dropped
+        roll = rng.random()
+        if roll < REFUNDED_ORDER_SHARE:
+            status = refunded
+        elif roll < REFUNDED_ORDER_SHARE + CANCELLED_ORDER_SHARE:
+            status = cancelled
+        else:
+            status = confirmed
+        amount = plan.price * quantity
+        booking_time = sold_until - datetime.timedelta(seconds=rng.randrange(60 * 86400))
+        orders.append((local_order, first_customer + rng.randrange(customers), plan.event_id, amount,
+                       rng.choice(("Card", "UPI", "Wallet")), status, date(booking_time)))
+        if status == refunded:
+            counter["refunds_approved"] += 1
+            counter["refunded_amount"] += amount
+            refunds.append((local_order, "Can't attend", approved, "Approved"))
+        elif status == confirmed:
+            counter["confirmed_revenue"] += amount
+            counter["seats_booked"] += quantity
+            if not plan.past and rng.random() < PENDING_REFUND_SHARE:
+                refunds.append((local_order, "Can't attend", pending, None))
+        for n in range(offset, offset + quantity):
+            ticket_status = ticket_cancelled
+            if status == confirmed:
+                booked[n] = 1
+                ticket_status = active
+                if plan.past and rng.random() >= NO_SHOW_SHARE:
+                    ticket_status = used
+                    scanned_at = plan.event_date - datetime.timedelta(seconds=rng.randrange(2 * 3600))
+                    entry_logs.append((len(tickets), first_entry_manager + rng.randrange(entry_managers), date(scanned_at), "valid"))
+            tickets.append((local_order, plan.seat_base + n, _uuid4_text(rng.getrandbits(128)), ticket_status, generated_at))
+        offset += quantity
+
+    booked_status, available_status = SeatStatus.BOOKED.value, SeatStatus.AVAILABLE.value
+    numbers = islice(generate_seat_numbers(sections=seat_sections(plan.seats)), plan.seats)
+    seats = [
+        (plan.seat_base + n, plan.event_id, number, booked_status if booked[n] else available_status)
+        for n, number in enumerate(numbers)
+    ]
+    counter_row = (plan.event_id, plan.seats, counter["seats_booked"], counter["confirmed_revenue"],
+                   counter["refunds_approved"], counter["refunded_amount"])
+    return {"seats": seats, "orders": orders, "tickets": tickets, "refund_requests": refunds,
+            "entry_logs": entry_logs, "event_counters": [counter_row]}
+
+
+class _BulkWriter:
+    # Buffers tuples per table and writes them chunk_size at a time with the
+    # driver's executemany (no per-row SQLAlchemy parameter processing).
+    def __init__(self, db: Session, chunk_size: int):
+        self.conn = db.connection()
+        marker = "?" if self.conn.dialect.paramstyle == "qmark" else "%s"
+        self.sql = {
+            table: f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join([marker] * len(columns))})"
+            for table, columns in SEED_COLUMNS.items()
+        }
+        self.chunk_size = chunk_size
+        self.rows = {table: [] for table in SEED_COLUMNS}
+        self.counts = {}
+
+    def add(self, table: str, rows: Iterable[tuple]):
+        buffer = self.rows[table]
+        buffer.extend(rows)
+        if len(buffer) >= self.chunk_size:
+            self.flush(table)
+
+    def flush(self, table: str = None):
+        for name in [table] if table else list(self.rows):
+            rows = self.rows[name]
+            if rows:
+                self.conn.exec_driver_sql(self.sql[name], rows)
+                self.counts[name] = self.counts.get(name, 0) + len(rows)
+                self.rows[name] = []
+
+
+def _next_id(db: Session, model) -> int:
+    return (db.scalar(select(func.max(model.id))) or 0) + 1
+
+
+def _reset_sequences(db: Session, models):
+    # Explicit ids leave PostgreSQL's serial sequences behind; SQLite needs nothing.
+    if db.bind.dialect.name != "postgresql":
+        return
+    for model in models:
+        table = model.__tablename__
+        db.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT COALESCE(MAX(id), 1) FROM {table}))"))
+
+
+def _bounded(plans: List[EventPlan], slots: threading.Semaphore):
+    # Feeds the pool one plan per free slot; the writer frees a slot per event
+    # written, so finished events never pile up in memory.
+    for plan in plans:
+        slots.acquire()
+        yield plan
+
+
+def seed_dataset(
+    db: Session,
+    users: int = 100_000,
+    events: int = 500,
+    seats_per_event: int = 10_000,
+    orders: int = 1_000_000,
+    seed: int = 42,
+    workers: Optional[int] = None,
+    chunk_size: int = SEED_CHUNK_SIZE,
+) -> dict:
+    rng = random.Random(seed)
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+    text_dates = db.bind.dialect.name == "sqlite"
+    date = _sqlite_datetime if text_dates else (lambda value: value)
+    writer = _BulkWriter(db, chunk_size)
+    password = get_password_hash(SEED_PASSWORD)
+
+    # Users: a few staff per thousand, the rest customers.
+    staff = {
+        UserRole.ADMIN: 1,
+        UserRole.ORGANIZER: max(1, users // 1000),
+        UserRole.ENTRY_MANAGER: max(1, users // 500),
+        UserRole.SUPPORT: max(1, users // 1000),
+    }
+    staff[UserRole.CUSTOMER] = max(1, users - sum(staff.values()))
+    user_id = _next_id(db, User)
+    first_ids = {}
+    for role, count in staff.items():
+        email, name = seed_emails(role), role.value.title()
+        first_ids[role] = user_id
+        writer.add("users", ((user_id + n, f"{name} {n}", email.format(n), password, role.value) for n in range(count)))
+        user_id += count
+    customers = (first_ids[UserRole.CUSTOMER], staff[UserRole.CUSTOMER])
+
+    venue_id = _next_id(db, Venue)
+    venues = range(venue_id, venue_id + max(1, events // 5))
+    writer.add("venues", ((venue, f"Seed Arena {n}", CITIES[n % len(CITIES)], f"{n} Seed Rd", seats_per_event) for n, venue in enumerate(venues)))
+
+    # Events: every PAST_EVENT_EVERY-th one is history, the last ON_SALE_EVENT_SHARE
+    # are upcoming with no orders yet, the rest are upcoming and selling. Orders
+    # (1-4 adjacent seats each) are spread over the selling events here so every
+    # event's share is fixed before the workers start.
+    event_id = _next_id(db, Event)
+    on_sale = max(1, int(events * ON_SALE_EVENT_SHARE)) if events > 1 else 0
+    selling = events - on_sale
+    per_event = [0] * events
+    for _ in range(orders if selling else 0):
+        per_event[rng.randrange(selling)] += 1
+    seat_base = _next_id(db, Seat)
+    plans = []
+    for n in range(events):
+        past = n % PAST_EVENT_EVERY == PAST_EVENT_EVERY - 1 and n < selling
+        days = -rng.randint(1, 365) if past else rng.randint(1, 180)
+        event_date = now + datetime.timedelta(days=days, hours=rng.randint(0, 23))
+        price = float(rng.choice((25, 40, 50, 75, 100, 150, 250)))
+        writer.add("events", [(event_id + n, f"Seed Event {n}", CATEGORIES[n % len(CATEGORIES)], date(event_date), price, 10,
+                               (EventStatus.CLOSED if past else EventStatus.UPCOMING).value, venues[n % len(venues)])])
+        plans.append(EventPlan(seed, n, event_id + n, seat_base + n * seats_per_event, seats_per_event, per_event[n], price,
+                               event_date, past, customers, (first_ids[UserRole.ENTRY_MANAGER], staff[UserRole.ENTRY_MANAGER]), now, text_dates))
+
+    bulk_indexes = [index for table in BULK_TABLES for index in Base.metadata.tables[table].indexes]
+    for index in bulk_indexes:
+        index.drop(bind=writer.conn, checkfirst=True)
+
+    order_id = _next_id(db, Order)
+    ticket_id = _next_id(db, Ticket)
+    refund_id = _next_id(db, RefundRequest)
+    entry_log_id = _next_id(db, EntryLog)
+    first_order = order_id
+    workers = workers or os.cpu_count() or 1
+    slots = threading.Semaphore(workers * EVENTS_IN_FLIGHT_PER_WORKER)
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        results = pool.imap(generate_event, _bounded(plans, slots)) if pool else map(generate_event, plans)
+        for result in results:
+            slots.release()
+            tickets = result["tickets"]
+            writer.add("seats", result["seats"])
+            writer.add("event_counters", result["event_counters"])
+            writer.add("orders", [(order_id + local, *row) for local, *row in result["orders"]])
+            writer.add("tickets", [(ticket_id + n, order_id + local, *row) for n, (local, *row) in enumerate(tickets)])
+            writer.add("refund_requests", [(refund_id + n, order_id + local, *row) for n, (local, *row) in enumerate(result["refund_requests"])])
+            writer.add("entry_logs", [(entry_log_id + n, ticket_id + local, *row) for n, (local, *row) in enumerate(result["entry_logs"])])
+            order_id += len(result["orders"])
+            ticket_id += len(tickets)
+            refund_id += len(result["refund_requests"])
+            entry_log_id += len(result["entry_logs"])
+    finally:
+        if pool:
+            pool.terminate()
+
+    case_id = _next_id(db, SupportCase)
+    cases = []
+    for n in range(int((order_id - first_order) * SUPPORT_CASES_PER_ORDER)):
+        status = rng.choice((SupportStatus.OPEN, SupportStatus.OPEN, SupportStatus.IN_PROGRESS, SupportStatus.CLOSED)).value
+        cases.append((case_id + n, customers[0] + rng.randrange(customers[1]), "Ticket issue", f"Seeded case {n}", status,
+                      "Resolved" if status == SupportStatus.CLOSED.value else None))
+    writer.add("support_cases", cases)
+
+    writer.flush()
+    for index in bulk_indexes:
+        index.create(bind=writer.conn)
+    event_search.rebuild_index(db)
+    _reset_sequences(db, [User, Venue, Event, Seat, Order, Ticket, RefundRequest, EntryLog, SupportCase])
+    db.commit()
+    return {
+        "seed": seed,
+        "users": sum(staff.values()),
+        "events": events,
+        "events_on_sale": list(range(event_id + selling, event_id + events)),
+        "seats": events * seats_per_event,
+        "orders": order_id - first_order,
+        "rows": writer.counts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed demo data, or a large synthetic dataset with --dataset.")
+    parser.add_argument("--dataset", action="store_true", help="bulk-generate a synthetic dataset instead of the demo rows")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--seats-per-event", type=int, default=10_000)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=None, help="generator processes (default: one per CPU)")
+    args = parser.parse_args()
+    if not args.dataset:
+        seed_data()
+        return
+    init_db()
+    db = SessionLocal()
+    started = time.perf_counter()
+    summary = seed_dataset(db, args.users, args.events, args.seats_per_event, args.orders, args.seed, args.workers)
+    db.close()
+    elapsed = time.perf_counter() - started
+    rows = sum(summary["rows"].values())
+    print(f"Seeded {rows} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s): {summary['rows']}")
+
 if __name__ == "__main__":
-    seed_data()
+    main()
@@ -1,10 +1,103 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
 from fastapi import HTTPException, status
+from app.config import settings
 from app.models.models import Event, Seat, Order, Ticket, OrderStatus, TicketStatus, EventStatus, SeatStatus, User, RefundRequest, RefundStatus
+from app.services.seat_hold_service import seat_holds, SeatHold, SeatHoldConflict
+from app.services.seat_availability import seat_availability
+from app.services import change_log, event_counters
+from app.services.gate_index import gate_index
+import asyncio
 import datetime
+import time
+import uuid
+import weakref
 from typing import List
 
-def create_booking(db: Session, user_id: int, event_id: int, seat_ids: List[int], payment_mode: str):
+# Bounded retry policy for the commit step when the DB write lock is contended.
+BOOKING_MAX_ATTEMPTS = 3
+BOOKING_RETRY_BACKOFF_SECONDS = 0.05
+# Async handlers have no threadpool to cap them, so commits queue here instead
+# of hundreds of connections polling the DB write lock (busy_timeout).
+def _write_concurrency():
+    if settings.db_write_concurrency:
+        return settings.db_write_concurrency
+    return 1 if make_url(settings.database_url).get_backend_name() == "sqlite" else settings.db_pool_size
+
+# One semaphore per event loop, made on first use: an asyncio primitive binds to
+# the first loop that waits on it, so a module-level one breaks a second loop
+# (an in-process server restart, test clients, benchmark loops).
+_write_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+def _loop_write_slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    slots = _write_slots.get(loop)
+    if slots is None:
+        slots = _write_slots.setdefault(loop, asyncio.Semaphore(_write_concurrency()))
+    return slots
+
+def create_booking(db: Session, user_id: int, event_id: int, seat_ids: List[int], payment_mode: str, idempotency_key: str = None):
+    event, seat_numbers = _check_booking(db, user_id, event_id, seat_ids)
+    hold = _hold_seats(event_id, seat_ids)
+    try:
+        for attempt in range(1, BOOKING_MAX_ATTEMPTS + 1):
+            try:
+                return _commit_booking(db, user_id, event, seat_ids, seat_numbers, payment_mode, idempotency_key)
+            except OperationalError:
+                db.rollback()
+                if attempt == BOOKING_MAX_ATTEMPTS:
+                    raise HTTPException(status_code=503, detail="Booking system is busy, please retry")
+                time.sleep(BOOKING_RETRY_BACKOFF_SECONDS * attempt)
+    finally:
+        seat_holds.release(hold)
+
+async def create_booking_async(db: AsyncSession, user_id: int, event_id: int, seat_ids: List[int], payment_mode: str, idempotency_key: str = None):
+    # Same rules and transaction as create_booking; the sync steps run on the
+    # async session's connection via run_sync and the backoff does not block the loop.
+    event, seat_numbers = await db.run_sync(_check_booking, user_id, event_id, seat_ids)
+    # End the read transaction so requests queued on the write slots don't pin pooled
+    # connections: the slot holder needs one again after its commit (refresh), and
+    # with the pool drained by waiters it would never get it.
+    await db.commit()
+    hold = _hold_seats(event_id, seat_ids)
+    return await _commit_held_async(db, hold, user_id, event, seat_numbers, payment_mode, idempotency_key)
+
+async def create_best_available_booking_async(db: AsyncSession, user_id: int, event_id: int, quantity: int, payment_mode: str, together: bool = True, idempotency_key: str = None):
+    # The allocator picks the front-most free seats (adjacent in one row when
+    # `together`) and holds them in one step, then the usual checks and commit run.
+    hold = await db.run_sync(seat_availability.allocate, event_id, quantity, together)
+    try:
+        # Runs with no seats too, so a missing or closed event is reported as such.
+        event, seat_numbers = await db.run_sync(_check_booking, user_id, event_id, list(hold.seat_ids) if hold else [])
+        if hold is None:
+            detail = f"No {quantity} adjacent seats available" if together else f"Fewer than {quantity} seats available"
+            raise HTTPException(status_code=409, detail=detail)
+        await db.commit()
+    except BaseException:
+        if hold is not None:
+            seat_holds.release(hold)
+        raise
+    return await _commit_held_async(db, hold, user_id, event, seat_numbers, payment_mode, idempotency_key)
+
+async def _commit_held_async(db: AsyncSession, hold: SeatHold, user_id: int, event: Event, seat_numbers: dict, payment_mode: str, idempotency_key: str = None):
+    seat_ids = list(hold.seat_ids)
+    try:
+        for attempt in range(1, BOOKING_MAX_ATTEMPTS + 1):
+            try:
+                async with _loop_write_slots():
+                    return await db.run_sync(_commit_booking, user_id, event, seat_ids, seat_numbers, payment_mode, idempotency_key)
+            except OperationalError:
+                await db.rollback()
+                if attempt == BOOKING_MAX_ATTEMPTS:
+                    raise HTTPException(status_code=503, detail="Booking system is busy, please retry")
+                await asyncio.sleep(BOOKING_RETRY_BACKOFF_SECONDS * attempt)
+    finally:
+        seat_holds.release(hold)
+
+def _check_booking(db: Session, user_id: int, event_id: int, seat_ids: List[int]):
     # Business Rules
     event = db.query(Event).get(event_id)
     if not event:
@@ -14,28 +107,54 @@ def create_booking(db: Session, user_id: int, event_id: int, seat_ids: List[int]
     if event.status != EventStatus.UPCOMING:
         raise HTTPException(status_code=400, detail="Event is not open for booking")
     
-    # 2. Ticket becomes invalid after event date (implicit check)
+    # 2. Ticket becomes invalid after event date. Checked on the loaded row, so
+    # it holds until the close_past_events job gets to the event.
     if event.event_date < datetime.datetime.utcnow():
         raise HTTPException(status_code=400, detail="Event has already passed")
 
     # 3. User cannot exceed max_tickets_per_user per event.
-    existing_orders = db.query(Order).filter(Order.user_id == user_id, Order.event_id == event_id, Order.order_status != OrderStatus.CANCELLED).all()
-    existing_ticket_count = sum(len(order.tickets) for order in existing_orders)
+    # One count instead of loading every order and then its tickets.
+    existing_ticket_count = (
+        db.query(func.count(Ticket.id))
+        .join(Order, Order.id == Ticket.order_id)
+        .filter(Order.user_id == user_id, Order.event_id == event_id, Order.order_status != OrderStatus.CANCELLED)
+        .scalar()
+    )
     if existing_ticket_count + len(seat_ids) > event.max_tickets_per_user:
         raise HTTPException(status_code=400, detail=f"Exceeds max tickets per user ({event.max_tickets_per_user})")
 
-    # 7. Seat cannot be double booked (Race condition prevention using transaction and checking status)
-    # We use db.begin_nested() or just the standard session transaction.
-    # We lock the seats for update if possible, but SQLite has limited locking. 
-    # For SQLite, a simple check within the same transaction is usually enough if serializable.
-    
-    seats = db.query(Seat).filter(Seat.id.in_(seat_ids), Seat.event_id == event_id).with_for_update().all()
+    # 7. Seat cannot be double booked.
+    # Cheap read to fail fast on unknown or already booked seats.
+    seats = db.query(Seat.id, Seat.seat_number, Seat.status).filter(Seat.id.in_(seat_ids), Seat.event_id == event_id).all()
+    seat_numbers = {seat.id: seat.seat_number for seat in seats}
     if len(seats) != len(seat_ids):
         raise HTTPException(status_code=400, detail="Some seats not found for this event")
     
     for seat in seats:
         if seat.status != SeatStatus.AVAILABLE:
             raise HTTPException(status_code=400, detail=f"Seat {seat.seat_number} is already booked")
+    return event, seat_numbers
+
+def _hold_seats(event_id: int, seat_ids: List[int]):
+    # Hold the seats in memory so concurrent requests for them are rejected
+    # here instead of queueing on the DB write lock.
+    try:
+        return seat_holds.acquire(event_id, seat_ids)
+    except SeatHoldConflict as exc:
+        raise HTTPException(status_code=409, detail=f"Seats {exc.seat_ids} are being booked by another customer, try again")
+
+def _commit_booking(db: Session, user_id: int, event: Event, seat_ids: List[int], seat_numbers: dict, payment_mode: str, idempotency_key: str = None):
+    # Conditional update: only flips seats that are still available, so a
+    # concurrent writer in another process can never cause a double booking.
+    result = db.execute(
+        update(Seat)
+        .where(Seat.id.in_(seat_ids), Seat.event_id == event.id, Seat.status == SeatStatus.AVAILABLE)
+        .values(status=SeatStatus.BOOKED)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(seat_ids):
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Some seats were booked by another customer")
 
     # Calculate total amount
     total_amount = event.ticket_price * len(seat_ids)
@@ -43,31 +162,52 @@ def create_booking(db: Session, user_id: int, event_id: int, seat_ids: List[int]
     # Create Order
     new_order = Order(
         user_id=user_id,
-        event_id=event_id,
+        event_id=event.id,
         total_amount=total_amount,
         payment_mode=payment_mode,
-        order_status=OrderStatus.CONFIRMED # Simulating payment confirmed
+        order_status=OrderStatus.CONFIRMED, # Simulating payment confirmed
+        idempotency_key=idempotency_key
     )
     db.add(new_order)
     db.flush() # Get order ID
 
-    # Update seats and create tickets
-    for seat in seats:
-        seat.status = SeatStatus.BOOKED
-        ticket = Ticket(
-            order_id=new_order.id,
-            seat_id=seat.id,
-            status=TicketStatus.ACTIVE
-        )
-        db.add(ticket)
+    # Create tickets (codes generated here so the gate index can learn them without a reload).
+    # One executemany + one id read-back: ORM add_all would issue an
+    # INSERT ... RETURNING per ticket on SQLite.
+    db.execute(insert(Ticket), [
+        {"order_id": new_order.id, "seat_id": seat_id, "ticket_code": str(uuid.uuid4()), "status": TicketStatus.ACTIVE}
+        for seat_id in seat_ids
+    ])
+    new_tickets = [
+        (row.id, row.ticket_code, seat_numbers[row.seat_id])
+        for row in db.query(Ticket.id, Ticket.ticket_code, Ticket.seat_id).filter(Ticket.order_id == new_order.id)
+    ]
 
+    event_counters.apply_delta(db, event.id, seats_booked=len(seat_ids), confirmed_revenue=total_amount)
+    change_log.record(db, [change_log.entry(
+        "order.confirmed", new_order.id, event.id,
+        user_id=user_id, total_amount=total_amount, payment_mode=payment_mode,
+        tickets=[{"id": ticket_id, "ticket_code": code, "seat_number": seat_number} for ticket_id, code, seat_number in new_tickets],
+    )])
     db.commit()
+    seat_availability.mark_booked(event.id, seat_ids)
+    gate_index.add_tickets(event.id, new_tickets)
     db.refresh(new_order)
     return new_order
 
 def process_refund(db: Session, refund_request_id: int, status: RefundStatus, note: str):
     # Rule 5: If refund approved: Order=refunded, Seat=available, Ticket=cancelled
-    refund_req = db.query(RefundRequest).get(refund_request_id)
+    # Load the whole refund graph up front: order + event in one join, then all
+    # tickets with their seats in one extra SELECT, whatever the order size.
+    refund_req = (
+        db.query(RefundRequest)
+        .options(
+            joinedload(RefundRequest.order).joinedload(Order.event),
+            joinedload(RefundRequest.order).selectinload(Order.tickets).joinedload(Ticket.seat),
+        )
+        .filter(RefundRequest.id == refund_request_id)
+        .first()
+    )
     if not refund_req:
         raise HTTPException(status_code=404, detail="Refund request not found")
     
@@ -76,23 +216,61 @@ def process_refund(db: Session, refund_request_id: int, status: RefundStatus, no
     
     order = refund_req.order
     event = order.event
+    if status == RefundStatus.APPROVED and order.order_status != OrderStatus.CONFIRMED:
+        # E.g. already refunded by the mass refund of a cancelled event.
+        raise HTTPException(status_code=400, detail=f"Order is {order.order_status}, nothing to refund")
 
     # Rule 4: Refund allowed only before event_date.
     if event.event_date < datetime.datetime.utcnow():
         refund_req.status = RefundStatus.REJECTED
         refund_req.resolution_note = "Event date passed. Refund not allowed."
+        change_log.record(db, [change_log.entry("refund.rejected", refund_req.id, event.id, order_id=order.id, resolution_note=refund_req.resolution_note)])
         db.commit()
         raise HTTPException(status_code=400, detail="Refund not allowed after event date")
 
     refund_req.status = status
     refund_req.resolution_note = note
 
+    released_seat_ids = []
+    cancelled_ticket_ids = []
+    changes = [change_log.entry(f"refund.{status.value}", refund_req.id, event.id, order_id=order.id, resolution_note=note)]
     if status == RefundStatus.APPROVED:
-        order.order_status = OrderStatus.REFUNDED
+        # Conditional, like refund_chunk: a mass refund committing this order in
+        # the meantime must not have its counters, seats and tickets applied twice.
+        result = db.execute(
+            update(Order)
+            .where(Order.id == order.id, Order.order_status == OrderStatus.CONFIRMED)
+            .values(order_status=OrderStatus.REFUNDED)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            db.rollback()
+            raise HTTPException(status_code=400, detail="Order is no longer confirmed, nothing to refund")
         for ticket in order.tickets:
             ticket.status = TicketStatus.CANCELLED
+            cancelled_ticket_ids.append(ticket.id)
             seat = ticket.seat
             seat.status = SeatStatus.AVAILABLE
-    
+            released_seat_ids.append(seat.id)
+        event_counters.apply_delta(
+            db, event.id,
+            seats_booked=-len(released_seat_ids),
+            confirmed_revenue=-order.total_amount,
+            refunds_approved=1,
+            refunded_amount=order.total_amount,
+        )
+        changes.append(change_log.entry(
+            "order.refunded", order.id, event.id,
+            total_amount=order.total_amount, ticket_ids=cancelled_ticket_ids, refund_request_id=refund_req.id,
+        ))
+    change_log.record(db, changes)
     db.commit()
+    if released_seat_ids:
+        seat_availability.mark_available(event.id, released_seat_ids)
+    gate_index.set_status(cancelled_ticket_ids, TicketStatus.CANCELLED.value)
     return refund_req
+
+async def process_refund_async(db: AsyncSession, refund_request_id: int, status: RefundStatus, note: str):
+    # The refund walks order -> tickets -> seats; run_sync lets those loads
+    # happen on the async connection.
+    return await db.run_sync(process_refund, refund_request_id, status, note)
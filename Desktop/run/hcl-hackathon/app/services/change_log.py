@@ -0,0 +1,156 @@
+import datetime
+import json
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.models import ChangeLogConsumer, ChangeLogEntry
+
+# Transactional outbox: bookings, refunds, ticket scans and event status
+# changes append entries here before their commit, so an entry exists exactly
+# when its change does. Downstream consumers (email, analytics, accounting)
+# read entries in sequence order in batches and acknowledge a position,
+# instead of re-scanning orders/tickets/refund_requests. Delivery is at least
+# once: a consumer that fails before acknowledging gets the batch again.
+#
+# Topics:
+#   order.confirmed        a booking: amount, payment mode, tickets and seats
+#   order.refunded         approved refund or mass refund: amount, ticket ids
+#   order.expired          pending order cancelled by expire_pending_orders
+#                          (not scheduled until orders can be pending)
+#   refund.approved        refund request resolved (also when a mass refund
+#   refund.rejected        approves it)
+#   ticket.used            entry recorded at a gate
+#   event.status_changed   status and previous status
+DEFAULT_BATCH_SIZE = 500
+MAX_BATCH_SIZE = 5000
+CHANGE_LOG_RETENTION_DAYS = 7  # acknowledged entries are kept this long for replays
+# Ids are taken at insert but become visible at commit, which on a server
+# database is not always in id order. A gap younger than this may still fill
+# in, so a read stops before it; an older one is a rolled-back transaction.
+GAP_SETTLE_SECONDS = 5.0
+
+
+def entry(topic: str, entity_id: int, event_id: Optional[int] = None, **payload) -> dict:
+    return {
+        "topic": topic,
+        "entity_id": entity_id,
+        "event_id": event_id,
+        "payload": json.dumps(payload, separators=(",", ":"), default=str),
+        "created_at": datetime.datetime.utcnow(),
+    }
+
+
+def record(db: Session, entries: List[dict]):
+    # Call before commit, like event_counters.apply_delta. One executemany
+    # whatever the number of entries.
+    if entries:
+        db.execute(insert(ChangeLogEntry), entries)
+
+
+def head(db: Session) -> int:
+    return db.scalar(select(func.max(ChangeLogEntry.id))) or 0
+
+
+def read(db: Session, after: int, limit: int, topics: Optional[List[str]] = None) -> Tuple[List[dict], int]:
+    # Entries after `after` in sequence order, and the position they bring the
+    # reader to. Topic filters (prefixes, e.g. "order.") apply after the scan,
+    # so the position moves past skipped entries too.
+    rows = db.execute(
+        select(ChangeLogEntry.id, ChangeLogEntry.created_at, ChangeLogEntry.topic, ChangeLogEntry.entity_id, ChangeLogEntry.event_id, ChangeLogEntry.payload)
+        .where(ChangeLogEntry.id > after)
+        .order_by(ChangeLogEntry.id)
+        .limit(limit)
+    ).all()
+    settled = datetime.datetime.utcnow() - datetime.timedelta(seconds=GAP_SETTLE_SECONDS)
+    entries = []
+    position = after
+    for row in rows:
+        if row.id != position + 1 and row.created_at > settled:
+            break
+        position = row.id
+        if topics and not row.topic.startswith(tuple(topics)):
+            continue
+        entries.append({
+            "id": row.id,
+            "created_at": row.created_at,
+            "topic": row.topic,
+            "entity_id": row.entity_id,
+            "event_id": row.event_id,
+            "payload": json.loads(row.payload),
+        })
+    return entries, position
+
+
+def batch(db: Session, after: int, limit: int, topics: Optional[List[str]] = None) -> dict:
+    entries, position = read(db, after, limit, topics)
+    return {"position": position, "head": head(db), "entries": entries}
+
+
+def _consumer(db: Session, name: str) -> ChangeLogConsumer:
+    consumer = db.get(ChangeLogConsumer, name)
+    if consumer is not None:
+        return consumer
+    # New consumers start from the oldest retained entry.
+    try:
+        db.add(ChangeLogConsumer(name=name, position=0))
+        db.commit()
+    except IntegrityError:
+        db.rollback()  # registered concurrently
+    return db.get(ChangeLogConsumer, name)
+
+
+def consumer_batch(db: Session, name: str, limit: int, topics: Optional[List[str]] = None) -> dict:
+    # Does not move the checkpoint; ack() does once the batch is processed.
+    consumer = _consumer(db, name)
+    return {"consumer": name, "checkpoint": consumer.position, **batch(db, consumer.position, limit, topics)}
+
+
+def _describe(consumer: ChangeLogConsumer, last: int) -> dict:
+    return {"name": consumer.name, "position": consumer.position, "lag": last - consumer.position, "created_at": consumer.created_at, "updated_at": consumer.updated_at}
+
+
+def ack(db: Session, name: str, position: int) -> dict:
+    last = head(db)
+    if position > last:
+        raise HTTPException(status_code=400, detail="Position is past the end of the change log")
+    consumer = _consumer(db, name)
+    # Conditional, so a late ack from a retried batch never moves it back.
+    db.execute(
+        update(ChangeLogConsumer)
+        .where(ChangeLogConsumer.name == name, ChangeLogConsumer.position < position)
+        .values(position=position, updated_at=datetime.datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    db.refresh(consumer)
+    return _describe(consumer, last)
+
+
+def list_consumers(db: Session) -> List[dict]:
+    last = head(db)
+    return [_describe(consumer, last) for consumer in db.query(ChangeLogConsumer).order_by(ChangeLogConsumer.name)]
+
+
+def remove_consumer(db: Session, name: str):
+    if db.execute(delete(ChangeLogConsumer).where(ChangeLogConsumer.name == name)).rowcount != 1:
+        raise HTTPException(status_code=404, detail="Consumer not found")
+    db.commit()
+
+
+def prune(db: Session, batch_size: int) -> int:
+    # Deletes up to batch_size entries older than the retention window that every
+    # consumer has acknowledged; a stalled consumer holds the log back (see lag).
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=CHANGE_LOG_RETENTION_DAYS)
+    conditions = [ChangeLogEntry.created_at < cutoff]
+    floor = db.scalar(select(func.min(ChangeLogConsumer.position)))
+    if floor is not None:
+        conditions.append(ChangeLogEntry.id <= floor)
+    ids = [row.id for row in db.query(ChangeLogEntry.id).filter(*conditions).order_by(ChangeLogEntry.id).limit(batch_size)]
+    if ids:
+        db.execute(delete(ChangeLogEntry).where(ChangeLogEntry.id.in_(ids)).execution_options(synchronize_session=False))
+        db.commit()
+    return len(ids)
@@ -0,0 +1,195 @@
+import base64
+import datetime
+import hashlib
+import secrets
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+
+from app.models.models import Event, Order, Seat, Ticket, EntryLog, TicketStatus
+from app.services import change_log
+from app.services.gate_index import gate_index
+
+# Batch and offline gate scans. A batch is resolved with one IN lookup, one
+# conditional UPDATE ... RETURNING and one executemany insert of EntryLog rows,
+# all in a single transaction.
+SCAN_LOOKUP_CHUNK_SIZE = 500
+SNAPSHOT_DIGEST_BYTES = 8
+
+
+def hash_ticket_code(salt: str, ticket_code: str) -> bytes:
+    # Truncated SHA-256 of salt + code; gate devices compute the same digest on
+    # scan and binary-search the sorted snapshot.
+    return hashlib.sha256((salt + ticket_code).encode()).digest()[:SNAPSHOT_DIGEST_BYTES]
+
+
+def _lookup_tickets(db: Session, ticket_codes: List[str]) -> dict:
+    found = {}
+    for start in range(0, len(ticket_codes), SCAN_LOOKUP_CHUNK_SIZE):
+        chunk = ticket_codes[start:start + SCAN_LOOKUP_CHUNK_SIZE]
+        rows = (
+            db.query(
+                Ticket.id, Ticket.ticket_code, Ticket.status, Order.event_id,
+                Event.name.label("event_name"), Event.event_date, Seat.seat_number,
+            )
+            .join(Order, Order.id == Ticket.order_id)
+            .join(Event, Event.id == Order.event_id)
+            .join(Seat, Seat.id == Ticket.seat_id)
+            .filter(Ticket.ticket_code.in_(chunk))
+            .all()
+        )
+        for row in rows:
+            found[row.ticket_code] = row
+    return found
+
+
+def _first_entries(db: Session, ticket_ids: List[int]) -> dict:
+    if not ticket_ids:
+        return {}
+    rows = (
+        db.query(EntryLog.ticket_id, func.min(EntryLog.validation_time))
+        .filter(EntryLog.ticket_id.in_(ticket_ids), EntryLog.status == "valid")
+        .group_by(EntryLog.ticket_id)
+        .all()
+    )
+    return {ticket_id: first for ticket_id, first in rows}
+
+
+def record_scans(
+    db: Session,
+    scans: List[Tuple[str, Optional[datetime.datetime]]],
+    validated_by: int,
+    event_id: Optional[int] = None,
+    offline: bool = False,
+) -> List[dict]:
+    # scans: (ticket_code, scanned_at). Online batches pass scanned_at=None and
+    # are checked against the current time. Offline uploads are resolved in
+    # scan-time order so the earliest scan of a ticket is the entry and every
+    # later one is a duplicate. Results come back in input order.
+    now = datetime.datetime.utcnow()
+    tickets = _lookup_tickets(db, list({code for code, _ in scans}))
+    order = sorted(range(len(scans)), key=lambda i: scans[i][1] or now) if offline else range(len(scans))
+
+    results: List[Optional[dict]] = [None] * len(scans)
+    claimed = {}  # ticket_id -> position of the scan that claims it
+    seen = set()
+    logs = []
+    for position in order:
+        code, scanned_at = scans[position]
+        scanned_at = scanned_at or now
+        ticket = tickets.get(code)
+        result = {"ticket_code": code, "is_valid": False}
+        results[position] = result
+        if ticket is None:
+            result["message"] = "Ticket not found"
+            continue
+        result["ticket_id"] = ticket.id
+        result["event_name"] = ticket.event_name
+        result["seat_number"] = ticket.seat_number
+        if event_id is not None and ticket.event_id != event_id:
+            result["message"] = "Ticket is for another event"
+            continue
+
+        if ticket.id in seen:
+            result["message"] = "Duplicate scan"
+            if offline:
+                logs.append({"ticket_id": ticket.id, "validated_by": validated_by, "validation_time": scanned_at, "status": "duplicate"})
+            continue
+        seen.add(ticket.id)
+
+        # Rule 6: Ticket becomes invalid once marked as used.
+        if ticket.status == TicketStatus.USED:
+            result["message"] = "Ticket already used"
+        elif ticket.status == TicketStatus.CANCELLED:
+            result["message"] = "Ticket is cancelled"
+        # Rule 2: Ticket becomes invalid after event date.
+        elif ticket.event_date < scanned_at:
+            result["message"] = "Event is over"
+        else:
+            claimed[ticket.id] = position
+            continue
+        if offline:
+            # The device already let this attendee in; keep the attempt for audit.
+            status = "duplicate" if ticket.status == TicketStatus.USED else "invalid"
+            logs.append({"ticket_id": ticket.id, "validated_by": validated_by, "validation_time": scanned_at, "status": status})
+
+    used_ids = []
+    if claimed:
+        # Conditional update: a ticket used by another gate since the lookup is
+        # not returned and is reported as already used.
+        used_ids = db.execute(
+            update(Ticket)
+            .where(Ticket.id.in_(list(claimed)), Ticket.status == TicketStatus.ACTIVE)
+            .values(status=TicketStatus.USED)
+            .returning(Ticket.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+    changes = []
+    for ticket_id in used_ids:
+        position = claimed.pop(ticket_id)
+        results[position]["is_valid"] = True
+        results[position]["message"] = "Ticket valid, entry recorded"
+        logs.append({"ticket_id": ticket_id, "validated_by": validated_by, "validation_time": scans[position][1] or now, "status": "valid"})
+        changes.append(change_log.entry(
+            "ticket.used", ticket_id, tickets[scans[position][0]].event_id,
+            validated_by=validated_by, used_at=scans[position][1] or now, offline=offline,
+        ))
+    for ticket_id, position in claimed.items():
+        results[position]["message"] = "Ticket already used"
+        if offline:
+            logs.append({"ticket_id": ticket_id, "validated_by": validated_by, "validation_time": scans[position][1], "status": "duplicate"})
+
+    if offline:
+        # Duplicates against entries recorded earlier: report when the first entry
+        # happened, which may be this offline scan if the device synced late.
+        duplicates = [r for r in results if r["message"] in ("Ticket already used", "Duplicate scan")]
+        first_entries = _first_entries(db, [r["ticket_id"] for r in duplicates])
+        accepted_at = {log["ticket_id"]: log["validation_time"] for log in logs if log["status"] == "valid"}
+        for position, result in enumerate(results):
+            if result["message"] == "Ticket already used":
+                entries = [first_entries.get(result["ticket_id"]), scans[position][1]]
+            elif result["message"] == "Duplicate scan":
+                entries = [first_entries.get(result["ticket_id"]), accepted_at.get(result["ticket_id"])]
+            else:
+                continue
+            entries = [entry for entry in entries if entry is not None]
+            if entries:
+                result["message"] = "Duplicate entry"
+                result["first_entry_at"] = min(entries)
+
+    if logs:
+        db.execute(insert(EntryLog), logs)
+    change_log.record(db, changes)
+    db.commit()
+    gate_index.set_status(used_ids, TicketStatus.USED.value)
+    return results
+
+
+def offline_snapshot(db: Session, event_id: int, packed: bool = False) -> Optional[dict]:
+    event = db.query(Event.id, Event.event_date).filter(Event.id == event_id).first()
+    if event is None:
+        return None
+    codes = (
+        db.query(Ticket.ticket_code)
+        .join(Order, Order.id == Ticket.order_id)
+        .filter(Order.event_id == event_id, Ticket.status == TicketStatus.ACTIVE)
+        .all()
+    )
+    # Fresh salt per snapshot so codes cannot be recovered from an old device.
+    salt = secrets.token_hex(8)
+    digests = sorted(hash_ticket_code(salt, code) for (code,) in codes)
+    snapshot = {
+        "event_id": event_id,
+        "event_date": event.event_date,
+        "generated_at": datetime.datetime.utcnow(),
+        "algorithm": "sha256",
+        "digest_bytes": SNAPSHOT_DIGEST_BYTES,
+        "salt": salt,
+        "count": len(digests),
+    }
+    if packed:
+        snapshot["packed"] = base64.b64encode(b"".join(digests)).decode("ascii")
+    else:
+        snapshot["hashes"] = [digest.hex() for digest in digests]
+    return snapshot
@@ -0,0 +1,83 @@
+from typing import Iterable, Optional
+
+from sqlalchemy import case, func, select, true, update
+from sqlalchemy.orm import Session
+
+from app.models.models import Event, EventCounter, Seat, SeatStatus, Order, OrderStatus
+
+
+def live_summary(db: Session, event_id: int) -> Optional[dict]:
+    # One statement: seat totals in a single pass over ix_seats_event_id_status,
+    # revenue and refunds as scalar subqueries over the orders index.
+    seats = (
+        select(
+            func.count(Seat.id).label("total"),
+            func.coalesce(func.sum(case((Seat.status == SeatStatus.BOOKED, 1), else_=0)), 0).label("booked"),
+        )
+        .where(Seat.event_id == event_id)
+        .subquery()
+    )
+    revenue = (
+        select(func.coalesce(func.sum(Order.total_amount), 0.0))
+        .where(Order.event_id == event_id, Order.order_status == OrderStatus.CONFIRMED)
+        .scalar_subquery()
+    )
+    refunds = (
+        select(func.count(Order.id).label("count"), func.coalesce(func.sum(Order.total_amount), 0.0).label("amount"))
+        .where(Order.event_id == event_id, Order.order_status == OrderStatus.REFUNDED)
+        .subquery()
+    )
+    row = db.execute(
+        select(Event.name, seats.c.total, seats.c.booked, revenue.label("revenue"), refunds.c.count, refunds.c.amount)
+        .select_from(Event)
+        .join(seats, true())
+        .join(refunds, true())
+        .where(Event.id == event_id)
+    ).first()
+    if row is None:
+        return None
+    return {
+        "event_name": row.name,
+        "seats_total": row.total,
+        "seats_booked": row.booked,
+        "confirmed_revenue": row.revenue,
+        "refunds_approved": row.count,
+        "refunded_amount": row.amount,
+    }
+
+
+def create_counter(db: Session, event_id: int):
+    db.add(EventCounter(event_id=event_id))
+
+
+def apply_delta(db: Session, event_id: int, **deltas):
+    # Atomic "col = col + delta"; call before commit so the counter change is part
+    # of the same transaction. Events without a counter row are served live.
+    values = {name: getattr(EventCounter, name) + delta for name, delta in deltas.items() if delta}
+    if values:
+        db.execute(
+            update(EventCounter)
+            .where(EventCounter.event_id == event_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def rebuild_counters(db: Session, event_ids: Iterable[int] = None) -> int:
+    if event_ids is None:
+        event_ids = [row.id for row in db.query(Event.id)]
+    rebuilt = 0
+    for event_id in event_ids:
+        summary = live_summary(db, event_id)
+        if summary is None:
+            continue
+        counter = db.get(EventCounter, event_id) or EventCounter(event_id=event_id)
+        counter.seats_total = summary["seats_total"]
+        counter.seats_booked = summary["seats_booked"]
+        counter.confirmed_revenue = summary["confirmed_revenue"]
+        counter.refunds_approved = summary["refunds_approved"]
+        counter.refunded_amount = summary["refunded_amount"]
+        db.add(counter)
+        rebuilt += 1
+    db.commit()
+    return rebuilt
@@ -0,0 +1,293 @@
+import bisect
+import datetime
+import re
+import threading
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from app.models.models import Event, EventStatus, Venue
+from app.utils.catalogue_cache import CATALOGUE_CACHE_TTL_SECONDS, catalogue_cache
+
+# Event search. Free text goes to the database: SQLite keeps event name,
+# category, venue name and city in an FTS5 table (rowid = event id), PostgreSQL
+# in a tsvector table with a GIN index. It is written in the same transaction
+# as the event (admin.add_event) and rebuilt wholesale after bulk loads
+# (app.seed) or when the table is first created (migrations.ensure_search_index).
+# Facet filters, date/price ranges, counts and paging run on an in-memory
+# bitset index of the upcoming events (EventFacetIndex below).
+SEARCH_TABLE = "events_search"
+MAX_QUERY_TERMS = 8
+FACET_LIMIT = 50  # values returned per facet, most frequent first
+RANGE_BLOCK = 512
+
+RESULT_COLUMNS = (Event.id, Event.name, Event.category, Event.event_date, Event.ticket_price, Event.max_tickets_per_user, Event.status, Event.venue_id)
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass
+class SearchFilters:
+    q: Optional[str] = None
+    categories: List[str] = field(default_factory=list)
+    cities: List[str] = field(default_factory=list)
+    date_from: Optional[datetime.datetime] = None
+    date_to: Optional[datetime.datetime] = None
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+
+
+def _is_sqlite(bind) -> bool:
+    return bind.dialect.name == "sqlite"
+
+
+def create_search_table(bind) -> bool:
+    # Returns True when the table was just created and still needs rebuild_index.
+    with bind.begin() as conn:
+        if _is_sqlite(conn):
+            exists = conn.exec_driver_sql(f"SELECT 1 FROM sqlite_master WHERE name = '{SEARCH_TABLE}'").first()
+            if exists:
+                return False
+            # unicode61 + remove_diacritics: "Beyonce" finds "Beyoncé"; prefix
+            # indexes make the "term*" queries below index lookups.
+            conn.exec_driver_sql(
+                f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+                "name, category, venue, city, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+            return True
+        exists = conn.execute(text("SELECT to_regclass(:name)"), {"name": SEARCH_TABLE}).scalar()
+        if exists:
+            return False
+        conn.exec_driver_sql(f"CREATE TABLE {SEARCH_TABLE} (event_id integer PRIMARY KEY REFERENCES events(id), document tsvector NOT NULL)")
+        conn.exec_driver_sql(f"CREATE INDEX ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING gin (document)")
+        return True
+
+
+def _write_documents(db: Session, where: str = ""):
+    if _is_sqlite(db.bind):
+        columns, document = "rowid, name, category, venue, city", "e.id, e.name, coalesce(e.category, ''), v.name, coalesce(v.city, '')"
+    else:
+        columns, document = "event_id, document", "e.id, to_tsvector('simple', concat_ws(' ', e.name, e.category, v.name, v.city))"
+    db.execute(text(f"INSERT INTO {SEARCH_TABLE} ({columns}) SELECT {document} FROM events e JOIN venues v ON v.id = e.venue_id {where}"))
+
+
+def index_events(db: Session, event_ids: Iterable[int]):
+    # Call before commit so the index changes with the events.
+    ids = ", ".join(str(int(event_id)) for event_id in event_ids)
+    if not ids:
+        return
+    key = "rowid" if _is_sqlite(db.bind) else "event_id"
+    db.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE {key} IN ({ids})"))
+    _write_documents(db, f"WHERE e.id IN ({ids})")
+
+
+def rebuild_index(db: Session) -> int:
+    db.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    _write_documents(db)
+    if _is_sqlite(db.bind):
+        db.execute(text(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')"))
+    return db.scalar(text(f"SELECT count(*) FROM {SEARCH_TABLE}"))
+
+
+def _terms(q: Optional[str]) -> List[str]:
+    return _TERM.findall(q or "")[:MAX_QUERY_TERMS]
+
+
+def _matching_ids(db: Session, terms: List[str]) -> List[int]:
+    # Every term must match, each as a prefix ("jaz" finds "Jazz"). Terms are
+    # runs of word characters, so they can't carry FTS/tsquery syntax. Ids
+    # come back as one comma-separated string: a result row per hit costs more
+    # than the full-text lookup itself.
+    if _is_sqlite(db.bind):
+        match = " ".join(f'"{term}"*' for term in terms)
+        stmt = text(f"SELECT group_concat(rowid) FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match").bindparams(match=match)
+    else:
+        query = " & ".join(f"'{term}':*" for term in terms)
+        stmt = text(f"SELECT string_agg(event_id::text, ',') FROM {SEARCH_TABLE} WHERE document @@ to_tsquery('simple', :query)").bindparams(query=query)
+    ids = db.execute(stmt).scalar()
+    return [int(event_id) for event_id in ids.split(",")] if ids else []
+
+
+def _naive_utc(value: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+    # Event dates are stored as naive UTC.
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _bits(positions: Iterable[int], size: int) -> int:
+    buffer = bytearray((size + 7) >> 3)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, "little")
+
+
+class RangeIndex:
+    # Positions sorted by value, plus the bitset of the first k * RANGE_BLOCK of
+    # them for every k: a range is the XOR of two prefixes, each one stored
+    # bitset plus at most RANGE_BLOCK bits set by hand.
+    def __init__(self, values: List, size: int):
+        self.order = sorted((position for position in range(size) if values[position] is not None), key=values.__getitem__)
+        self.values = [values[position] for position in self.order]
+        self.size = size
+        self.blocks = [0]
+        for start in range(0, len(self.order), RANGE_BLOCK):
+            self.blocks.append(self.blocks[-1] | _bits(self.order[start:start + RANGE_BLOCK], size))
+
+    def _prefix(self, rank: int) -> int:
+        block, extra = divmod(rank, RANGE_BLOCK)
+        if not extra:
+            return self.blocks[block]
+        return self.blocks[block] | _bits(self.order[rank - extra:rank], self.size)
+
+    def between(self, low=None, high=None, high_inclusive: bool = True) -> int:
+        low_rank = bisect.bisect_left(self.values, low) if low is not None else 0
+        if high is None:
+            high_rank = len(self.values)
+        else:
+            high_rank = (bisect.bisect_right if high_inclusive else bisect.bisect_left)(self.values, high)
+        if high_rank <= low_rank:
+            return 0
+        return self._prefix(high_rank) ^ self._prefix(low_rank)
+
+
+class FacetSnapshot:
+    # Upcoming events at one catalogue version, position i = i-th lowest id.
+    # Each facet value and range filter is a bitset over positions (Python
+    # ints), so filtering and counting a 100k-event catalogue is a handful of
+    # big-int ANDs and bit_count() calls rather than a scan.
+    def __init__(self, rows: List[tuple], version: int):
+        self.version = version
+        self.built_at = time.monotonic()
+        ids, categories, cities, dates, prices = zip(*rows) if rows else ((), (), (), (), ())
+        self.size = len(ids)
+        self.ids = array("q", ids)
+        self.positions = dict(zip(ids, range(self.size)))
+        self.all = (1 << self.size) - 1
+        self.fingerprint = (self.size, sum(ids))
+        self.facets: Dict[str, Dict[Optional[str], int]] = {}
+        for name, values in (("category", categories), ("city", cities)):
+            members: Dict[Optional[str], List[int]] = {}
+            for position, value in enumerate(values):
+                members.setdefault(value, []).append(position)
+            self.facets[name] = {value: _bits(positions, self.size) for value, positions in members.items()}
+        self.event_date = RangeIndex(dates, self.size)
+        self.ticket_price = RangeIndex(prices, self.size)
+
+    def selected(self, facet: str, values: List[str]) -> int:
+        if not values:
+            return self.all
+        bits = 0
+        for value in values:
+            bits |= self.facets[facet].get(value, 0)
+        return bits
+
+    def page(self, bits: int, after: Optional[int], count: int) -> List[int]:
+        # Event ids of the first `count` set bits past the `after` cursor.
+        start = bisect.bisect_right(self.ids, after) if after is not None else 0
+        bits >>= start
+        ids = []
+        while bits and len(ids) < count:
+            lowest = bits & -bits
+            ids.append(self.ids[start + lowest.bit_length() - 1])
+            bits ^= lowest
+        return ids
+
+    def counts(self, facet: str, bits: int) -> List[dict]:
+        counts = [(value, (bits & members).bit_count()) for value, members in self.facets[facet].items()]
+        counts.sort(key=lambda item: (-item[1], item[0] or ""))
+        return [{"value": value, "count": count} for value, count in counts[:FACET_LIMIT] if count]
+
+
+class EventFacetIndex:
+    # Rebuilt from the database when the catalogue version moves (event writes
+    # bump it, see catalogue_cache). Writes made by other worker processes don't
+    # bump this one's version, so after the catalogue cache TTL the snapshot is
+    # checked against a fingerprint of the upcoming events (count and id sum,
+    # read off ix_events_status) and rebuilt only if that changed. Events are
+    # added or change status but are not edited, so that is enough.
+    def __init__(self, ttl_seconds: float = CATALOGUE_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._snapshot: Optional[FacetSnapshot] = None
+
+    @staticmethod
+    def _fingerprint(db: Session) -> Tuple[int, int]:
+        count, id_sum = db.execute(select(func.count(), func.coalesce(func.sum(Event.id), 0)).where(Event.status == EventStatus.UPCOMING)).one()
+        return count, int(id_sum)
+
+    def rebuild(self, db: Session) -> FacetSnapshot:
+        version = catalogue_cache.version
+        # Core rows through the session's connection: no ORM result processing.
+        rows = db.connection().execute(
+            select(Event.id, Event.category, Venue.city, Event.event_date, Event.ticket_price)
+            .outerjoin(Venue, Venue.id == Event.venue_id)
+            .where(Event.status == EventStatus.UPCOMING)
+            .order_by(Event.id)
+        ).all()
+        snapshot = FacetSnapshot(rows, version)
+        with self._lock:
+            # A write during the load already bumped the version; serve this
+            # snapshot once but don't keep it.
+            if version == catalogue_cache.version:
+                self._snapshot = snapshot
+        return snapshot
+
+    def get(self, db: Session) -> FacetSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != catalogue_cache.version:
+            return self.rebuild(db)
+        if time.monotonic() - snapshot.built_at > self.ttl_seconds:
+            if self._fingerprint(db) != snapshot.fingerprint:
+                return self.rebuild(db)
+            snapshot.built_at = time.monotonic()
+        return snapshot
+
+
+facet_index = EventFacetIndex()
+
+
+def search(db: Session, filters: SearchFilters, after: Optional[int], limit: int, facets: bool = True) -> Tuple[dict, Optional[str]]:
+    # One page of upcoming events in id order (keyset: `after`) plus the next
+    # cursor, the number of matches and facet counts. Each facet is counted
+    # with every filter but its own, so picking a category still shows how many
+    # events the other categories have.
+    snapshot = facet_index.get(db)
+    base = snapshot.all
+    terms = _terms(filters.q)
+    if terms:
+        positions = snapshot.positions
+        base = _bits((positions[event_id] for event_id in _matching_ids(db, terms) if event_id in positions), snapshot.size)
+    # Events past their date stay upcoming until close_past_events runs; like the
+    # listing and booking, search leaves them out itself.
+    now = datetime.datetime.utcnow()
+    date_from = max(_naive_utc(filters.date_from), now) if filters.date_from is not None else now
+    base &= snapshot.event_date.between(date_from, _naive_utc(filters.date_to), high_inclusive=False)
+    if filters.price_min is not None or filters.price_max is not None:
+        base &= snapshot.ticket_price.between(filters.price_min, filters.price_max)
+    categories = snapshot.selected("category", filters.categories)
+    cities = snapshot.selected("city", filters.cities)
+    matches = base & categories & cities
+
+    page_ids = snapshot.page(matches, after, limit + 1)
+    next_cursor = str(page_ids[limit - 1]) if len(page_ids) > limit else None
+    rows = []
+    if page_ids:
+        rows = db.execute(
+            select(*RESULT_COLUMNS, Venue.name.label("venue_name"), Venue.city.label("city"))
+            .outerjoin(Venue, Venue.id == Event.venue_id)
+            .where(Event.id.in_(page_ids[:limit]))
+            .order_by(Event.id)
+        ).all()
+    result = {"results": [row._asdict() for row in rows], "total": None, "facets": None}
+    if facets:
+        result["total"] = matches.bit_count()
+        result["facets"] = {
+            "category": snapshot.counts("category", base & cities),
+            "city": snapshot.counts("city", base & categories),
+        }
+    return result, next_cursor
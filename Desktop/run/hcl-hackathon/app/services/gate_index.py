@@ -0,0 +1,124 @@
+import datetime
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.models.models import Event, Order, Seat, Ticket, TicketStatus
+
+# Gate mode: all tickets of an event are preloaded into memory at doors-open so
+# scans are answered from a dict lookup. The DB stays authoritative for the
+# ACTIVE -> USED transition (conditional UPDATE in entry_manager); the index is
+# flipped first so two gates scanning the same code race in memory, not in SQL.
+
+
+@dataclass
+class GateTicket:
+    id: int
+    code: str
+    event_id: int
+    event_name: str
+    event_date: datetime.datetime
+    seat_number: str
+    status: str
+
+
+@dataclass
+class _GateEvent:
+    name: str
+    event_date: datetime.datetime
+    codes: Set[str]
+
+
+class GateIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_code: Dict[str, GateTicket] = {}
+        self._by_id: Dict[int, GateTicket] = {}
+        self._events: Dict[int, _GateEvent] = {}
+
+    def warm(self, db: Session, event_id: int) -> Optional[int]:
+        event = db.query(Event.id, Event.name, Event.event_date).filter(Event.id == event_id).first()
+        if event is None:
+            return None
+        rows = (
+            db.query(Ticket.id, Ticket.ticket_code, Ticket.status, Seat.seat_number)
+            .join(Order, Order.id == Ticket.order_id)
+            .join(Seat, Seat.id == Ticket.seat_id)
+            .filter(Order.event_id == event_id)
+            .all()
+        )
+        tickets = [
+            GateTicket(row.id, row.ticket_code, event_id, event.name, event.event_date, row.seat_number, row.status)
+            for row in rows
+        ]
+        with self._lock:
+            self._drop_locked(event_id)
+            self._events[event_id] = _GateEvent(event.name, event.event_date, set())
+            for ticket in tickets:
+                self._add_locked(ticket)
+        return len(tickets)
+
+    def drop(self, event_id: int) -> bool:
+        with self._lock:
+            return self._drop_locked(event_id)
+
+    def _drop_locked(self, event_id: int) -> bool:
+        gate_event = self._events.pop(event_id, None)
+        if gate_event is None:
+            return False
+        for code in gate_event.codes:
+            ticket = self._by_code.pop(code, None)
+            if ticket is not None:
+                self._by_id.pop(ticket.id, None)
+        return True
+
+    def _add_locked(self, ticket: GateTicket):
+        self._by_code[ticket.code] = ticket
+        self._by_id[ticket.id] = ticket
+        self._events[ticket.event_id].codes.add(ticket.code)
+
+    def is_warm(self, event_id: int) -> bool:
+        return event_id in self._events
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {str(event_id): len(gate_event.codes) for event_id, gate_event in self._events.items()}
+
+    def get(self, code: str) -> Optional[GateTicket]:
+        return self._by_code.get(code)
+
+    def claim(self, code: str) -> Optional[str]:
+        # Atomically flip ACTIVE -> USED in memory. Returns the previous status
+        # (only "active" means the caller won), or None when the code is unknown.
+        with self._lock:
+            ticket = self._by_code.get(code)
+            if ticket is None:
+                return None
+            previous = ticket.status
+            if previous == TicketStatus.ACTIVE:
+                ticket.status = TicketStatus.USED.value
+            return previous
+
+    def set_status(self, ticket_ids: Iterable[int], status: str):
+        with self._lock:
+            for ticket_id in ticket_ids:
+                ticket = self._by_id.get(ticket_id)
+                if ticket is not None:
+                    ticket.status = status
+
+    def add_tickets(self, event_id: int, tickets: Iterable[tuple]):
+        # (ticket_id, code, seat_number) for tickets created while the gates are open.
+        with self._lock:
+            gate_event = self._events.get(event_id)
+            if gate_event is None:
+                return
+            for ticket_id, code, seat_number in tickets:
+                self._add_locked(GateTicket(
+                    ticket_id, code, event_id, gate_event.name, gate_event.event_date,
+                    seat_number, TicketStatus.ACTIVE.value,
+                ))
+
+
+gate_index = GateIndex()
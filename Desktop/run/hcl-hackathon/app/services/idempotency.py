@@ -0,0 +1,115 @@
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Hashable, Tuple
+
+from fastapi import HTTPException
+
+# Idempotency-Key support for POST endpoints. Completed responses are kept as
+# (fingerprint, status, JSON bytes) for a TTL and replayed without running the
+# handler again; a duplicate that arrives while the first request is still
+# running awaits the same future instead of starting a second transaction.
+# Per process: the orders.idempotency_key unique index covers retries that land
+# on another worker or after a restart.
+IDEMPOTENCY_TTL_SECONDS = 24 * 3600.0
+IDEMPOTENCY_MAX_ENTRIES = 50000
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    fingerprint: str
+    status_code: int
+    body: bytes
+    expires_at: float
+
+
+def is_replayable(status_code: int) -> bool:
+    # Transient outcomes (missing or invalid admission token, seat hold
+    # conflicts, overload, server errors) are not stored, so a retry with the
+    # same key gets a fresh attempt. The admission token is checked inside the
+    # stored call rather than before it: a retry of an order that went through
+    # has no token left and must still replay the order.
+    return status_code < 500 and status_code not in (401, 403, 409, 429)
+
+
+class IdempotencyStore:
+    def __init__(self, ttl_seconds: float = IDEMPOTENCY_TTL_SECONDS, max_entries: int = IDEMPOTENCY_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._done: "OrderedDict[Hashable, StoredResponse]" = OrderedDict()
+        self._inflight: Dict[Hashable, Tuple[str, asyncio.Future]] = {}
+        self.executed = 0
+        self.replayed = 0
+        self.coalesced = 0
+
+    def _check(self, fingerprint: str, stored_fingerprint: str):
+        if fingerprint != stored_fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+
+    async def run(self, key: Hashable, fingerprint: str, compute: Callable[[], Awaitable[Tuple[int, bytes]]]) -> Tuple[int, bytes, bool]:
+        # Returns (status_code, body, replayed).
+        now = time.monotonic()
+        with self._lock:
+            stored = self._done.get(key)
+            if stored is not None and stored.expires_at <= now:
+                del self._done[key]
+                stored = None
+            if stored is not None:
+                self._check(fingerprint, stored.fingerprint)
+                self.replayed += 1
+                return stored.status_code, stored.body, True
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                future = asyncio.get_running_loop().create_future()
+                self._inflight[key] = (fingerprint, future)
+            else:
+                self._check(fingerprint, inflight[0])
+                self.coalesced += 1
+
+        if inflight is not None:
+            outcome = await asyncio.shield(inflight[1])
+            if isinstance(outcome, BaseException):
+                raise outcome
+            return outcome[0], outcome[1], True
+
+        try:
+            try:
+                status_code, body = await compute()
+            except HTTPException as exc:
+                status_code, body = exc.status_code, json.dumps({"detail": exc.detail}).encode()
+        except BaseException as exc:
+            # Waiters see the same failure; nothing is stored so a later retry runs again.
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_result(exc)
+            raise
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            self.executed += 1
+            if is_replayable(status_code):
+                self._done[key] = StoredResponse(fingerprint, status_code, body, time.monotonic() + self.ttl_seconds)
+                self._done.move_to_end(key)
+                while len(self._done) > self.max_entries:
+                    self._done.popitem(last=False)
+        future.set_result((status_code, body))
+        return status_code, body, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._done),
+                "in_flight": len(self._inflight),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "executed": self.executed,
+                "replayed": self.replayed,
+                "coalesced": self.coalesced,
+            }
+
+
+idempotency_store = IdempotencyStore()
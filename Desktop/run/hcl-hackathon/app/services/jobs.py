@@ -0,0 +1,359 @@
+import datetime
+import json
+import logging
+import os
+import socket
+import threading
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.models import (
+    EntryLog, EntryLogArchive, Event, EventStatus, Job, Order, OrderStatus,
+    Seat, SeatStatus, Ticket, TicketStatus,
+)
+from app.services import change_log, event_counters
+from app.services.gate_index import gate_index
+from app.services.seat_availability import seat_availability
+from app.services.seat_hold_service import seat_holds
+from app.utils.catalogue_cache import catalogue_cache
+
+# In-process scheduler for the time-based work request handlers used to do (or
+# never did): closing past events, sweeping seat holds, archiving old entry logs
+# and pruning the change log. Each worker
+# process runs one thread that wakes every TICK_SECONDS. DB jobs are claimed
+# through a lease on their `jobs` row, so with several processes each run
+# happens once; a worker that dies mid-run loses the lease after LEASE_SECONDS
+# and another one takes over.
+TICK_SECONDS = 1.0
+LEASE_SECONDS = 300.0
+PENDING_ORDER_TTL_MINUTES = 15
+ENTRY_LOG_RETENTION_DAYS = 90
+BATCH_SIZE = 5000
+# Batch jobs stop after this many batches and ask to run again right away, so a
+# run stays well inside its lease.
+MAX_BATCHES_PER_RUN = 20
+
+logger = logging.getLogger("app.jobs")
+
+
+@dataclass
+class JobSpec:
+    name: str
+    interval_seconds: float
+    func: Callable[[Session], dict]  # returns a JSON-able result; {"more": True} reschedules immediately
+    leased: bool = True  # False: per-process work on in-memory state, runs in every worker
+
+
+def close_past_events(db: Session) -> dict:
+    # Bookings and the listing still check event_date themselves; this keeps
+    # status (and with it search, counters and summaries) in line with the clock.
+    now = datetime.datetime.utcnow()
+    event_ids = [row.id for row in db.query(Event.id).filter(Event.status == EventStatus.UPCOMING, Event.event_date <= now)]
+    if not event_ids:
+        return {"closed": 0}
+    closed = db.execute(
+        update(Event)
+        .where(Event.id.in_(event_ids), Event.status == EventStatus.UPCOMING)
+        .values(status=EventStatus.CLOSED)
+        .returning(Event.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    change_log.record(db, [
+        change_log.entry("event.status_changed", event_id, event_id, status=EventStatus.CLOSED.value, previous_status=EventStatus.UPCOMING.value)
+        for event_id in closed
+    ])
+    db.commit()
+    catalogue_cache.bump()
+    for event_id in closed:
+        seat_availability.invalidate(event_id)
+    return {"closed": len(closed)}
+
+
+def expire_pending_orders(db: Session) -> dict:
+    # Orders stuck in pending past the TTL are cancelled; any seats they took are
+    # released in the same transaction, like a refund without the money.
+    # Not in DEFAULT_JOBS: bookings commit as confirmed, so no order is pending
+    # yet. A payment flow that leaves orders pending should schedule it.
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(minutes=PENDING_ORDER_TTL_MINUTES)
+    expired = 0
+    for _ in range(MAX_BATCHES_PER_RUN):
+        orders = db.query(Order.id, Order.event_id).filter(Order.order_status == OrderStatus.PENDING, Order.booking_time < cutoff).limit(BATCH_SIZE).all()
+        order_ids = [order.id for order in orders]
+        if not order_ids:
+            return {"expired": expired}
+        # Only orders still pending at the update are cancelled and counted; one
+        # that moved on since the read keeps its seats and tickets.
+        cancelled = set(db.execute(
+            update(Order)
+            .where(Order.id.in_(order_ids), Order.order_status == OrderStatus.PENDING)
+            .values(order_status=OrderStatus.CANCELLED)
+            .returning(Order.id)
+            .execution_options(synchronize_session=False)
+        ).scalars())
+        tickets = (
+            db.query(Ticket.id, Ticket.seat_id, Ticket.order_id, Order.event_id)
+            .join(Order, Order.id == Ticket.order_id)
+            .filter(Ticket.order_id.in_(cancelled), Ticket.status != TicketStatus.CANCELLED)
+            .all()
+        )
+        db.execute(
+            update(Seat)
+            .where(Seat.id.in_(select(Ticket.seat_id).where(Ticket.order_id.in_(cancelled), Ticket.status != TicketStatus.CANCELLED)))
+            .values(status=SeatStatus.AVAILABLE)
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(
+            update(Ticket)
+            .where(Ticket.order_id.in_(cancelled), Ticket.status != TicketStatus.CANCELLED)
+            .values(status=TicketStatus.CANCELLED)
+            .execution_options(synchronize_session=False)
+        )
+        released = defaultdict(list)
+        ticket_ids = defaultdict(list)
+        for ticket in tickets:
+            released[ticket.event_id].append(ticket.seat_id)
+            ticket_ids[ticket.order_id].append(ticket.id)
+        for event_id, seat_ids in released.items():
+            event_counters.apply_delta(db, event_id, seats_booked=-len(seat_ids))
+        change_log.record(db, [
+            change_log.entry("order.expired", order.id, order.event_id, ticket_ids=ticket_ids[order.id])
+            for order in orders if order.id in cancelled
+        ])
+        db.commit()
+        for event_id, seat_ids in released.items():
+            seat_availability.mark_available(event_id, seat_ids)
+        gate_index.set_status([ticket.id for ticket in tickets], TicketStatus.CANCELLED.value)
+        expired += len(cancelled)
+        if len(order_ids) < BATCH_SIZE:
+            return {"expired": expired}
+    return {"expired": expired, "more": True}
+
+
+def archive_entry_logs(db: Session) -> dict:
+    # Moves entry logs older than the retention window to entry_logs_archive,
+    # BATCH_SIZE rows per transaction, oldest first off ix_entry_logs_validation_time
+    # (so a run with nothing to archive doesn't read the whole table).
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=ENTRY_LOG_RETENTION_DAYS)
+    columns = [EntryLog.id, EntryLog.ticket_id, EntryLog.validated_by, EntryLog.validation_time, EntryLog.status]
+    archived = 0
+    for _ in range(MAX_BATCHES_PER_RUN):
+        log_ids = [row.id for row in db.query(EntryLog.id).filter(EntryLog.validation_time < cutoff).order_by(EntryLog.validation_time).limit(BATCH_SIZE)]
+        if not log_ids:
+            return {"archived": archived}
+        db.execute(
+            insert(EntryLogArchive).from_select(
+                ["id", "ticket_id", "validated_by", "validation_time", "status"],
+                select(*columns).where(EntryLog.id.in_(log_ids)),
+            )
+        )
+        db.execute(delete(EntryLog).where(EntryLog.id.in_(log_ids)).execution_options(synchronize_session=False))
+        db.commit()
+        archived += len(log_ids)
+        if len(log_ids) < BATCH_SIZE:
+            return {"archived": archived}
+    return {"archived": archived, "more": True}
+
+
+def prune_change_log(db: Session) -> dict:
+    # Drops change log entries past retention that every consumer has acknowledged.
+    pruned = 0
+    for _ in range(MAX_BATCHES_PER_RUN):
+        batch = change_log.prune(db, BATCH_SIZE)
+        pruned += batch
+        if batch < BATCH_SIZE:
+            return {"pruned": pruned}
+    return {"pruned": pruned, "more": True}
+
+
+def sweep_seat_holds(db: Session) -> dict:
+    # Holds of crashed or timed-out requests; they expire on their own, this
+    # just frees the memory.
+    return {"swept": seat_holds.sweep_expired()}
+
+
+DEFAULT_JOBS = [
+    JobSpec("close_past_events", 60.0, close_past_events),
+    JobSpec("archive_entry_logs", 3600.0, archive_entry_logs),
+    JobSpec("prune_change_log", 3600.0, prune_change_log),
+    JobSpec("sweep_seat_holds", 30.0, sweep_seat_holds, leased=False),
+]
+
+
+class JobRunner:
+    def __init__(self, specs: List[JobSpec] = DEFAULT_JOBS):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._specs: Dict[str, JobSpec] = {spec.name: spec for spec in specs}
+        now = datetime.datetime.utcnow()
+        self._local: Dict[str, dict] = {  # state of the unleased jobs, per process
+            spec.name: {"next_run_at": now, "runs": 0, "last_started_at": None, "last_finished_at": None, "last_result": None, "last_error": None}
+            for spec in specs if not spec.leased
+        }
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        db = SessionLocal()
+        try:
+            self._ensure_rows(db)
+        finally:
+            db.close()
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._loop, name="job-runner", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _ensure_rows(self, db: Session):
+        now = datetime.datetime.utcnow()
+        existing = {row.name for row in db.query(Job.name)}
+        for spec in self._specs.values():
+            if not spec.leased:
+                continue
+            if spec.name not in existing:
+                db.add(Job(name=spec.name, interval_seconds=spec.interval_seconds, next_run_at=now, runs=0))
+            else:
+                db.execute(update(Job).where(Job.name == spec.name).values(interval_seconds=spec.interval_seconds))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()  # another worker created the rows first
+
+    def _loop(self):
+        while not self._stopping.wait(TICK_SECONDS):
+            try:
+                self.run_due()
+            except OperationalError as exc:
+                # A locked database just skips this tick; anything else (a
+                # missing table, a bad column) is logged like other failures.
+                if "locked" not in str(exc.orig):
+                    logger.exception("Job runner tick failed")
+            except Exception:
+                logger.exception("Job runner tick failed")
+
+    def run_due(self) -> List[str]:
+        ran = []
+        db = SessionLocal()
+        try:
+            for spec in self._specs.values():
+                if self._stopping.is_set():
+                    break
+                if spec.leased and self._claim(db, spec.name):
+                    self._run_leased(db, spec)
+                    ran.append(spec.name)
+                elif not spec.leased and self._local[spec.name]["next_run_at"] <= datetime.datetime.utcnow():
+                    self._run_local(db, spec)
+                    ran.append(spec.name)
+        finally:
+            db.close()
+        return ran
+
+    def _claim(self, db: Session, name: str) -> bool:
+        # Conditional UPDATE: the job is due and nobody holds a live lease.
+        now = datetime.datetime.utcnow()
+        result = db.execute(
+            update(Job)
+            .where(
+                Job.name == name,
+                Job.next_run_at <= now,
+                or_(Job.lease_expires_at.is_(None), Job.lease_expires_at < now),
+            )
+            .values(lease_owner=self.owner, lease_expires_at=now + datetime.timedelta(seconds=LEASE_SECONDS), last_started_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return result.rowcount == 1
+
+    def _call(self, db: Session, spec: JobSpec):
+        try:
+            return spec.func(db), None
+        except Exception as exc:
+            logger.exception("Job %s failed", spec.name)
+            db.rollback()
+            return None, str(exc)[:500]
+
+    def _run_leased(self, db: Session, spec: JobSpec):
+        result, error = self._call(db, spec)
+        now = datetime.datetime.utcnow()
+        again = bool(result and result.get("more"))
+        db.execute(
+            update(Job)
+            .where(Job.name == spec.name, Job.lease_owner == self.owner)
+            .values(
+                lease_owner=None,
+                lease_expires_at=None,
+                next_run_at=now if again else now + datetime.timedelta(seconds=spec.interval_seconds),
+                runs=Job.runs + 1,
+                last_finished_at=now,
+                last_result=json.dumps(result) if result is not None else None,
+                last_error=error,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+    def _run_local(self, db: Session, spec: JobSpec):
+        state = self._local[spec.name]
+        state["last_started_at"] = datetime.datetime.utcnow()
+        result, error = self._call(db, spec)
+        now = datetime.datetime.utcnow()
+        state.update(
+            next_run_at=now + datetime.timedelta(seconds=spec.interval_seconds),
+            runs=state["runs"] + 1,
+            last_finished_at=now,
+            last_result=json.dumps(result) if result is not None else None,
+            last_error=error,
+        )
+
+    def trigger(self, db: Session, name: str):
+        # Makes the job due now; the next tick (of any worker) picks it up.
+        spec = self._specs.get(name)
+        if spec is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        now = datetime.datetime.utcnow()
+        if spec.leased:
+            db.execute(update(Job).where(Job.name == name).values(next_run_at=now).execution_options(synchronize_session=False))
+            db.commit()
+        else:
+            self._local[name]["next_run_at"] = now
+
+    def list_jobs(self, db: Session) -> List[dict]:
+        jobs = []
+        # Rows of jobs this build no longer schedules are left out.
+        leased = [spec.name for spec in self._specs.values() if spec.leased]
+        for row in db.query(Job).filter(Job.name.in_(leased)).order_by(Job.name):
+            jobs.append({
+                "name": row.name,
+                "leased": True,
+                "interval_seconds": row.interval_seconds,
+                "next_run_at": row.next_run_at,
+                "lease_owner": row.lease_owner,
+                "lease_expires_at": row.lease_expires_at,
+                "runs": row.runs,
+                "last_started_at": row.last_started_at,
+                "last_finished_at": row.last_finished_at,
+                "last_result": row.last_result,
+                "last_error": row.last_error,
+            })
+        for name, state in sorted(self._local.items()):
+            jobs.append({"name": name, "leased": False, "interval_seconds": self._specs[name].interval_seconds,
+                         "lease_owner": None, "lease_expires_at": None, **state})
+        return jobs
+
+
+job_runner = JobRunner()
@@ -0,0 +1,193 @@
+import datetime
+import threading
+from collections import defaultdict
+from typing import Dict
+
+from fastapi import HTTPException
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.models import (
+    Event, EventStatus, MassRefundJob, MassRefundStatus, Order, OrderStatus,
+    RefundRequest, RefundStatus, Seat, SeatStatus, Ticket, TicketStatus,
+)
+from app.services import change_log, event_counters
+from app.services.gate_index import gate_index
+from app.services.seat_availability import seat_availability
+
+# Refunds every confirmed order of a cancelled event with set-based UPDATEs,
+# CHUNK_ORDERS orders per transaction. Each chunk also advances the job row, so
+# progress survives a restart and the worker resumes after last_order_id.
+CHUNK_ORDERS = 500
+DEFAULT_RESOLUTION_NOTE = "Event cancelled"
+
+
+class MassRefunds:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._workers: Dict[int, threading.Thread] = {}
+        self._stopping = threading.Event()
+
+    def start(self, db: Session, event_id: int, note: str = DEFAULT_RESOLUTION_NOTE) -> MassRefundJob:
+        # Starting again resumes a failed job, or picks up orders confirmed since
+        # a completed one; totals keep accumulating on the same row.
+        event = db.get(Event, event_id)
+        if event is None:
+            raise HTTPException(status_code=404, detail="Event not found")
+        if event.status != EventStatus.CANCELLED:
+            raise HTTPException(status_code=400, detail="Only cancelled events can be mass refunded")
+
+        job = db.query(MassRefundJob).filter(MassRefundJob.event_id == event_id).first()
+        if job is None:
+            job = MassRefundJob(event_id=event_id, orders_total=0, orders_refunded=0, tickets_cancelled=0, refunded_amount=0.0, last_order_id=0)
+            db.add(job)
+        if job.status != MassRefundStatus.RUNNING:
+            remaining = db.scalar(
+                select(func.count(Order.id)).where(Order.event_id == event_id, Order.order_status == OrderStatus.CONFIRMED)
+            )
+            job.orders_total = job.orders_refunded + remaining
+            job.last_order_id = 0
+            job.status = MassRefundStatus.RUNNING
+            job.error = None
+            job.finished_at = None
+            job.updated_at = datetime.datetime.utcnow()
+        job.resolution_note = note
+        db.commit()
+        self._spawn(job.id, event_id)
+        return job
+
+    def get(self, db: Session, event_id: int) -> MassRefundJob:
+        job = db.query(MassRefundJob).filter(MassRefundJob.event_id == event_id).first()
+        if job is None:
+            raise HTTPException(status_code=404, detail="No mass refund for this event")
+        return job
+
+    def resume_all(self, db: Session) -> int:
+        # Startup: jobs still marked running were cut off by a restart.
+        jobs = db.query(MassRefundJob.id, MassRefundJob.event_id).filter(MassRefundJob.status == MassRefundStatus.RUNNING).all()
+        for job in jobs:
+            self._spawn(job.id, job.event_id)
+        return len(jobs)
+
+    def shutdown(self, timeout: float = 10.0):
+        # Workers stop between chunks; the job stays running and resumes on next startup.
+        self._stopping.set()
+        with self._lock:
+            workers = list(self._workers.values())
+        for worker in workers:
+            worker.join(timeout)
+
+    def _spawn(self, job_id: int, event_id: int):
+        with self._lock:
+            worker = self._workers.get(event_id)
+            if worker is not None and worker.is_alive():
+                return
+            self._stopping.clear()
+            worker = threading.Thread(target=self._run, args=(job_id, event_id), name=f"mass-refund-{event_id}", daemon=True)
+            self._workers[event_id] = worker
+            worker.start()
+
+    def _run(self, job_id: int, event_id: int):
+        db = SessionLocal()
+        try:
+            while not self._stopping.is_set() and refund_chunk(db, job_id):
+                pass
+        except Exception as exc:
+            db.rollback()
+            db.execute(
+                update(MassRefundJob)
+                .where(MassRefundJob.id == job_id)
+                .values(status=MassRefundStatus.FAILED, error=str(exc)[:500], updated_at=datetime.datetime.utcnow())
+            )
+            db.commit()
+        finally:
+            db.close()
+            with self._lock:
+                if self._workers.get(event_id) is threading.current_thread():
+                    del self._workers[event_id]
+
+
+def refund_chunk(db: Session, job_id: int) -> bool:
+    # Refunds the next CHUNK_ORDERS confirmed orders in one transaction; returns
+    # False once the job is finished (or no longer running).
+    job = db.get(MassRefundJob, job_id, populate_existing=True)
+    if job is None or job.status != MassRefundStatus.RUNNING:
+        return False
+    orders = (
+        db.query(Order.id, Order.total_amount)
+        .filter(Order.event_id == job.event_id, Order.order_status == OrderStatus.CONFIRMED, Order.id > job.last_order_id)
+        .order_by(Order.id)
+        .limit(CHUNK_ORDERS)
+        .all()
+    )
+    now = datetime.datetime.utcnow()
+    if not orders:
+        job.status = MassRefundStatus.COMPLETED
+        job.updated_at = job.finished_at = now
+        db.commit()
+        return False
+
+    order_ids = [order.id for order in orders]
+    amount = sum(order.total_amount for order in orders)
+    # Only flips orders that are still confirmed: one refunded through support in
+    # the meantime makes the counts wrong, so the chunk is re-read instead.
+    result = db.execute(
+        update(Order)
+        .where(Order.id.in_(order_ids), Order.order_status == OrderStatus.CONFIRMED)
+        .values(order_status=OrderStatus.REFUNDED)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(order_ids):
+        db.rollback()
+        return True
+
+    tickets = db.query(Ticket.id, Ticket.seat_id, Ticket.order_id).filter(Ticket.order_id.in_(order_ids), Ticket.status != TicketStatus.CANCELLED).all()
+    db.execute(
+        update(Seat)
+        .where(Seat.id.in_(select(Ticket.seat_id).where(Ticket.order_id.in_(order_ids), Ticket.status != TicketStatus.CANCELLED)))
+        .values(status=SeatStatus.AVAILABLE)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        update(Ticket)
+        .where(Ticket.order_id.in_(order_ids), Ticket.status != TicketStatus.CANCELLED)
+        .values(status=TicketStatus.CANCELLED)
+        .execution_options(synchronize_session=False)
+    )
+    approved = db.execute(
+        update(RefundRequest)
+        .where(RefundRequest.order_id.in_(order_ids), RefundRequest.status == RefundStatus.PENDING)
+        .values(status=RefundStatus.APPROVED, resolution_note=job.resolution_note)
+        .returning(RefundRequest.id, RefundRequest.order_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    event_counters.apply_delta(
+        db, job.event_id,
+        seats_booked=-len(tickets),
+        confirmed_revenue=-amount,
+        refunds_approved=len(orders),
+        refunded_amount=amount,
+    )
+    ticket_ids = defaultdict(list)
+    for ticket in tickets:
+        ticket_ids[ticket.order_id].append(ticket.id)
+    change_log.record(db, [
+        change_log.entry("order.refunded", order.id, job.event_id, total_amount=order.total_amount, ticket_ids=ticket_ids[order.id], mass_refund_job_id=job.id)
+        for order in orders
+    ] + [
+        change_log.entry("refund.approved", refund.id, job.event_id, order_id=refund.order_id, resolution_note=job.resolution_note)
+        for refund in approved
+    ])
+    job.orders_refunded += len(orders)
+    job.tickets_cancelled += len(tickets)
+    job.refunded_amount += amount
+    job.last_order_id = order_ids[-1]
+    job.updated_at = now
+    db.commit()
+    seat_availability.mark_available(job.event_id, [ticket.seat_id for ticket in tickets])
+    gate_index.set_status([ticket.id for ticket in tickets], TicketStatus.CANCELLED.value)
+    return True
+
+
+mass_refunds = MassRefunds()
@@ -0,0 +1,326 @@
+import base64
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.models import Event, Seat, SeatStatus, EventStatus
+from app.services.seat_hold_service import SeatHold, SeatHoldConflict, seat_holds
+from app.services.seat_stream import seat_feed
+
+# Per-event seat availability kept as two bitmaps indexed by (seat_id - base_id):
+# `members` marks ids that belong to the event, `available` marks free seats.
+# Seat ids of an event are contiguous when created through bulk_create_seats,
+# so a 60k-seat map costs ~15KB and count queries are O(1).
+
+# Attempts at picking and holding a block when an explicit-seat booking grabs
+# one of the picked seats in between.
+ALLOCATE_MAX_ATTEMPTS = 3
+
+
+def _row_and_number(seat_number: str) -> Tuple[str, Optional[int]]:
+    # "A-R3-12" -> ("A-R3", 12), "S-40" -> ("S", 40)
+    row, _, number = seat_number.rpartition("-")
+    return row, int(number) if number.isdigit() else None
+
+
+class SeatBlockTree:
+    # Segment tree over bitmap offsets for best-available allocation. Each node
+    # keeps the longest run of free seats touching its left edge, its right
+    # edge, and anywhere inside, so the leftmost run of n adjacent free seats is
+    # found in O(log size) and each seat update costs O(log size). Runs never
+    # join across `breaks` (a new row, a gap in seat numbers or a non-seat id).
+    def __init__(self, size: int, free: Iterable[bool], breaks: bytearray):
+        self.size = size
+        self.leaves = 1
+        while self.leaves < max(size, 1):
+            self.leaves <<= 1
+        self.breaks = breaks  # bit i set: offset i does not continue the run of offset i - 1
+        self.prefix = array("i", bytes(4 * 2 * self.leaves))
+        self.suffix = array("i", bytes(4 * 2 * self.leaves))
+        self.best = array("i", bytes(4 * 2 * self.leaves))
+        for offset, is_free in enumerate(free):
+            if is_free:
+                leaf = self.leaves + offset
+                self.prefix[leaf] = self.suffix[leaf] = self.best[leaf] = 1
+        span = 1
+        first = self.leaves
+        while first > 1:
+            span <<= 1
+            first >>= 1
+            for node in range(first, first << 1):
+                self._pull(node, span)
+
+    def _joins(self, offset: int) -> bool:
+        return offset < self.size and not self.breaks[offset >> 3] & (1 << (offset & 7))
+
+    def _pull(self, node: int, span: int):
+        left, right = node << 1, (node << 1) | 1
+        half = span >> 1
+        # Nodes covering `span` leaves are numbered from leaves // span upwards.
+        joins = self._joins((node - self.leaves // span) * span + half)
+        prefix = self.prefix[left]
+        if joins and prefix == half:
+            prefix += self.prefix[right]
+        suffix = self.suffix[right]
+        if joins and suffix == half:
+            suffix += self.suffix[left]
+        best = max(self.best[left], self.best[right])
+        if joins:
+            best = max(best, self.suffix[left] + self.prefix[right])
+        self.prefix[node], self.suffix[node], self.best[node] = prefix, suffix, best
+
+    def set_free(self, offset: int, free: bool):
+        node = self.leaves + offset
+        value = 1 if free else 0
+        self.prefix[node] = self.suffix[node] = self.best[node] = value
+        span = 1
+        node >>= 1
+        while node:
+            span <<= 1
+            self._pull(node, span)
+            node >>= 1
+
+    def find(self, n: int) -> Optional[int]:
+        # Offset of the first seat of the leftmost run of n free adjacent seats.
+        if n <= 0 or self.best[1] < n:
+            return None
+        node, span, start = 1, self.leaves, 0
+        while span > 1:
+            half = span >> 1
+            left, right = node << 1, (node << 1) | 1
+            if self.best[left] >= n:
+                node = left
+            elif self._joins(start + half) and self.suffix[left] + self.prefix[right] >= n:
+                return start + half - self.suffix[left]
+            else:
+                node, start = right, start + half
+            span = half
+        return start
+
+
+class EventSeatBitmap:
+    def __init__(self, seats: Iterable[Tuple[int, str, str]]):
+        seats = sorted(seats)
+        self.base_id = seats[0][0] if seats else 0
+        self.size = (seats[-1][0] - self.base_id + 1) if seats else 0
+        self.members = bytearray((self.size + 7) // 8)
+        self.available = bytearray((self.size + 7) // 8)
+        # Row boundaries for the block allocator; every non-seat offset is one too.
+        self.breaks = bytearray(b"\xff" * ((self.size + 7) // 8))
+        self.blocks: Optional[SeatBlockTree] = None  # built on the first allocation
+        self.total = 0
+        self.available_count = 0
+        previous = (None, None, None)  # offset, row, number
+        for seat_id, seat_number, status in seats:
+            index, mask = self._position(seat_id)
+            self.members[index] |= mask
+            self.total += 1
+            if status == SeatStatus.AVAILABLE:
+                self.available[index] |= mask
+                self.available_count += 1
+            offset = seat_id - self.base_id
+            row, number = _row_and_number(seat_number)
+            if previous[0] == offset - 1 and previous[1] == row and number is not None and previous[2] == number - 1:
+                self.breaks[index] &= ~mask
+            previous = (offset, row, number)
+
+    def _position(self, seat_id: int) -> Optional[Tuple[int, int]]:
+        offset = seat_id - self.base_id
+        if offset < 0 or offset >= self.size:
+            return None
+        return offset >> 3, 1 << (offset & 7)
+
+    def contains(self, seat_id: int) -> bool:
+        position = self._position(seat_id)
+        return position is not None and bool(self.members[position[0]] & position[1])
+
+    def is_available(self, seat_id: int) -> bool:
+        position = self._position(seat_id)
+        return position is not None and bool(self.available[position[0]] & position[1])
+
+    def set_available(self, seat_id: int, available: bool):
+        position = self._position(seat_id)
+        if position is None or not self.members[position[0]] & position[1]:
+            return
+        index, mask = position
+        if available and not self.available[index] & mask:
+            self.available[index] |= mask
+            self.available_count += 1
+        elif not available and self.available[index] & mask:
+            self.available[index] &= ~mask
+            self.available_count -= 1
+        else:
+            return
+        if self.blocks is not None:
+            self.blocks.set_free(seat_id - self.base_id, available)
+
+    def find_seats(self, n: int, together: bool, exclude: Iterable[int] = ()) -> Optional[List[int]]:
+        # Best available = lowest seat ids, i.e. the front of the map as created
+        # (sections, then rows, then seat numbers). Excluded seats (held by
+        # orders in flight) are taken out of the tree for the search only.
+        if self.blocks is None:
+            self.blocks = SeatBlockTree(self.size, (self.is_available(self.base_id + offset) for offset in range(self.size)), self.breaks)
+        hidden = [seat_id for seat_id in set(exclude) if self.is_available(seat_id)]
+        for seat_id in hidden:
+            self.blocks.set_free(seat_id - self.base_id, False)
+        try:
+            if together:
+                start = self.blocks.find(n)
+                return None if start is None else [self.base_id + offset for offset in range(start, start + n)]
+            # Not together: n single seats, still front first.
+            picked = []
+            for _ in range(n):
+                offset = self.blocks.find(1)
+                if offset is None:
+                    break
+                picked.append(offset)
+                self.blocks.set_free(offset, False)
+            for offset in picked:
+                self.blocks.set_free(offset, True)
+            return [self.base_id + offset for offset in picked] if len(picked) == n else None
+        finally:
+            for seat_id in hidden:
+                self.blocks.set_free(seat_id - self.base_id, True)
+
+    def ranges(self) -> List[List[int]]:
+        # Inclusive [first_seat_id, last_seat_id] runs of available seats.
+        runs = []
+        start = None
+        for index, byte in enumerate(self.available):
+            if byte == 0 and start is None:
+                continue
+            if byte == 0xFF and start is not None:
+                continue
+            for bit in range(8):
+                offset = (index << 3) + bit
+                if offset >= self.size:
+                    break
+                if byte & (1 << bit):
+                    if start is None:
+                        start = offset
+                elif start is not None:
+                    runs.append([self.base_id + start, self.base_id + offset - 1])
+                    start = None
+        if start is not None:
+            runs.append([self.base_id + start, self.base_id + self.size - 1])
+        return runs
+
+    def packed(self) -> str:
+        # Bit i (least significant bit first within each byte) is seat base_id + i.
+        return base64.b64encode(bytes(self.available)).decode("ascii")
+
+
+class SeatAvailabilityIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events: Dict[int, EventSeatBitmap] = {}
+        # Bumped on every change so a rebuild that raced with a booking is not installed.
+        self._versions: Dict[int, int] = {}
+
+    def _load(self, db: Session, event_id: int) -> EventSeatBitmap:
+        rows = db.query(Seat.id, Seat.seat_number, Seat.status).filter(Seat.event_id == event_id).all()
+        return EventSeatBitmap((row.id, row.seat_number, row.status) for row in rows)
+
+    def rebuild_event(self, db: Session, event_id: int) -> EventSeatBitmap:
+        version = self._versions.get(event_id, 0)
+        bitmap = self._load(db, event_id)
+        with self._lock:
+            if self._versions.get(event_id, 0) == version:
+                self._events[event_id] = bitmap
+        return bitmap
+
+    def rebuild_all(self, db: Session) -> int:
+        event_ids = [row.id for row in db.query(Event.id).filter(Event.status == EventStatus.UPCOMING)]
+        for event_id in event_ids:
+            self.rebuild_event(db, event_id)
+        return len(event_ids)
+
+    def get(self, db: Session, event_id: int) -> EventSeatBitmap:
+        bitmap = self._events.get(event_id)
+        if bitmap is None:
+            bitmap = self.rebuild_event(db, event_id)
+        return bitmap
+
+    def _set(self, event_id: int, seat_ids: Iterable[int], available: bool):
+        seat_ids = list(seat_ids)
+        with self._lock:
+            self._versions[event_id] = self._versions.get(event_id, 0) + 1
+            bitmap = self._events.get(event_id)
+            if bitmap is not None:
+                for seat_id in seat_ids:
+                    bitmap.set_available(seat_id, available)
+            seat_feed.publish(event_id, seat_ids, available)
+
+    def mark_booked(self, event_id: int, seat_ids: Iterable[int]):
+        self._set(event_id, seat_ids, False)
+
+    def mark_available(self, event_id: int, seat_ids: Iterable[int]):
+        self._set(event_id, seat_ids, True)
+
+    def allocate(self, db: Session, event_id: int, n: int, together: bool = True) -> Optional[SeatHold]:
+        # Picks the best available seats and holds them in one step, so
+        # concurrent best-available orders are handed different blocks.
+        bitmap = self.get(db, event_id)
+        for _ in range(ALLOCATE_MAX_ATTEMPTS):
+            with self._lock:
+                seat_ids = bitmap.find_seats(n, together, exclude=seat_holds.held_seat_ids(event_id))
+                if seat_ids is None:
+                    return None
+                try:
+                    return seat_holds.acquire(event_id, seat_ids)
+                except SeatHoldConflict:
+                    continue  # an explicit-seat order held one of them meanwhile
+        return None
+
+    def invalidate(self, event_id: int):
+        # Used when seats are added; the next read rebuilds from the DB.
+        with self._lock:
+            self._versions[event_id] = self._versions.get(event_id, 0) + 1
+            self._events.pop(event_id, None)
+            seat_feed.reset(event_id)
+
+    def snapshot(self, db: Session, event_id: int) -> dict:
+        # The bitmap and the seat feed position, read together under the lock
+        # that publishes deltas: the deltas after `seq` are exactly the changes
+        # the bitmap doesn't have yet.
+        while True:
+            bitmap = self.get(db, event_id)
+            with self._lock:
+                if self._events.get(event_id) is not bitmap:
+                    continue  # a rebuild lost a race with a booking; load again
+                generation, seq = seat_feed.position(event_id)
+                return {
+                    "generation": generation,
+                    "seq": seq,
+                    "event_id": event_id,
+                    "total_seats": bitmap.total,
+                    "available_seats": bitmap.available_count,
+                    "base_seat_id": bitmap.base_id,
+                    "size": bitmap.size,
+                    "encoding": "base64-lsb",
+                    "bitmap": bitmap.packed(),
+                }
+
+    def check_consistency(self, db: Session, event_id: int) -> dict:
+        cached = self._events.get(event_id)
+        fresh = self._load(db, event_id)
+        if cached is None:
+            return {"event_id": event_id, "loaded": False, "consistent": True, "mismatched_seat_ids": []}
+        mismatched = []
+        for offset in range(fresh.size):
+            seat_id = fresh.base_id + offset
+            if fresh.contains(seat_id) != cached.contains(seat_id) or fresh.is_available(seat_id) != cached.is_available(seat_id):
+                mismatched.append(seat_id)
+        return {
+            "event_id": event_id,
+            "loaded": True,
+            "consistent": not mismatched and fresh.total == cached.total,
+            "mismatched_seat_ids": mismatched,
+            "db_available": fresh.available_count,
+            "index_available": cached.available_count,
+        }
+
+
+seat_availability = SeatAvailabilityIndex()
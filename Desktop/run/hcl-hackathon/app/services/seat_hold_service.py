@@ -0,0 +1,93 @@
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+# Seats are held in memory for a short time while an order is being written, so
+# competing requests for the same seats are rejected before they reach the DB.
+# The conditional UPDATE in create_booking stays the source of truth: holds are
+# per-process and only exist to keep losers off the single SQLite writer.
+DEFAULT_HOLD_TTL_SECONDS = 30.0
+
+
+class SeatHoldConflict(Exception):
+    def __init__(self, seat_ids: List[int]):
+        super().__init__(f"Seats currently held: {seat_ids}")
+        self.seat_ids = seat_ids
+
+
+@dataclass(frozen=True)
+class SeatHold:
+    event_id: int
+    seat_ids: Tuple[int, ...]
+    token: str
+    expires_at: float
+
+
+class _EventHolds:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.holds: Dict[int, Tuple[str, float]] = {}  # seat_id -> (token, expires_at)
+
+
+class SeatHoldEngine:
+    def __init__(self, ttl_seconds: float = DEFAULT_HOLD_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._events: Dict[int, _EventHolds] = {}
+
+    def _event(self, event_id: int) -> _EventHolds:
+        state = self._events.get(event_id)
+        if state is None:
+            with self._lock:
+                state = self._events.setdefault(event_id, _EventHolds())
+        return state
+
+    def acquire(self, event_id: int, seat_ids: List[int], ttl_seconds: float = None) -> SeatHold:
+        # Compare-and-set: either every seat is free (or its hold expired) and all
+        # of them are taken by this hold, or nothing changes.
+        state = self._event(event_id)
+        now = time.monotonic()
+        expires_at = now + (ttl_seconds or self.ttl_seconds)
+        token = uuid.uuid4().hex
+        with state.lock:
+            conflicts = [
+                seat_id for seat_id in seat_ids
+                if seat_id in state.holds and state.holds[seat_id][1] > now
+            ]
+            if conflicts:
+                raise SeatHoldConflict(conflicts)
+            for seat_id in seat_ids:
+                state.holds[seat_id] = (token, expires_at)
+        return SeatHold(event_id=event_id, seat_ids=tuple(seat_ids), token=token, expires_at=expires_at)
+
+    def release(self, hold: SeatHold):
+        state = self._event(hold.event_id)
+        with state.lock:
+            for seat_id in hold.seat_ids:
+                held = state.holds.get(seat_id)
+                if held is not None and held[0] == hold.token:
+                    del state.holds[seat_id]
+
+    def held_seat_ids(self, event_id: int) -> List[int]:
+        state = self._event(event_id)
+        now = time.monotonic()
+        with state.lock:
+            return [seat_id for seat_id, (_, expires_at) in state.holds.items() if expires_at > now]
+
+    def sweep_expired(self) -> int:
+        now = time.monotonic()
+        removed = 0
+        with self._lock:
+            events = list(self._events.values())
+        for state in events:
+            with state.lock:
+                expired = [seat_id for seat_id, (_, expires_at) in state.holds.items() if expires_at <= now]
+                for seat_id in expired:
+                    del state.holds[seat_id]
+                removed += len(expired)
+        return removed
+
+
+seat_holds = SeatHoldEngine()
@@ -0,0 +1,46 @@
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.models import Seat, SeatStatus
+from app.services import event_counters
+
+# Rows per INSERT batch; keeps memory flat no matter how large the seat map is.
+SEAT_INSERT_CHUNK_SIZE = 5000
+
+
+def layout_size(seat_count: Optional[int] = None, sections: Optional[list] = None) -> int:
+    if sections:
+        return sum(section.rows * section.seats_per_row for section in sections)
+    return seat_count or 0
+
+
+def generate_seat_numbers(seat_count: Optional[int] = None, sections: Optional[list] = None, start: int = 1) -> Iterator[str]:
+    # Structured layouts produce "<section>-R<row>-<number>", plain counts keep "S-<n>".
+    if sections:
+        for section in sections:
+            for row in range(1, section.rows + 1):
+                for number in range(1, section.seats_per_row + 1):
+                    yield f"{section.name}-R{row}-{number}"
+    else:
+        for n in range(start, start + (seat_count or 0)):
+            yield f"S-{n}"
+
+
+def bulk_create_seats(db: Session, event_id: int, seat_numbers: Iterable[str], chunk_size: int = SEAT_INSERT_CHUNK_SIZE) -> int:
+    created = 0
+    numbers = iter(seat_numbers)
+    while True:
+        chunk: List[str] = list(islice(numbers, chunk_size))
+        if not chunk:
+            break
+        db.execute(
+            insert(Seat.__table__),
+            [{"event_id": event_id, "seat_number": number, "status": SeatStatus.AVAILABLE.value} for number in chunk],
+        )
+        created += len(chunk)
+    event_counters.apply_delta(db, event_id, seats_total=created)
+    db.commit()
+    return created
@@ -0,0 +1,259 @@
+import asyncio
+import itertools
+import json
+import secrets
+import threading
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Push channel for seat maps. Every committed seat change (seat_availability
+# mark_booked / mark_available, called after the DB commit) becomes a numbered
+# delta in its event's feed. A subscriber starts from a snapshot of the
+# availability bitmap taken at a sequence number, then receives every later
+# delta (GET /customer/events/{id}/seats/stream, server-sent events). Deltas are
+# encoded once and handed to all subscribers in batches every
+# SEAT_FEED_FLUSH_SECONDS, so fan-out costs one queue put per connection per
+# batch and no DB access. The last SEAT_FEED_REPLAY deltas are kept so a client
+# reconnecting with Last-Event-ID gets only what it missed.
+#
+# Cursors are "<generation>:<seq>". The generation changes when the process
+# restarts or the event's seat map is rebuilt (seats added, event closed); a
+# cursor from another generation gets a fresh snapshot.
+SEAT_FEED_REPLAY = 4096  # deltas kept per event
+SEAT_FEED_FLUSH_SECONDS = 0.05
+SUBSCRIBER_QUEUE_SIZE = 64  # batches; a subscriber further behind is resynced
+HEARTBEAT_SECONDS = 15.0
+
+_PROCESS = secrets.token_hex(4)
+_generations = itertools.count(1)
+
+Batch = List[Tuple[int, bytes]]  # (seq, encoded SSE frame)
+
+
+def _new_generation() -> str:
+    return f"{_PROCESS}.{next(_generations)}"
+
+
+def _frame(kind: str, generation: str, seq: int, data: dict) -> bytes:
+    return f"event: {kind}\nid: {generation}:{seq}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+def parse_cursor(cursor: Optional[str]) -> Optional[Tuple[str, int]]:
+    generation, _, seq = (cursor or "").rpartition(":")
+    return (generation, int(seq)) if generation and seq.isdigit() else None
+
+
+class Subscriber:
+    def __init__(self):
+        self.queue: "asyncio.Queue[Optional[Batch]]" = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        self.lagged = False  # a batch didn't fit in the queue: replay from the feed
+        self.reset = False  # the seat map was rebuilt: start over from a snapshot
+
+
+class EventFeed:
+    def __init__(self):
+        self.generation = _new_generation()
+        self.seq = 0
+        self.recent: Deque[Tuple[int, bytes]] = deque(maxlen=SEAT_FEED_REPLAY)
+        self.pending: Batch = []
+        self.flush_scheduled = False
+        self.subscribers: Set[Subscriber] = set()
+
+
+class SeatFeed:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._feeds: Dict[int, EventFeed] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _feed(self, event_id: int) -> EventFeed:
+        feed = self._feeds.get(event_id)
+        if feed is None:
+            feed = self._feeds[event_id] = EventFeed()
+        return feed
+
+    def _call_in_loop(self, callback, *args):
+        # Bookings publish from the event loop (run_sync); mass refunds and jobs
+        # from their own threads.
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            callback(*args)
+        else:
+            loop.call_soon_threadsafe(callback, *args)
+
+    def publish(self, event_id: int, seat_ids: List[int], available: bool):
+        # seat_availability calls this under its own lock, together with the
+        # bitmap change, so its snapshots line up with position().
+        with self._lock:
+            feed = self._feed(event_id)
+            feed.seq += 1
+            frame = _frame("seats", feed.generation, feed.seq, {"seq": feed.seq, "status": "available" if available else "booked", "seat_ids": seat_ids})
+            feed.recent.append((feed.seq, frame))
+            schedule = False
+            if feed.subscribers:
+                feed.pending.append((feed.seq, frame))
+                schedule = not feed.flush_scheduled
+                feed.flush_scheduled = True
+        if schedule:
+            self._call_in_loop(self._schedule_flush, event_id)
+
+    def _schedule_flush(self, event_id: int):
+        self._loop.call_later(SEAT_FEED_FLUSH_SECONDS, self._flush, event_id)
+
+    def _flush(self, event_id: int):
+        with self._lock:
+            feed = self._feeds.get(event_id)
+            if feed is None:
+                return
+            batch, feed.pending, feed.flush_scheduled = feed.pending, [], False
+            subscribers = list(feed.subscribers)
+        if not batch:
+            return
+        for subscriber in subscribers:
+            if subscriber.lagged or subscriber.reset:
+                continue
+            try:
+                subscriber.queue.put_nowait(batch)
+            except asyncio.QueueFull:
+                subscriber.lagged = True
+
+    def reset(self, event_id: int):
+        # The seat map was dropped (seats added, event closed): old cursors and
+        # deltas no longer apply. Seq keeps counting so queued batches from
+        # before the reset sort below the next snapshot.
+        with self._lock:
+            feed = self._feeds.get(event_id)
+            if feed is None:
+                return
+            feed.generation = _new_generation()
+            feed.recent.clear()
+            feed.pending = []
+            subscribers = list(feed.subscribers)
+        for subscriber in subscribers:
+            subscriber.reset = True
+        if subscribers:
+            self._call_in_loop(self._wake, subscribers)
+
+    @staticmethod
+    def _wake(subscribers: Iterable[Subscriber]):
+        for subscriber in subscribers:
+            try:
+                subscriber.queue.put_nowait(None)
+            except asyncio.QueueFull:
+                pass  # it has batches to read and will see the flag
+
+    def position(self, event_id: int) -> Tuple[str, int]:
+        with self._lock:
+            feed = self._feed(event_id)
+            return feed.generation, feed.seq
+
+    def since(self, event_id: int, generation: str, seq: int) -> Optional[Tuple[int, List[bytes]]]:
+        # Frames after (generation, seq) and the seq they bring the client to,
+        # or None when they are gone and the client needs a snapshot.
+        with self._lock:
+            feed = self._feed(event_id)
+            if generation != feed.generation or seq > feed.seq:
+                return None
+            if seq == feed.seq:
+                return seq, []
+            if not feed.recent or feed.recent[0][0] > seq + 1:
+                return None
+            return feed.seq, [frame for item_seq, frame in feed.recent if item_seq > seq]
+
+    def subscribe(self, event_id: int) -> Subscriber:
+        self._loop = asyncio.get_running_loop()
+        subscriber = Subscriber()
+        with self._lock:
+            self._feed(event_id).subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, event_id: int, subscriber: Subscriber):
+        with self._lock:
+            feed = self._feeds.get(event_id)
+            if feed is not None:
+                feed.subscribers.discard(subscriber)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "events": len(self._feeds),
+                "subscribers": sum(len(feed.subscribers) for feed in self._feeds.values()),
+            }
+
+
+seat_feed = SeatFeed()
+
+
+async def _snapshot(db: AsyncSession, event_id: int) -> Tuple[str, int, bytes]:
+    from app.services.seat_availability import seat_availability
+    snapshot = await db.run_sync(seat_availability.snapshot, event_id)
+    generation = snapshot.pop("generation")
+    return generation, snapshot["seq"], _frame("snapshot", generation, snapshot["seq"], snapshot)
+
+
+async def open_stream(db: AsyncSession, event_id: int, cursor: Optional[str]) -> AsyncIterator[bytes]:
+    # Subscribe first, then read the starting point: deltas committed in
+    # between are both queued and covered by the start, and the generator
+    # drops queued ones at or below the seq it has sent.
+    subscriber = seat_feed.subscribe(event_id)
+    try:
+        resume = parse_cursor(cursor)
+        missed = seat_feed.since(event_id, *resume) if resume else None
+        if missed is None:
+            generation, seq, first = await _snapshot(db, event_id)
+        else:
+            generation, (seq, frames) = resume[0], missed
+            first = b"".join(frames)
+    except BaseException:
+        seat_feed.unsubscribe(event_id, subscriber)
+        raise
+    # The stream outlives the request; don't hold its connection meanwhile.
+    await db.close()
+    return _frames(event_id, subscriber, first, generation, seq)
+
+
+async def _frames(event_id: int, subscriber: Subscriber, first: bytes, generation: str, seq: int) -> AsyncIterator[bytes]:
+    from app.database import AsyncSessionLocal
+    try:
+        if first:
+            yield first
+        while True:
+            try:
+                batch = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            if subscriber.reset:
+                subscriber.reset = subscriber.lagged = False
+                async with AsyncSessionLocal() as db:
+                    generation, seq, frame = await _snapshot(db, event_id)
+                yield frame
+                continue
+            if subscriber.lagged:
+                subscriber.lagged = False
+                missed = seat_feed.since(event_id, generation, seq)
+                if missed is None:
+                    async with AsyncSessionLocal() as db:
+                        generation, seq, frame = await _snapshot(db, event_id)
+                    yield frame
+                else:
+                    seq, frames = missed
+                    if frames:
+                        yield b"".join(frames)
+                continue
+            if not batch:
+                continue
+            frames = [frame for item_seq, frame in batch if item_seq > seq]
+            if frames:
+                seq = batch[-1][0]
+                yield b"".join(frames)
+    finally:
+        seat_feed.unsubscribe(event_id, subscriber)
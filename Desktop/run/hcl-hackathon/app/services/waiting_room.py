@@ -0,0 +1,171 @@
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+
+# Waiting room for hot on-sales: customers join a per-event FIFO queue and are
+# let through at a fixed admit rate, each with a short-lived admission token
+# that POST /customer/orders requires while the room is open. The rate is set
+# near what the DB can commit, so bookings arrive at a pace the write lock can
+# absorb instead of all at once. Per process, like the seat holds: run one
+# worker (or sticky routing per event) for on-sales that use it.
+# Admissions that can accumulate while nobody is waiting (one second's worth).
+ADMIT_BURST_SECONDS = 1.0
+MAX_POLL_INTERVAL_SECONDS = 30.0
+
+
+@dataclass
+class _Room:
+    admit_rate: float
+    token_ttl_seconds: float
+    queue: List[int] = field(default_factory=list)  # user ids in arrival order
+    position: Dict[int, int] = field(default_factory=dict)  # user_id -> index in queue
+    admitted: int = 0  # queue[:admitted] have been let through
+    allowance: float = 0.0
+    last_tick: float = field(default_factory=time.monotonic)
+    tokens: Dict[int, Tuple[str, float]] = field(default_factory=dict)  # user_id -> (token, expires_at)
+    claimed: Dict[int, Tuple[str, float]] = field(default_factory=dict)  # tokens held by an order in flight
+    used: int = 0
+
+
+class WaitingRooms:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rooms: Dict[int, _Room] = {}
+
+    def open(self, event_id: int, admit_rate: float = settings.waiting_room_admit_rate, token_ttl_seconds: float = settings.waiting_room_token_ttl_seconds) -> dict:
+        # Re-opening an open room only changes its settings; the queue is kept.
+        with self._lock:
+            room = self._rooms.get(event_id)
+            if room is None:
+                room = self._rooms[event_id] = _Room(admit_rate, token_ttl_seconds)
+            else:
+                self._advance(room, time.monotonic())
+                room.admit_rate, room.token_ttl_seconds = admit_rate, token_ttl_seconds
+            return self._stats(event_id, room)
+
+    def close(self, event_id: int) -> bool:
+        with self._lock:
+            return self._rooms.pop(event_id, None) is not None
+
+    def is_open(self, event_id: int) -> bool:
+        return event_id in self._rooms
+
+    def _advance(self, room: _Room, now: float):
+        # Lazy token bucket: admissions owed since the last call are handed out
+        # to the head of the queue whenever anyone joins or polls.
+        room.allowance = min(room.allowance + (now - room.last_tick) * room.admit_rate, max(room.admit_rate * ADMIT_BURST_SECONDS, 1.0))
+        room.last_tick = now
+        count = min(int(room.allowance), len(room.queue) - room.admitted)
+        for user_id in room.queue[room.admitted:room.admitted + count]:
+            room.tokens[user_id] = (secrets.token_urlsafe(16), now + room.token_ttl_seconds)
+        room.admitted += count
+        room.allowance -= count
+
+    def _status(self, event_id: int, room: _Room, user_id: int, now: float) -> dict:
+        index = room.position.get(user_id)
+        if index is None:
+            return {"event_id": event_id, "state": "not_queued"}
+        if index >= room.admitted:
+            ahead = index - room.admitted
+            eta = (ahead + 1 - room.allowance) / room.admit_rate
+            return {
+                "event_id": event_id,
+                "state": "waiting",
+                "position": ahead + 1,
+                "eta_seconds": round(max(eta, 0.0), 1),
+                "poll_after_seconds": round(min(max(eta / 2, 1.0), MAX_POLL_INTERVAL_SECONDS), 1),
+            }
+        if user_id in room.claimed:
+            return {"event_id": event_id, "state": "ordering"}
+        token = room.tokens.get(user_id)
+        if token is None:
+            return {"event_id": event_id, "state": "used"}
+        if token[1] <= now:
+            return {"event_id": event_id, "state": "expired"}
+        return {"event_id": event_id, "state": "admitted", "admission_token": token[0], "expires_in_seconds": round(token[1] - now, 1)}
+
+    def join(self, event_id: int, user_id: int) -> Optional[dict]:
+        # Joining again while waiting or admitted keeps the place in line; after
+        # the token was used or expired the customer goes to the back.
+        now = time.monotonic()
+        with self._lock:
+            room = self._rooms.get(event_id)
+            if room is None:
+                return None
+            self._advance(room, now)
+            if self._status(event_id, room, user_id, now)["state"] in ("not_queued", "used", "expired"):
+                room.tokens.pop(user_id, None)
+                room.position[user_id] = len(room.queue)
+                room.queue.append(user_id)
+                self._advance(room, now)
+            return self._status(event_id, room, user_id, now)
+
+    def status(self, event_id: int, user_id: int) -> Optional[dict]:
+        now = time.monotonic()
+        with self._lock:
+            room = self._rooms.get(event_id)
+            if room is None:
+                return None
+            self._advance(room, now)
+            return self._status(event_id, room, user_id, now)
+
+    def claim(self, event_id: int, user_id: int, token: Optional[str]) -> bool:
+        # Takes the token for one order; release() gives it back if the order fails,
+        # consume() spends it once the order is committed.
+        now = time.monotonic()
+        with self._lock:
+            room = self._rooms.get(event_id)
+            if room is None:
+                return True
+            held = room.tokens.get(user_id)
+            if token is None or held is None or held[1] <= now or not secrets.compare_digest(held[0], token):
+                return False
+            room.claimed[user_id] = room.tokens.pop(user_id)
+            return True
+
+    def release(self, event_id: int, user_id: int):
+        with self._lock:
+            room = self._rooms.get(event_id)
+            if room is not None and user_id in room.claimed:
+                room.tokens[user_id] = room.claimed.pop(user_id)
+
+    def consume(self, event_id: int, user_id: int):
+        with self._lock:
+            room = self._rooms.get(event_id)
+            if room is not None and room.claimed.pop(user_id, None) is not None:
+                room.used += 1
+
+    def _stats(self, event_id: int, room: _Room) -> dict:
+        now = time.monotonic()
+        return {
+            "event_id": event_id,
+            "admit_rate": room.admit_rate,
+            "token_ttl_seconds": room.token_ttl_seconds,
+            "joined": len(room.queue),
+            "waiting": len(room.queue) - room.admitted,
+            "admitted": room.admitted,
+            "active_tokens": sum(1 for _, expires_at in room.tokens.values() if expires_at > now),
+            "used": room.used,
+        }
+
+    def room_stats(self, event_id: int) -> Optional[dict]:
+        with self._lock:
+            room = self._rooms.get(event_id)
+            if room is None:
+                return None
+            self._advance(room, time.monotonic())
+            return self._stats(event_id, room)
+
+    def stats(self) -> List[dict]:
+        now = time.monotonic()
+        with self._lock:
+            for room in self._rooms.values():
+                self._advance(room, now)
+            return [self._stats(event_id, room) for event_id, room in self._rooms.items()]
+
+
+waiting_rooms = WaitingRooms()
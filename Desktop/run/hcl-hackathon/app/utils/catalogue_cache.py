@@ -0,0 +1,98 @@
+import datetime
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable, Optional
+
+CATALOGUE_CACHE_MAX_ENTRIES = 1024
+# Upper bound on staleness for changes made by other worker processes, which
+# bump their own version, not this one.
+CATALOGUE_CACHE_TTL_SECONDS = 30.0
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    body: bytes
+    etag: str
+    next_cursor: Optional[str]
+    version: int
+    expires_at: float  # time.monotonic()
+    stale_at: Optional[datetime.datetime]  # utc; first event in the page whose date passes
+
+
+class CatalogueCache:
+    # Pre-serialized catalogue pages keyed by (catalogue version, query params).
+    # Event writes (including the close_past_events job) bump the version, which
+    # drops every page; pages also expire when one of their events crosses its
+    # event_date (it leaves the listing).
+    def __init__(self, max_entries: int = CATALOGUE_CACHE_MAX_ENTRIES, ttl_seconds: float = CATALOGUE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, CachedPage]" = OrderedDict()
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[CachedPage]:
+        now = time.monotonic()
+        utcnow = datetime.datetime.utcnow()
+        with self._lock:
+            page = self._entries.get(key)
+            if page is None or page.expires_at <= now or (page.stale_at is not None and page.stale_at <= utcnow):
+                if page is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return page
+
+    def put(self, key: Hashable, version: int, body: bytes, next_cursor: Optional[str], stale_at: Optional[datetime.datetime]) -> CachedPage:
+        digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+        page = CachedPage(
+            body=body,
+            etag=f'"{digest}"',  # content hash: unchanged pages still 304 after a version bump
+            next_cursor=next_cursor,
+            version=version,
+            expires_at=time.monotonic() + self.ttl_seconds,
+            stale_at=stale_at,
+        )
+        with self._lock:
+            # A write that happened while this page was being built already
+            # bumped the version; don't install the outdated page.
+            if version == self.version:
+                self._entries[key] = page
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return page
+
+    def matches(self, if_none_match: Optional[str], page: CachedPage) -> bool:
+        if not if_none_match:
+            return False
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or page.etag in tags
+
+    def bump(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self.version,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+catalogue_cache = CatalogueCache()
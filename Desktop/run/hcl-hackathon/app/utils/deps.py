@@ -1,22 +1,30 @@
 from fastapi import Header, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.models.models import User, UserRole
+from app.utils.user_cache import CachedUser, user_cache
 
-def get_current_user(
-    db: Session = Depends(get_db),
+async def get_current_user(
+    db: AsyncSession = Depends(get_async_db),
     x_user_email: str = Header(...)
-):
-    user = db.query(User).filter(User.email == x_user_email).first()
-    if not user:
+) -> CachedUser:
+    # FastAPI caches this dependency per request, so RoleChecker and the handler
+    # share one lookup; the process-wide cache skips the DB for repeat callers.
+    user = user_cache.get(x_user_email)
+    if user is not None:
+        return user
+
+    db_user = (await db.execute(select(User).where(User.email == x_user_email))).scalars().first()
+    if not db_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found or invalid credentials"
         )
-    return user
+    return user_cache.put(db_user)
 
 def RoleChecker(allowed_roles: list[UserRole]):
-    def checker(user: User = Depends(get_current_user)):
+    async def checker(user: CachedUser = Depends(get_current_user)):
         if user.role not in [role.value for role in allowed_roles]:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
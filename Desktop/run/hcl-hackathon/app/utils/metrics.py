@@ -0,0 +1,242 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Per-route request metrics: total latency, DB time, serialization time and SQL
+# statement count, kept in HDR-style histograms and served by GET /metrics in
+# Prometheus text format. MetricsMiddleware opens a RequestStats for each
+# request (a context variable, so it follows the request into run_sync), the
+# engine listeners add every statement to it, and InstrumentedRoute marks when
+# the endpoint returned so the time until the response starts is serialization.
+
+# Sub-buckets per power of two: a recorded value is reported at most 1/64
+# (1.6%) below its true value. Buckets are created on first use.
+SUB_BUCKETS = 64
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+SLOW_QUERY_LOG_SIZE = 200
+
+slow_query_logger = logging.getLogger("app.slow_queries")
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value: float):
+        if value > 0:
+            mantissa, exponent = math.frexp(value)  # value = mantissa * 2**exponent, 0.5 <= mantissa < 1
+            index = exponent * SUB_BUCKETS + int((mantissa - 0.5) * 2 * SUB_BUCKETS)
+        else:
+            index = None  # zero (no statements, no DB time)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @staticmethod
+    def _lowest_value(index: Optional[int]) -> float:
+        if index is None:
+            return 0.0
+        exponent, sub = divmod(index, SUB_BUCKETS)
+        return math.ldexp(0.5 + sub / (2 * SUB_BUCKETS), exponent)
+
+    def quantiles(self, quantiles=QUANTILES) -> Dict[float, float]:
+        if not self.count:
+            return {q: 0.0 for q in quantiles}
+        ordered = sorted(self.buckets.items(), key=lambda item: -1 if item[0] is None else item[0])
+        result = {}
+        seen = 0
+        position = iter(ordered)
+        index, count = None, 0
+        for q in sorted(quantiles):
+            rank = max(1, math.ceil(q * self.count))
+            while seen < rank:
+                index, count = next(position)
+                seen += count
+            result[q] = self._lowest_value(index)
+        return result
+
+
+@dataclass
+class RequestStats:
+    statements: int = 0
+    db_seconds: float = 0.0
+    endpoint_done: Optional[float] = None
+    response_started: Optional[float] = None
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+METRICS = (
+    # (name, help, RouteMetrics attribute)
+    ("http_request_duration_seconds", "Time from request start to the last body byte.", "latency"),
+    ("http_request_db_seconds", "Time spent in SQL statements.", "db_time"),
+    ("http_request_serialization_seconds", "Time from the endpoint returning to the response starting.", "serialization"),
+    ("http_request_sql_statements", "SQL statements executed.", "statements"),
+)
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency = Histogram()
+        self.db_time = Histogram()
+        self.serialization = Histogram()
+        self.statements = Histogram()
+        self.statuses: Dict[int, int] = {}
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.enabled = True
+        self.slow_query_seconds: Optional[float] = None  # opt-in, see configure()
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self.slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+        self._engines = set()
+
+    def configure(self, enabled: bool, slow_query_ms: Optional[float]):
+        self.enabled = enabled
+        self.slow_query_seconds = slow_query_ms / 1000 if slow_query_ms is not None else None
+
+    def instrument(self, *engines):
+        for engine in engines:
+            target = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+            if target in self._engines:
+                continue
+            event.listen(target, "before_cursor_execute", self._before_execute)
+            event.listen(target, "after_cursor_execute", self._after_execute)
+            self._engines.add(target)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None or self.slow_query_seconds is not None:
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("query_started")
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        stats = _current.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += elapsed
+        if self.slow_query_seconds is not None and elapsed >= self.slow_query_seconds:
+            entry = {"at": time.time(), "ms": round(elapsed * 1000, 3), "statement": statement, "parameters": repr(parameters)[:2000]}
+            self.slow_queries.append(entry)
+            slow_query_logger.warning("slow query %.1f ms: %s %s", entry["ms"], statement, entry["parameters"])
+
+    def observe(self, method: str, route: str, status: int, stats: RequestStats, latency: float):
+        serialization = 0.0
+        if stats.endpoint_done is not None and stats.response_started is not None:
+            serialization = max(stats.response_started - stats.endpoint_done, 0.0)
+        with self._lock:
+            metrics = self._routes.get((method, route))
+            if metrics is None:
+                metrics = self._routes[(method, route)] = RouteMetrics()
+            metrics.latency.record(latency)
+            metrics.db_time.record(stats.db_seconds)
+            metrics.serialization.record(serialization)
+            metrics.statements.record(stats.statements)
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+        self.slow_queries.clear()
+
+    def prometheus(self) -> str:
+        # Histograms are summarized as Prometheus summaries (quantiles + sum +
+        # count); quantiles are computed here, at scrape time, not per request.
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = ["# HELP http_requests_total Requests by route and status.", "# TYPE http_requests_total counter"]
+            for (method, route), metrics in routes:
+                for status, count in sorted(metrics.statuses.items()):
+                    lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+            for name, help_text, attribute in METRICS:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} summary")
+                for (method, route), metrics in routes:
+                    histogram = getattr(metrics, attribute)
+                    labels = f'method="{method}",route="{route}"'
+                    for q, value in histogram.quantiles().items():
+                        lines.append(f'{name}{{{labels},quantile="{q}"}} {value:.9g}')
+                    lines.append(f"{name}_sum{{{labels}}} {histogram.total:.9g}")
+                    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
+    # Plain ASGI middleware (no BaseHTTPMiddleware task/stream wrapping).
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not request_metrics.enabled:
+            return await self.app(scope, receive, send)
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_stats(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                stats.response_started = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            # Route templates, not raw paths, so ids don't create a series each.
+            request_metrics.observe(scope["method"], getattr(route, "path", "unmatched"), status, stats, time.perf_counter() - started)
+
+
+def _mark_endpoint_done(endpoint):
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                stats = _current.get()
+                if stats is not None:
+                    stats.endpoint_done = time.perf_counter()
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                stats = _current.get()
+                if stats is not None:
+                    stats.endpoint_done = time.perf_counter()
+    return wrapper
+
+
+class InstrumentedRoute(APIRoute):
+    # Routers use this as route_class so serialization time can be told apart
+    # from the endpoint itself.
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _mark_endpoint_done(endpoint), **kwargs)
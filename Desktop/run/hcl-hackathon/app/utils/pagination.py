@@ -0,0 +1,59 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+@dataclass
+class PageParams:
+    after: Optional[int]
+    limit: int
+    stream: bool
+
+
+def page_params(
+    after: Optional[int] = Query(None, description="Return rows with id greater than this cursor"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    stream: bool = Query(False, description="Stream every row as NDJSON instead of returning one page"),
+) -> PageParams:
+    return PageParams(after=after, limit=limit, stream=stream)
+
+
+async def paginate(db: AsyncSession, stmt, id_column, page: PageParams, response: Response, schema):
+    # Keyset pagination: rows come back in id order and the id of the last row
+    # is the cursor for the next page, sent in the X-Next-Cursor header.
+    if page.after is not None:
+        stmt = stmt.where(id_column > page.after)
+    stmt = stmt.order_by(id_column)
+    if page.stream:
+        # Hand the request's connection back first: the stream opens its own, and
+        # requests holding one while waiting for a second can drain the pool.
+        await db.close()
+        return stream_ndjson(stmt, schema)
+
+    rows = (await db.execute(stmt.limit(page.limit + 1))).scalars().all()
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = str(rows[-1].id)
+    return rows
+
+
+def stream_ndjson(stmt, schema):
+    # The generator runs after the handler returns, so it owns its session.
+    # yield_per keeps only one batch of ORM objects alive at a time.
+    async def rows():
+        async with AsyncSessionLocal() as db:
+            result = await db.stream_scalars(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+            async for row in result:
+                yield schema.model_validate(row).model_dump_json() + "\n"
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
@@ -1,9 +1,91 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.config import settings
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
+
+# bcrypt is CPU bound, so request handlers run it on a small process pool.
+# Admission control: once every worker is busy and the queue is full, callers
+# get a fast 503 with Retry-After instead of piling up behind the pool.
+_pool = None
+_pool_lock = threading.Lock()
+_in_flight = 0
+
+def _init_worker(nice):
+    if nice:
+        os.nice(nice)
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.password_hash_workers,
+                    initializer=_init_worker,
+                    initargs=(settings.password_hash_nice,),
+                )
+    return _pool
+
+def _busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication service is busy, please retry",
+        headers={"Retry-After": str(settings.password_hash_retry_after_seconds)},
+    )
+
+def ensure_password_capacity():
+    # Cheap pre-check so overloaded auth requests are rejected before any DB work.
+    if _in_flight >= settings.password_hash_workers + settings.password_hash_queue_limit:
+        raise _busy()
+
+async def _run_in_pool(fn, *args):
+    global _in_flight
+    with _pool_lock:
+        if _in_flight >= settings.password_hash_workers + settings.password_hash_queue_limit:
+            raise _busy()
+        _in_flight += 1
+    pool = _get_pool()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+    except BrokenProcessPool:
+        # A worker died (OOM kill, crash); the executor stays broken, so drop it
+        # and let the next call start a fresh one.
+        _discard_pool(pool)
+        raise _busy()
+    finally:
+        with _pool_lock:
+            _in_flight -= 1
+
+async def verify_password_async(plain_password, hashed_password):
+    return await _run_in_pool(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await _run_in_pool(get_password_hash, password)
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:  # not already replaced by a concurrent caller
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_password_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
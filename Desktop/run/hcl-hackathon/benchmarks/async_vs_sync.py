@@ -0,0 +1,144 @@
+"""Throughput of the async handlers against the previous sync (threadpool) handlers.
+
+    python -m benchmarks.async_vs_sync --requests 2000 --concurrency 16 64 256
+
+Both apps run in-process over ASGITransport on the same scratch SQLite file
+and the same hardware. The sync app reproduces the old `def` handlers for the
+upcoming-events listing and order placement, which Starlette runs in its
+40-thread pool; the async app is app.main.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import tempfile
+import time
+
+# Point the app at a scratch database before app.config reads the environment.
+# The pool is larger than any tested concurrency: with fewer connections than
+# in-flight requests the sync handlers deadlock until pool_timeout. All 40
+# threads block on checkout while the connection holders wait for a thread to
+# run get_db's teardown.
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='bench_async_')}/bench.db"
+os.environ.setdefault("DB_POOL_SIZE", "300")
+os.environ.setdefault("DB_MAX_OVERFLOW", "0")
+
+import httpx
+from fastapi import Depends, FastAPI, Header, HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, async_engine, get_db, init_db
+from app.main import app as async_app
+from app.models.models import Event, EventStatus, Seat, SeatStatus, User
+from app.schemas.schemas import EventResponse, OrderCreate, OrderResponse
+from app.services.booking_service import create_booking
+from app.utils.pagination import DEFAULT_PAGE_SIZE
+from app.utils.user_cache import user_cache
+from benchmarks.common import seed_event, seed_users, latency_summary
+
+USERS = 500
+
+
+def build_sync_app():
+    sync_app = FastAPI()
+
+    def current_user(db: Session = Depends(get_db), x_user_email: str = Header(...)):
+        user = user_cache.get(x_user_email)
+        if user is None:
+            db_user = db.query(User).filter(User.email == x_user_email).first()
+            if not db_user:
+                raise HTTPException(status_code=401)
+            user = user_cache.put(db_user)
+        return user
+
+    @sync_app.get("/customer/events/upcoming", response_model=list[EventResponse])
+    def view_upcoming_events(db: Session = Depends(get_db), user=Depends(current_user)):
+        stmt = select(Event).where(Event.status == EventStatus.UPCOMING, Event.event_date > datetime.datetime.utcnow())
+        return db.execute(stmt.order_by(Event.id).limit(DEFAULT_PAGE_SIZE)).scalars().all()
+
+    @sync_app.post("/customer/orders", response_model=OrderResponse)
+    def place_order(order_in: OrderCreate, db: Session = Depends(get_db), user=Depends(current_user)):
+        return create_booking(db, user.id, order_in.event_id, order_in.seat_ids, order_in.payment_mode)
+
+    return sync_app
+
+
+def seed(events, seats):
+    init_db()
+    db = SessionLocal()
+    for _ in range(events - 1):
+        seed_event(db, 1)
+    event_id = seed_event(db, seats, max_tickets_per_user=seats).id
+    db.execute(Seat.__table__.insert(), [
+        {"event_id": event_id, "seat_number": f"S-{n}", "status": SeatStatus.AVAILABLE.value}
+        for n in range(1, seats + 1)
+    ])
+    db.commit()
+    seed_users(db, USERS)
+    seat_ids = [row[0] for row in db.query(Seat.id).filter(Seat.event_id == event_id).order_by(Seat.id)]
+    db.close()
+    return event_id, seat_ids
+
+
+async def drive(app, requests, concurrency, make_request):
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    statuses = {}
+    counter = iter(range(requests))
+
+    async def worker(client):
+        for n in counter:
+            started = time.perf_counter()
+            response = await make_request(client, n)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {"requests_per_sec": round(requests / elapsed, 1), "statuses": statuses, "latency": latency_summary(latencies)}
+
+
+async def run(args):
+    event_id, seat_ids = seed(args.events, args.requests * len(args.concurrency) * 2)
+    seats = iter(seat_ids)
+    apps = {"sync": build_sync_app(), "async": async_app}
+
+    def headers(n):
+        return {"X-User-Email": f"bench{n % USERS}@bench.local"}
+
+    async def list_events(client, n):
+        return await client.get("/customer/events/upcoming", headers=headers(n))
+
+    async def place_order(client, n):
+        return await client.post("/customer/orders", headers=headers(n),
+                                 json={"event_id": event_id, "seat_ids": [next(seats)], "payment_mode": "Card"})
+
+    report = {"events": args.events, "requests": args.requests, "results": []}
+    for concurrency in args.concurrency:
+        for name, handler in (("upcoming_events", list_events), ("place_order", place_order)):
+            for variant, app in apps.items():
+                result = await drive(app, args.requests, concurrency, handler)
+                report["results"].append({"endpoint": name, "variant": variant, "concurrency": concurrency, **result})
+    await async_engine.dispose()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[16, 64, 256], help="concurrent clients (keep below DB_POOL_SIZE)")
+    parser.add_argument("--events", type=int, default=200)
+    args = parser.parse_args()
+    report = asyncio.run(run(args))
+    for row in report["results"]:
+        print(f"{row['endpoint']:16} {row['variant']:5} c={row['concurrency']:<4} "
+              f"{row['requests_per_sec']:>8} req/s  p50={row['latency']['p50_ms']}ms p99={row['latency']['p99_ms']}ms {row['statuses']}")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
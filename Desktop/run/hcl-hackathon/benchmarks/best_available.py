@@ -0,0 +1,175 @@
+"""Customers who want N seats together: picking seats client-side vs best available.
+
+    pick            fetch the available seat list (NDJSON stream), take one of the
+                    front-most runs of N adjacent free seats in a row, POST
+                    seat_ids; on a conflict fetch again and retry
+    best_available  POST {"quantity": N}; the server's block allocator picks
+
+Reports orders/sec, attempts per order, bytes downloaded per order and latency.
+A second part times the allocator on its own against a linear scan.
+
+    python -m benchmarks.best_available --sections 4 --rows 25 --seats-per-row 40 --customers 32 --orders 200 --quantity 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+# Point the app at a scratch database before app.config reads the environment.
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='bench_best_available_')}/bench.db"
+
+import httpx
+
+from app.database import SessionLocal, async_engine, init_db
+from app.main import app
+from app.models.models import Seat, SeatStatus
+from app.services.seat_availability import EventSeatBitmap, seat_availability
+from app.services.seat_service import bulk_create_seats, generate_seat_numbers
+from app.schemas.schemas import SeatSection
+from benchmarks.common import latency_summary, seed_event, seed_users
+
+MAX_ATTEMPTS = 5
+# Customers picking by hand spread over this many of the best blocks.
+PICK_CHOICES = 8
+
+
+def seed(args):
+    db = SessionLocal()
+    sections = [SeatSection(name=chr(ord("A") + n), rows=args.rows, seats_per_row=args.seats_per_row) for n in range(args.sections)]
+    seats = args.sections * args.rows * args.seats_per_row
+    event_id = seed_event(db, seats, max_tickets_per_user=seats).id
+    bulk_create_seats(db, event_id, generate_seat_numbers(sections=sections))
+    seat_availability.rebuild_event(db, event_id)
+    db.close()
+    return event_id
+
+
+def pick_block(seats, quantity, rng):
+    # What a customer does with the seat list: one of the front-most runs of adjacent seats.
+    blocks = []
+    run = []
+    for seat in seats:
+        row, _, number = seat["seat_number"].rpartition("-")
+        if run and (row != run[-1][0] or int(number) != run[-1][1] + 1):
+            run = []
+        run.append((row, int(number), seat["id"]))
+        if len(run) == quantity:
+            blocks.append([seat_id for _, _, seat_id in run])
+            run = []
+            if len(blocks) == PICK_CHOICES:
+                break
+    return rng.choice(blocks) if blocks else None
+
+
+async def customer(client, event_id, args, mode, n, stats):
+    headers = {"X-User-Email": f"bench{n}@bench.local"}
+    rng = random.Random(n)
+    while True:
+        async with stats["lock"]:
+            if stats["orders_left"] <= 0:
+                return
+            stats["orders_left"] -= 1
+        started = time.perf_counter()
+        for _ in range(MAX_ATTEMPTS):
+            stats["attempts"] += 1
+            if mode == "pick":
+                response = await client.get(f"/customer/events/{event_id}/seats/available", params={"stream": "true"}, headers=headers)
+                stats["bytes"] += len(response.content)
+                seat_ids = pick_block([json.loads(line) for line in response.text.splitlines()], args.quantity, rng)
+                if seat_ids is None:
+                    stats["sold_out"] += 1
+                    break
+                body = {"event_id": event_id, "seat_ids": seat_ids, "payment_mode": "Card"}
+            else:
+                body = {"event_id": event_id, "quantity": args.quantity, "payment_mode": "Card"}
+            response = await client.post("/customer/orders", headers=headers, json=body)
+            stats["bytes"] += len(response.content)
+            if response.status_code == 200:
+                stats["orders"] += 1
+                break
+            if mode == "best_available" and "adjacent" in response.text:
+                stats["sold_out"] += 1
+                break
+            stats["conflicts"] += 1
+        stats["latencies"].append(time.perf_counter() - started)
+
+
+async def run_mode(client, args, mode):
+    event_id = seed(args)
+    stats = {"lock": asyncio.Lock(), "orders_left": args.orders, "orders": 0, "attempts": 0, "conflicts": 0,
+             "sold_out": 0, "bytes": 0, "latencies": []}
+    started = time.perf_counter()
+    await asyncio.gather(*[customer(client, event_id, args, mode, n, stats) for n in range(args.customers)])
+    elapsed = time.perf_counter() - started
+    orders = stats["orders"] or 1
+    return {
+        "orders": stats["orders"],
+        "orders_per_sec": round(stats["orders"] / elapsed, 1),
+        "attempts_per_order": round(stats["attempts"] / orders, 2),
+        "conflicts": stats["conflicts"],
+        "sold_out": stats["sold_out"],
+        "kb_per_order": round(stats["bytes"] / orders / 1024, 1),
+        "latency": latency_summary(stats["latencies"]),
+    }
+
+
+def allocator_micro(seats_total, quantity, lookups, fill):
+    # Map of rows of 40, `fill` of the seats booked at random, then n-block lookups.
+    rng = random.Random(1)
+    seats = [(n + 1, f"A-R{n // 40 + 1}-{n % 40 + 1}", SeatStatus.BOOKED if rng.random() < fill else SeatStatus.AVAILABLE)
+             for n in range(seats_total)]
+    t0 = time.perf_counter()
+    bitmap = EventSeatBitmap(seats)
+    bitmap.find_seats(quantity, True)
+    build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for _ in range(lookups):
+        bitmap.find_seats(quantity, True)
+    tree = (time.perf_counter() - t0) / lookups
+
+    free = [bitmap.is_available(seat_id) for seat_id, _, _ in seats]
+    t0 = time.perf_counter()
+    for _ in range(max(lookups // 100, 1)):
+        run = 0
+        for offset, is_free in enumerate(free):
+            run = run + 1 if is_free and (run == 0 or offset % 40) else (1 if is_free else 0)
+            if run == quantity:
+                break
+    scan = (time.perf_counter() - t0) / max(lookups // 100, 1)
+    return {"seats": seats_total, "booked_fraction": fill, "tree_build_ms": round(build * 1000, 1),
+            "tree_lookup_us": round(tree * 1e6, 1), "linear_scan_us": round(scan * 1e6, 1)}
+
+
+async def run(args):
+    init_db()
+    db = SessionLocal()
+    seed_users(db, args.customers)
+    db.close()
+    report = {"seats": args.sections * args.rows * args.seats_per_row, "customers": args.customers,
+              "quantity": args.quantity, "orders": args.orders}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        for mode in ("pick", "best_available"):
+            report[mode] = await run_mode(client, args, mode)
+    await async_engine.dispose()
+    report["allocator"] = [allocator_micro(size, args.quantity, 2000, 0.9) for size in (10_000, 100_000)]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=25)
+    parser.add_argument("--seats-per-row", type=int, default=40)
+    parser.add_argument("--customers", type=int, default=32, help="concurrent customers")
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--quantity", type=int, default=4, help="seats per order")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Hammer one hot event with concurrent create_booking calls.
+
+    python -m benchmarks.booking_stress --threads 32 --seats 2000 --orders 5000
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+
+from fastapi import HTTPException
+from sqlalchemy import func
+
+from app.models.models import Seat, Ticket, SeatStatus
+from app.services.booking_service import create_booking
+from benchmarks.common import make_session_factory, seed_event, seed_users, latency_summary
+
+
+def run(threads, seats, orders, users, max_seats_per_order, seed):
+    engine, SessionLocal, path = make_session_factory()
+    db = SessionLocal()
+    event = seed_event(db, seats, max_tickets_per_user=seats)
+    event_id = event.id
+    db.execute(Seat.__table__.insert(), [
+        {"event_id": event_id, "seat_number": f"S-{n}", "status": SeatStatus.AVAILABLE.value}
+        for n in range(1, seats + 1)
+    ])
+    db.commit()
+    seat_ids = [row[0] for row in db.query(Seat.id).filter(Seat.event_id == event_id)]
+    user_ids = seed_users(db, users)
+    db.close()
+
+    outcomes = {"booked": 0, "held": 0, "already_booked": 0, "busy": 0, "error": 0}
+    latencies = []
+    stats_lock = threading.Lock()
+    remaining = [orders]
+
+    def worker(worker_id):
+        rng = random.Random(seed + worker_id)
+        session = SessionLocal()
+        local_latencies = []
+        local_outcomes = dict.fromkeys(outcomes, 0)
+        while True:
+            with stats_lock:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+            wanted = rng.sample(seat_ids, rng.randint(1, max_seats_per_order))
+            started = time.perf_counter()
+            try:
+                create_booking(session, rng.choice(user_ids), event_id, wanted, "Credit Card")
+                local_outcomes["booked"] += 1
+            except HTTPException as exc:
+                session.rollback()
+                if exc.status_code == 409:
+                    local_outcomes["held"] += 1
+                elif exc.status_code == 503:
+                    local_outcomes["busy"] += 1
+                else:
+                    local_outcomes["already_booked"] += 1
+            except Exception:
+                session.rollback()
+                local_outcomes["error"] += 1
+            local_latencies.append(time.perf_counter() - started)
+        session.close()
+        with stats_lock:
+            latencies.extend(local_latencies)
+            for key, value in local_outcomes.items():
+                outcomes[key] += value
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    db = SessionLocal()
+    oversold = db.query(Ticket.seat_id).group_by(Ticket.seat_id).having(func.count(Ticket.id) > 1).count()
+    booked_seats = db.query(Seat).filter(Seat.event_id == event_id, Seat.status == SeatStatus.BOOKED).count()
+    tickets = db.query(Ticket).count()
+    db.close()
+    engine.dispose()
+    os.remove(path)
+
+    return {
+        "threads": threads,
+        "attempts": orders,
+        "elapsed_s": round(elapsed, 3),
+        "orders_per_sec": round(outcomes["booked"] / elapsed, 1),
+        "attempts_per_sec": round(orders / elapsed, 1),
+        "outcomes": outcomes,
+        "latency": latency_summary(latencies),
+        "booked_seats": booked_seats,
+        "tickets": tickets,
+        "oversold_seats": oversold,
+        "zero_oversell": oversold == 0 and booked_seats == tickets,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--seats", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--max-seats-per-order", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    report = run(args.threads, args.seats, args.orders, args.users, args.max_seats_per_order, args.seed)
+    print(json.dumps(report, indent=2))
+    if not report["zero_oversell"]:
+        raise SystemExit("OVERSELL DETECTED")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Upcoming-events listing: uncached vs cached JSON vs 304 revalidation.
+
+    python -m benchmarks.catalogue_cache --events 2000 --requests 3000 --limit 100
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import tempfile
+import time
+
+# Point the app at a scratch database before app.config reads the environment.
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='bench_catalogue_')}/bench.db"
+
+import httpx
+
+from app.database import SessionLocal, async_engine, init_db
+from app.main import app
+from app.models.models import Event, EventStatus, Venue
+from app.utils.catalogue_cache import catalogue_cache
+from benchmarks.common import seed_users, latency_summary
+
+HEADERS = {"X-User-Email": "bench0@bench.local"}
+
+
+def seed(events):
+    init_db()
+    db = SessionLocal()
+    db.add(Venue(name="Bench Arena", city="Bench City", address="1 Bench Rd", total_capacity=1000))
+    db.flush()
+    now = datetime.datetime.utcnow()
+    db.execute(Event.__table__.insert(), [
+        {"name": f"Event {i}", "category": "Music", "event_date": now + datetime.timedelta(days=i + 1),
+         "ticket_price": 50.0, "max_tickets_per_user": 10, "status": EventStatus.UPCOMING.value, "venue_id": 1}
+        for i in range(events)
+    ])
+    db.commit()
+    seed_users(db, 1)
+    db.close()
+
+
+async def run_mode(client, requests, url, mode):
+    latencies = []
+    statuses = {}
+    etag = (await client.get(url, headers=HEADERS)).headers["etag"]
+    started = time.perf_counter()
+    for _ in range(requests):
+        if mode == "uncached":
+            catalogue_cache.bump()
+        headers = {**HEADERS, "If-None-Match": etag} if mode == "not_modified" else HEADERS
+        t0 = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        latencies.append(time.perf_counter() - t0)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    elapsed = time.perf_counter() - started
+    return {"requests_per_sec": round(requests / elapsed, 1), "statuses": statuses, "latency": latency_summary(latencies)}
+
+
+async def run(args):
+    seed(args.events)
+    url = f"/customer/events/upcoming?limit={args.limit}"
+    report = {"events": args.events, "limit": args.limit}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for mode in ("uncached", "cached", "not_modified"):
+            report[mode] = await run_mode(client, args.requests, url, mode)
+    report["cache"] = catalogue_cache.stats()
+    await async_engine.dispose()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
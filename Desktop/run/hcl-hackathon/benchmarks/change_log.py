@@ -0,0 +1,142 @@
+"""Downstream sync: re-scanning orders/tickets/refunds vs reading the change log.
+
+Seeds a scratch database with seed_dataset and times --overhead-orders
+single-seat orders through booking_service.create_booking, with the change log
+switched off (change_log.record made a no-op) for alternating rounds, to show
+what the outbox insert adds to a booking. Then --changes more orders are
+placed, every tenth one refunded through process_refund, and two downstream
+consumers catch up on them:
+  rescan     reads (id, status) of every order, ticket and refund request and
+             diffs them against its previous copy, as consumers did before;
+  change log reads consumer batches of --batch-size and acknowledges them.
+Each is timed after the changes and once more with nothing new (an idle poll).
+
+    python -m benchmarks.change_log --orders 200000 --changes 1000
+"""
+import argparse
+import json
+import statistics
+import time
+
+from sqlalchemy import select
+
+from app.models.models import Event, EventStatus, Order, RefundRequest, RefundStatus, Seat, SeatStatus, Ticket, User
+from app.seed import seed_dataset
+from app.services import booking_service, change_log
+from benchmarks.common import make_session_factory
+
+ROUND = 50
+TABLES = {"orders": (Order.id, Order.order_status), "tickets": (Ticket.id, Ticket.status), "refund_requests": (RefundRequest.id, RefundRequest.status)}
+
+
+def rescan(db, previous):
+    # Full read of the three tables, diffed against the last copy.
+    current, rows, changed = {}, 0, 0
+    for table, columns in TABLES.items():
+        statuses = dict(db.execute(select(*columns)).all())
+        rows += len(statuses)
+        old = previous.get(table, {})
+        changed += sum(1 for key, status in statuses.items() if old.get(key) != status)
+        current[table] = statuses
+    return current, rows, changed
+
+
+def read_log(db, name, batch_size):
+    entries = 0
+    while True:
+        batch = change_log.consumer_batch(db, name, batch_size)
+        entries += len(batch["entries"])
+        if batch["position"] == batch["checkpoint"]:
+            return entries
+        change_log.ack(db, name, batch["position"])
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return (time.perf_counter() - started) * 1000, result
+
+
+def booking_target(db, orders):
+    event = db.scalars(select(Event).where(Event.status == EventStatus.UPCOMING).order_by(Event.id.desc())).first()
+    seat_ids = db.scalars(
+        select(Seat.id).where(Seat.event_id == event.id, Seat.status == SeatStatus.AVAILABLE).order_by(Seat.id).limit(orders)
+    ).all()
+    user_ids = db.scalars(select(User.id).order_by(User.id).limit(1000)).all()
+    event.max_tickets_per_user = orders
+    db.commit()
+    return event.id, iter(seat_ids), user_ids
+
+
+def booking_overhead(db, target, orders):
+    # Rounds of ROUND orders, alternating the change log on and off.
+    event_id, seats, user_ids = target
+    record = change_log.record
+    latencies = {"on": [], "off": []}
+    try:
+        for n in range(orders):
+            mode = "on" if (n // ROUND) % 2 == 0 else "off"
+            change_log.record = record if mode == "on" else (lambda db, entries: None)
+            started = time.perf_counter()
+            booking_service.create_booking(db, user_ids[n % len(user_ids)], event_id, [next(seats)], "Card")
+            latencies[mode].append((time.perf_counter() - started) * 1000)
+    finally:
+        change_log.record = record
+    return {mode: round(statistics.median(samples), 2) for mode, samples in latencies.items()}
+
+
+def place_changes(db, target, orders):
+    # Orders, and an approved refund for every tenth one.
+    event_id, seats, user_ids = target
+    for n in range(orders):
+        order = booking_service.create_booking(db, user_ids[n % len(user_ids)], event_id, [next(seats)], "Card")
+        if n % 10 == 9:
+            db.add(RefundRequest(order_id=order.id, reason="bench"))
+            db.commit()
+            refund_id = db.scalar(select(RefundRequest.id).where(RefundRequest.order_id == order.id))
+            booking_service.process_refund(db, refund_id, RefundStatus.APPROVED, "bench")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--events", type=int, default=100)
+    parser.add_argument("--seats-per-event", type=int, default=5_000)
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--changes", type=int, default=1_000, help="orders placed after the consumers' last sync")
+    parser.add_argument("--overhead-orders", type=int, default=1_000, help="orders timed with the change log on/off")
+    parser.add_argument("--batch-size", type=int, default=change_log.DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    engine, Session, path = make_session_factory()
+    db = Session()
+    seed_dataset(db, args.users, args.events, args.seats_per_event, args.orders, workers=1)
+
+    target = booking_target(db, args.overhead_orders + args.changes)
+    overhead = booking_overhead(db, target, args.overhead_orders)
+
+    # Both consumers start in sync, then the changes happen.
+    snapshot, _, _ = rescan(db, {})
+    change_log.ack(db, "bench", change_log.head(db))
+    start = change_log.head(db)
+    place_changes(db, target, args.changes)
+
+    report = {
+        "orders_seeded": args.orders,
+        "booking_p50_ms": {"change_log_on": overhead["on"], "change_log_off": overhead["off"]},
+        "changes": {"orders": args.changes, "refunds": args.changes // 10, "change_log_entries": change_log.head(db) - start},
+    }
+    for phase in ("after_changes", "idle"):
+        ms, (snapshot, rows, changed) = timed(rescan, db, snapshot)
+        log_ms, entries = timed(read_log, db, "bench", args.batch_size)
+        report[phase] = {
+            "rescan": {"ms": round(ms, 1), "rows_read": rows, "rows_changed": changed},
+            "change_log": {"ms": round(log_ms, 1), "entries_read": entries},
+        }
+    db.close()
+    engine.dispose()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
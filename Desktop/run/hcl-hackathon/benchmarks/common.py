@@ -0,0 +1,76 @@
+import datetime
+import os
+import tempfile
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.database import build_async_engine, build_engine, init_db
+from app.models.models import User, UserRole, Venue, Event, EventStatus
+
+# Benchmarks run against a throwaway SQLite file so they never touch event_booking.db.
+# Users get a fixed dummy hash: bcrypt would dominate seeding time.
+DUMMY_PASSWORD_HASH = "$2b$12$benchmarkbenchmarkbenchmarkbenchmarkbenchmarkbenchmark"
+
+
+def make_session_factory(path=None):
+    if path is None:
+        fd, path = tempfile.mkstemp(prefix="bench_", suffix=".db")
+        os.close(fd)
+    engine = build_engine(f"sqlite:///{path}")
+    init_db(engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine), path
+
+
+def make_async_session_factory(path):
+    # Async sessions on the same scratch file, for calling the (async) route handlers directly.
+    engine = build_async_engine(f"sqlite:///{path}")
+    return engine, async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+
+def seed_event(db, seat_count, max_tickets_per_user=10, days_ahead=30):
+    venue = Venue(name="Bench Arena", city="Bench City", address="1 Bench Rd", total_capacity=seat_count)
+    db.add(venue)
+    db.flush()
+    event = Event(
+        name="Bench Event",
+        category="Benchmark",
+        event_date=datetime.datetime.utcnow() + datetime.timedelta(days=days_ahead),
+        ticket_price=50.0,
+        max_tickets_per_user=max_tickets_per_user,
+        status=EventStatus.UPCOMING,
+        venue_id=venue.id,
+    )
+    db.add(event)
+    db.commit()
+    return event
+
+
+def seed_users(db, count, role=UserRole.CUSTOMER, prefix="bench"):
+    db.execute(
+        User.__table__.insert(),
+        [
+            {"name": f"{prefix} {i}", "email": f"{prefix}{i}@bench.local", "password": DUMMY_PASSWORD_HASH, "role": role.value}
+            for i in range(count)
+        ],
+    )
+    db.commit()
+    return [row[0] for row in db.query(User.id).filter(User.email.like(f"{prefix}%@bench.local")).order_by(User.id)]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def latency_summary(samples_seconds):
+    return {
+        "count": len(samples_seconds),
+        "p50_ms": round(percentile(samples_seconds, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples_seconds, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples_seconds, 99) * 1000, 3),
+        "max_ms": round(max(samples_seconds) * 1000, 3) if samples_seconds else 0.0,
+    }
@@ -0,0 +1,137 @@
+"""Event search latency at catalogue scale.
+
+Seeds a scratch SQLite database with --events events (names built from a word
+list, spread over categories, venues in --cities cities, dates and prices),
+builds the full-text index, then times each query shape through
+event_search.search: free text, prefixes, facet filters, ranges, combinations
+and a deep keyset page, each with facet counts. Reports p50/p99 per shape,
+whether p99 stays under --target-ms, and how long the in-memory facet index
+takes to rebuild (paid by the first search after a catalogue write).
+
+    python -m benchmarks.event_search --events 100000 --repeat 50
+"""
+import argparse
+import datetime
+import json
+import random
+import statistics
+import time
+
+from app.models.models import Event, EventStatus, Venue
+from app.services import event_search
+from app.services.event_search import SearchFilters
+from benchmarks.common import make_session_factory
+
+CATEGORIES = ["Music", "Sports", "Technology", "Comedy", "Theatre", "Family", "Food", "Film", "Art", "Dance", "Opera", "Festival"]
+WORDS = [
+    "jazz", "rock", "summer", "winter", "night", "live", "grand", "open", "classic", "electric", "acoustic", "world",
+    "city", "championship", "final", "derby", "league", "summit", "conference", "hackathon", "stand", "comedy",
+    "gala", "tour", "festival", "sessions", "symphony", "orchestra", "ballet", "premiere", "expo", "market",
+    "marathon", "cup", "showcase", "revival", "anniversary", "legends", "underground", "rooftop",
+]
+CITIES = [
+    "New York", "London", "Mumbai", "Berlin", "Tokyo", "Sydney", "Toronto", "Sao Paulo", "Paris", "Madrid", "Delhi",
+    "Chicago", "Dublin", "Lisbon", "Seoul", "Singapore", "Cape Town", "Mexico City", "Amsterdam", "Vienna",
+]
+
+
+def seed(db, events, venues, cities, rng):
+    now = datetime.datetime.utcnow()
+    db.execute(Venue.__table__.insert(), [
+        {"name": f"{rng.choice(WORDS).title()} Arena {n}", "city": cities[n % len(cities)], "address": f"{n} Search Rd", "total_capacity": 5000}
+        for n in range(venues)
+    ])
+    # Mostly upcoming, like the on-sale catalogue; some history that search must skip.
+    rows = []
+    for n in range(events):
+        upcoming = n % 10 != 0
+        rows.append({
+            "name": " ".join(word.title() for word in rng.sample(WORDS, 3)) + f" {n}",
+            "category": rng.choice(CATEGORIES),
+            "event_date": now + datetime.timedelta(days=rng.randint(1, 365) if upcoming else -rng.randint(1, 365), hours=rng.randint(0, 23)),
+            "ticket_price": float(rng.choice((15, 25, 40, 50, 75, 100, 150, 250, 400))),
+            "max_tickets_per_user": 10,
+            "status": (EventStatus.UPCOMING if upcoming else EventStatus.CLOSED).value,
+            "venue_id": 1 + rng.randrange(venues),
+        })
+    db.execute(Event.__table__.insert(), rows)
+    event_search.rebuild_index(db)
+    db.commit()
+
+
+def shapes(events):
+    now = datetime.datetime.utcnow()
+    month = (now + datetime.timedelta(days=30), now + datetime.timedelta(days=60))
+    return {
+        "browse": SearchFilters(),
+        "text": SearchFilters(q="jazz"),
+        "prefix": SearchFilters(q="sym"),
+        "text_2_terms": SearchFilters(q="summer festival"),
+        "text_city": SearchFilters(q="rock london"),
+        "text_one_event": SearchFilters(q=str(events // 2 + 1)),
+        "category": SearchFilters(categories=["Music"]),
+        "categories_cities": SearchFilters(categories=["Music", "Comedy"], cities=["London", "Berlin"]),
+        "date_range": SearchFilters(date_from=month[0], date_to=month[1]),
+        "price_range": SearchFilters(price_min=20, price_max=60),
+        "everything": SearchFilters(q="live", categories=["Music"], cities=["London"], date_from=month[0], date_to=month[1], price_min=20, price_max=160),
+    }
+
+
+def time_search(db, filters, after, limit, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result, next_cursor = event_search.search(db, filters, after, limit)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 2),
+        "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 2),
+        "total": result["total"],
+        "page": len(result["results"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--venues", type=int, default=2_000)
+    parser.add_argument("--cities", type=int, default=len(CITIES))
+    parser.add_argument("--limit", type=int, default=20, help="page size")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--target-ms", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    engine, Session, path = make_session_factory()
+    db = Session()
+    started = time.perf_counter()
+    seed(db, args.events, args.venues, CITIES[:args.cities], random.Random(args.seed))
+    seed_seconds = time.perf_counter() - started
+
+    builds = []
+    for _ in range(5):
+        started = time.perf_counter()
+        event_search.facet_index.rebuild(db)
+        builds.append((time.perf_counter() - started) * 1000)
+
+    report = {
+        "events": args.events,
+        "venues": args.venues,
+        "seed_s": round(seed_seconds, 1),
+        "facet_index_build_ms": round(statistics.median(builds), 1),
+        "target_ms": args.target_ms,
+        "queries": {},
+    }
+    for name, filters in shapes(args.events).items():
+        time_search(db, filters, None, args.limit, 3)  # warm the page cache
+        report["queries"][name] = time_search(db, filters, None, args.limit, args.repeat)
+    report["queries"]["deep_page"] = time_search(db, SearchFilters(q="jazz"), args.events * 9 // 10, args.limit, args.repeat)
+    report["within_target"] = all(query["p99_ms"] <= args.target_ms for query in report["queries"].values())
+    db.close()
+    engine.dispose()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Doors-open simulation: many gates scanning distinct tickets of one event.
+
+    python -m benchmarks.gate_scan --tickets 20000 --gates 16 --rate 6000 --batch-size 50
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import time
+import uuid
+
+from app.models.models import Order, OrderStatus, Seat, SeatStatus, Ticket, TicketStatus, EntryLog, UserRole
+from app.routers.entry_manager import scan_ticket, scan_ticket_batch, validate_ticket
+from app.schemas.schemas import TicketScanBatch
+from app.services.gate_index import gate_index
+from app.utils.user_cache import CachedUser
+from benchmarks.common import make_async_session_factory, make_session_factory, seed_event, seed_users, latency_summary
+
+
+def seed(db, tickets):
+    event_id = seed_event(db, tickets, max_tickets_per_user=tickets).id
+    user_id = seed_users(db, 1)[0]
+    now = datetime.datetime.utcnow()
+    db.execute(Seat.__table__.insert(), [
+        {"event_id": event_id, "seat_number": f"S-{n}", "status": SeatStatus.BOOKED.value} for n in range(1, tickets + 1)
+    ])
+    seat_ids = [row[0] for row in db.query(Seat.id).filter(Seat.event_id == event_id).order_by(Seat.id)]
+    db.execute(Order.__table__.insert(), [
+        {"user_id": user_id, "event_id": event_id, "total_amount": 50.0, "payment_mode": "Card",
+         "order_status": OrderStatus.CONFIRMED.value, "booking_time": now} for _ in seat_ids
+    ])
+    order_ids = [row[0] for row in db.query(Order.id).order_by(Order.id)]
+    codes = [str(uuid.uuid4()) for _ in seat_ids]
+    db.execute(Ticket.__table__.insert(), [
+        {"order_id": order_id, "seat_id": seat_id, "ticket_code": code, "status": TicketStatus.ACTIVE.value, "generated_at": now}
+        for order_id, seat_id, code in zip(order_ids, seat_ids, codes)
+    ])
+    db.commit()
+    return event_id, codes
+
+
+async def run_gates(AsyncSessionLocal, codes, gates, handler, scanner, rate_per_min=0):
+    # rate_per_min > 0 paces the gates (open loop) so latency reflects a realistic
+    # scan rate instead of a saturated CPU.
+    latencies = []
+    chunks = [codes[i::gates] for i in range(gates)]
+    interval = gates * 60.0 / rate_per_min if rate_per_min else 0
+
+    async def gate(chunk):
+        async with AsyncSessionLocal() as db:
+            next_at = time.perf_counter()
+            for code in chunk:
+                if interval:
+                    next_at += interval
+                    await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+                started = time.perf_counter()
+                result = await handler(code, db=db, current_user=scanner)
+                latencies.append(time.perf_counter() - started)
+                assert result["is_valid"], result
+
+    started = time.perf_counter()
+    await asyncio.gather(*(gate(chunk) for chunk in chunks))
+    elapsed = time.perf_counter() - started
+    return {"scans": len(codes), "scans_per_min": round(len(codes) / elapsed * 60), "latency": latency_summary(latencies)}
+
+
+async def run_batches(AsyncSessionLocal, codes, gates, batch_size, scanner):
+    # Each gate uploads its scans batch_size at a time through /gate/scan-batch.
+    latencies = []
+    chunks = [codes[i::gates] for i in range(gates)]
+
+    async def gate(chunk):
+        async with AsyncSessionLocal() as db:
+            for start in range(0, len(chunk), batch_size):
+                batch = TicketScanBatch(ticket_codes=chunk[start:start + batch_size])
+                started = time.perf_counter()
+                result = await scan_ticket_batch(batch, db=db, current_user=scanner)
+                latencies.append(time.perf_counter() - started)
+                assert result["admitted"] == len(batch.ticket_codes), result
+
+    started = time.perf_counter()
+    await asyncio.gather(*(gate(chunk) for chunk in chunks))
+    elapsed = time.perf_counter() - started
+    return {"scans": len(codes), "batch_size": batch_size, "scans_per_min": round(len(codes) / elapsed * 60), "batch_latency": latency_summary(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickets", type=int, default=20000)
+    parser.add_argument("--gates", type=int, default=16)
+    parser.add_argument("--rate", type=int, default=0, help="target scans per minute across all gates (0 = as fast as possible)")
+    parser.add_argument("--batch-size", type=int, default=50, help="codes per /gate/scan-batch call")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+async def run(args):
+    engine, SessionLocal, path = make_session_factory()
+    async_engine, AsyncSessionLocal = make_async_session_factory(path)
+    db = SessionLocal()
+    event_id, codes = seed(db, args.tickets)
+    scanner = CachedUser(id=1, name="Gate", email="gate@bench.local", role=UserRole.ENTRY_MANAGER.value)
+    third = len(codes) // 3
+
+    report = {"tickets": args.tickets, "gates": args.gates, "target_rate_per_min": args.rate}
+    report["validate_db_lookup"] = await run_gates(AsyncSessionLocal, codes[:2000], args.gates, validate_ticket, scanner, args.rate)
+    report["scan_db_path"] = await run_gates(AsyncSessionLocal, codes[:third], args.gates, scan_ticket, scanner, args.rate)
+    report["scan_batch"] = await run_batches(AsyncSessionLocal, codes[third:2 * third], args.gates, args.batch_size, scanner)
+
+    started = time.perf_counter()
+    gate_index.warm(db, event_id)
+    report["warm_seconds"] = round(time.perf_counter() - started, 3)
+    report["validate_gate_mode"] = await run_gates(AsyncSessionLocal, codes[2 * third:], args.gates, validate_ticket, scanner, args.rate)
+    report["scan_gate_mode"] = await run_gates(AsyncSessionLocal, codes[2 * third:], args.gates, scan_ticket, scanner, args.rate)
+
+    used = db.query(Ticket).filter(Ticket.status == TicketStatus.USED).count()
+    logs = db.query(EntryLog).count()
+    report["consistent"] = used == logs == len(codes)
+    db.close()
+    await async_engine.dispose()
+    engine.dispose()
+    os.remove(path)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,519 @@
+"""Load test the real routers with the platform's traffic mix.
+
+Seeds (or reuses) a synthetic dataset built by app.seed.seed_dataset, then runs
+closed-loop virtual users against the app for --duration seconds and prints a
+JSON report: throughput, status codes and latency percentiles per operation,
+tagged with the git commit so runs can be compared between commits.
+
+Scenarios:
+    browse   catalogue pages, seat maps and availability counts, own tickets
+    onsale   a booking storm on the hot event: best-available and picked-seat
+             orders while everyone polls the seat map
+    gate     entry managers scanning tickets one by one and in batches
+    support  case and refund queues, case updates, refund decisions, new cases
+    mixed    all of the above, weighted by MIXED_WEIGHTS
+
+Transports:
+    inprocess  httpx.ASGITransport straight into app.main.app (no sockets)
+    http       a uvicorn worker started on --db, or an already running server
+               given with --base-url (it must use the same --db)
+
+Dataset scales (users / events / seats per event / orders): small
+10k/50/2k/20k, medium 50k/200/5k/250k, full 100k/500/10k/1M (5M seats). A --db
+that already holds a seeded dataset is reused as is.
+
+    python -m benchmarks.harness --scale small --scenario mixed --concurrency 32 --duration 30 --out run.json
+    python -m benchmarks.harness --scale full --db /tmp/full.db --scenario onsale --transport http
+    python -m benchmarks.harness --db /tmp/full.db --scenario mixed --compare run.json
+    python -m benchmarks.harness --candidate new.json --compare old.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+SCALES = {
+    "small": {"users": 10_000, "events": 50, "seats_per_event": 2_000, "orders": 20_000},
+    "medium": {"users": 50_000, "events": 200, "seats_per_event": 5_000, "orders": 250_000},
+    "full": {"users": 100_000, "events": 500, "seats_per_event": 10_000, "orders": 1_000_000},
+}
+# Share of requests per scenario in the mixed run: mostly people browsing.
+MIXED_WEIGHTS = {"browse": 60, "onsale": 20, "gate": 12, "support": 8}
+SCAN_BATCH_SIZE = 20
+TICKET_CODE_POOL = 100_000
+# Operations whose p99 or throughput moved by more than this are regressions.
+DEFAULT_TOLERANCE = 0.15
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=["browse", "onsale", "gate", "support", "mixed"], default="mixed")
+    parser.add_argument("--transport", choices=["inprocess", "http"], default="inprocess")
+    parser.add_argument("--base-url", help="with --transport http: use this server instead of starting one")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--events", type=int)
+    parser.add_argument("--seats-per-event", type=int)
+    parser.add_argument("--orders", type=int)
+    parser.add_argument("--seed", type=int, default=42, help="dataset and traffic seed")
+    parser.add_argument("--db", help="SQLite file to seed or reuse (default: a scratch file)")
+    parser.add_argument("--concurrency", type=int, default=32, help="virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds run before measuring")
+    parser.add_argument("--startup-timeout", type=float, default=600.0, help="seconds to wait for the app's startup")
+    parser.add_argument("--out", help="also write the report here")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against an earlier report; exit 1 on regressions")
+    parser.add_argument("--candidate", metavar="REPORT", help="with --compare: compare this report instead of running")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+    for name, value in SCALES[args.scale].items():
+        if getattr(args, name) is None:
+            setattr(args, name, value)
+    return args
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def prepare_database(args):
+    # Seeds the dataset unless the file already has one; returns what the
+    # scenarios need to know about it.
+    from sqlalchemy import func, select
+
+    from app.database import SessionLocal, init_db
+    from app.models.models import (
+        Event, EventCounter, EventStatus, Order, RefundRequest, RefundStatus, SupportCase, SupportStatus,
+        Ticket, TicketStatus, User, UserRole,
+    )
+    from app.seed import seed_dataset, seed_emails
+
+    init_db()
+    db = SessionLocal()
+    seeded_at = None
+    if not db.scalar(select(func.count(User.id)).where(User.email.like("%@seed.local"))):
+        started = time.perf_counter()
+        seed_dataset(db, args.users, args.events, args.seats_per_event, args.orders, args.seed)
+        seeded_at = round(time.perf_counter() - started, 1)
+
+    rng = random.Random(args.seed)
+    roles = dict(db.execute(select(User.role, func.count(User.id)).where(User.email.like("%@seed.local")).group_by(User.role)).all())
+    upcoming = [row.id for row in db.query(Event.id).filter(Event.status == EventStatus.UPCOMING).order_by(Event.id)]
+    # The hot event: the upcoming one with the most seats left.
+    hot = db.execute(
+        select(EventCounter.event_id)
+        .join(Event, Event.id == EventCounter.event_id)
+        .where(Event.status == EventStatus.UPCOMING)
+        .order_by((EventCounter.seats_total - EventCounter.seats_booked).desc(), EventCounter.event_id)
+        .limit(1)
+    ).scalar()
+    max_ticket = db.scalar(select(func.max(Ticket.id))) or 0
+    codes = [
+        row.ticket_code for row in
+        db.query(Ticket.ticket_code)
+        .join(Order, Order.id == Ticket.order_id)
+        .filter(Order.event_id.in_(upcoming), Ticket.status == TicketStatus.ACTIVE, Ticket.id >= rng.randint(0, max(0, max_ticket - TICKET_CODE_POOL * 2)))
+        .order_by(Ticket.id)
+        .limit(TICKET_CODE_POOL)
+    ]
+    rng.shuffle(codes)
+    fixtures = {
+        "emails": {role: seed_emails(role) for role in UserRole},
+        "role_counts": {role: roles.get(role.value, 0) for role in UserRole},
+        "upcoming": upcoming,
+        "hot_event": hot,
+        "ticket_codes": codes,
+        "pending_refunds": [row.id for row in db.query(RefundRequest.id).filter(RefundRequest.status == RefundStatus.PENDING).order_by(RefundRequest.id).limit(50_000)],
+        "open_cases": [row.id for row in db.query(SupportCase.id).filter(SupportCase.status != SupportStatus.CLOSED).order_by(SupportCase.id).limit(50_000)],
+        "max_case_id": db.scalar(select(func.max(SupportCase.id))) or 0,
+        "max_refund_id": db.scalar(select(func.max(RefundRequest.id))) or 0,
+    }
+    dataset = {
+        "users": sum(roles.values()),
+        "events": db.scalar(select(func.count(Event.id))),
+        "seats": db.scalar(select(func.coalesce(func.sum(EventCounter.seats_total), 0))),
+        "orders": db.scalar(select(func.max(Order.id))) or 0,
+        "seeded_in_seconds": seeded_at,
+    }
+    db.close()
+    return fixtures, dataset
+
+
+class Traffic:
+    # Operations drawn by weight; each one makes one or two requests and
+    # records them under "<scenario>.<operation>".
+    def __init__(self, fixtures, rng):
+        from app.models.models import UserRole
+
+        self.fx = fixtures
+        self.rng = rng
+        self.roles = UserRole
+        self.codes = fixtures["ticket_codes"]
+        self.used_codes = []
+        self.pending_refunds = list(reversed(fixtures["pending_refunds"]))
+
+    def user(self, role):
+        count = self.fx["role_counts"][role]
+        return {"X-User-Email": self.fx["emails"][role].format(self.rng.randrange(max(count, 1)))}
+
+    def customer(self):
+        return self.user(self.roles.CUSTOMER)
+
+    def operations(self):
+        return {
+            "browse": [
+                ("upcoming_first_page", 4, self.upcoming_first_page),
+                ("upcoming_page", 2, self.upcoming_page),
+                ("seat_count", 3, self.seat_count),
+                ("seat_ranges", 1, self.seat_ranges),
+                ("seat_page", 1, self.seat_page),
+                ("my_tickets", 2, self.my_tickets),
+            ],
+            "onsale": [
+                ("book_best_available", 5, self.book_best_available),
+                ("book_picked_seats", 2, self.book_picked_seats),
+                ("hot_seat_count", 3, self.hot_seat_count),
+            ],
+            "gate": [
+                ("scan", 8, self.scan),
+                ("scan_batch", 1, self.scan_batch),
+                ("validate", 1, self.validate),
+            ],
+            "support": [
+                ("list_cases", 3, self.list_cases),
+                ("update_case", 2, self.update_case),
+                ("list_refunds", 2, self.list_refunds),
+                ("process_refund", 1, self.process_refund),
+                ("raise_case", 2, self.raise_case),
+            ],
+        }
+
+    # Browsing
+    async def upcoming_first_page(self, client, record):
+        await record(client.get("/customer/events/upcoming", params={"limit": 20}, headers=self.customer()))
+
+    async def upcoming_page(self, client, record):
+        after = self.rng.choice(self.fx["upcoming"])
+        await record(client.get("/customer/events/upcoming", params={"after": after, "limit": 20}, headers=self.customer()))
+
+    async def seat_count(self, client, record):
+        event_id = self.rng.choice(self.fx["upcoming"])
+        await record(client.get(f"/customer/events/{event_id}/seats/available", params={"view": "count"}, headers=self.customer()))
+
+    async def seat_ranges(self, client, record):
+        event_id = self.rng.choice(self.fx["upcoming"])
+        await record(client.get(f"/customer/events/{event_id}/seats/available", params={"view": "ranges"}, headers=self.customer()))
+
+    async def seat_page(self, client, record):
+        event_id = self.rng.choice(self.fx["upcoming"])
+        await record(client.get(f"/customer/events/{event_id}/seats/available", params={"limit": 100}, headers=self.customer()))
+
+    async def my_tickets(self, client, record):
+        await record(client.get("/customer/tickets", params={"limit": 20}, headers=self.customer()))
+
+    # On-sale storm
+    async def book_best_available(self, client, record):
+        order = {"event_id": self.fx["hot_event"], "quantity": self.rng.choice((1, 2, 2, 3, 4)), "payment_mode": "Card"}
+        await record(client.post("/customer/orders", json=order, headers=self.customer()))
+
+    async def book_picked_seats(self, client, record):
+        # Look at the seat map, then go for a few adjacent seats, like a person
+        # clicking on it; the seats may be gone by the time the order lands.
+        headers = self.customer()
+        event_id = self.fx["hot_event"]
+        response = await record(client.get(f"/customer/events/{event_id}/seats/available", params={"view": "ranges"}, headers=headers), "seat_map")
+        ranges = response.json().get("ranges") if response.status_code == 200 else None
+        if not ranges:
+            return
+        first, last = self.rng.choice(ranges)
+        count = min(self.rng.choice((1, 2, 2, 3, 4)), last - first + 1)
+        start = self.rng.randint(first, last - count + 1)
+        order = {"event_id": event_id, "seat_ids": list(range(start, start + count)), "payment_mode": "Card"}
+        await record(client.post("/customer/orders", json=order, headers=headers))
+
+    async def hot_seat_count(self, client, record):
+        await record(client.get(f"/customer/events/{self.fx['hot_event']}/seats/available", params={"view": "count"}, headers=self.customer()))
+
+    # Gate
+    def next_code(self):
+        # Fresh codes first; once they run out, rescans of used tickets.
+        code = self.codes.pop() if self.codes else self.rng.choice(self.used_codes or ["missing"])
+        self.used_codes.append(code)
+        return code
+
+    async def scan(self, client, record):
+        await record(client.post(f"/entry-manager/gate/scan/{self.next_code()}", headers=self.user(self.roles.ENTRY_MANAGER)))
+
+    async def scan_batch(self, client, record):
+        codes = [self.next_code() for _ in range(SCAN_BATCH_SIZE)]
+        await record(client.post("/entry-manager/gate/scan-batch", json={"ticket_codes": codes}, headers=self.user(self.roles.ENTRY_MANAGER)))
+
+    async def validate(self, client, record):
+        code = self.rng.choice(self.codes or self.used_codes or ["missing"])
+        await record(client.post(f"/entry-manager/tickets/validate/{code}", headers=self.user(self.roles.ENTRY_MANAGER)))
+
+    # Support triage
+    async def list_cases(self, client, record):
+        after = self.rng.randrange(max(self.fx["max_case_id"], 1))
+        await record(client.get("/support/cases", params={"after": after, "limit": 50}, headers=self.user(self.roles.SUPPORT)))
+
+    async def update_case(self, client, record):
+        if not self.fx["open_cases"]:
+            return
+        case_id = self.rng.choice(self.fx["open_cases"])
+        update = {"status": self.rng.choice(("in_progress", "closed")), "resolution_note": "Handled by load test"}
+        await record(client.patch(f"/support/cases/{case_id}", json=update, headers=self.user(self.roles.SUPPORT)))
+
+    async def list_refunds(self, client, record):
+        after = self.rng.randrange(max(self.fx["max_refund_id"], 1))
+        await record(client.get("/support/refunds", params={"after": after, "limit": 50}, headers=self.user(self.roles.SUPPORT)))
+
+    async def process_refund(self, client, record):
+        if not self.pending_refunds:
+            return
+        decision = {"status": self.rng.choice(("approved", "rejected")), "resolution_note": "Load test decision"}
+        await record(client.post(f"/support/refunds/{self.pending_refunds.pop()}/process", json=decision, headers=self.user(self.roles.SUPPORT)))
+
+    async def raise_case(self, client, record):
+        case = {"subject": "Ticket issue", "description": "Raised by load test"}
+        await record(client.post("/customer/support", json=case, headers=self.customer()))
+
+
+class Recorder:
+    def __init__(self):
+        self.measuring = False
+        self.latencies = {}
+        self.statuses = {}
+
+    def for_operation(self, name):
+        async def record(request, suffix=None):
+            key = f"{name}.{suffix}" if suffix else name
+            started = time.perf_counter()
+            try:
+                response = await request
+                status = response.status_code
+            except Exception as exc:
+                response, status = None, type(exc).__name__
+            if self.measuring:
+                self.latencies.setdefault(key, []).append(time.perf_counter() - started)
+                self.statuses.setdefault(key, Counter())[str(status)] += 1
+            if response is None:
+                raise _RequestFailed(status)
+            return response
+        return record
+
+
+class _RequestFailed(Exception):
+    pass
+
+
+def weighted_plan(traffic, scenario):
+    operations = traffic.operations()
+    scenarios = MIXED_WEIGHTS if scenario == "mixed" else {scenario: 1}
+    plan = []
+    for name, share in scenarios.items():
+        total = sum(weight for _, weight, _ in operations[name])
+        plan.extend((f"{name}.{op}", share * weight / total, func) for op, weight, func in operations[name])
+    return plan
+
+
+async def drive(args, fixtures, base_url, transport):
+    import httpx
+
+    from benchmarks.common import latency_summary
+
+    rng = random.Random(args.seed + 1)
+    traffic = Traffic(fixtures, rng)
+    recorder = Recorder()
+    plan = weighted_plan(traffic, args.scenario)
+    names = [name for name, _, _ in plan]
+    weights = [weight for _, weight, _ in plan]
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=60.0) as client:
+        async def virtual_user(deadline):
+            while time.perf_counter() < deadline:
+                index = rng.choices(range(len(plan)), weights)[0]
+                try:
+                    await plan[index][2](client, recorder.for_operation(names[index]))
+                except _RequestFailed:
+                    pass
+
+        started = time.perf_counter()
+        warm_until = started + args.warmup
+        deadline = warm_until + args.duration
+        users = [asyncio.create_task(virtual_user(deadline)) for _ in range(args.concurrency)]
+        await asyncio.sleep(max(warm_until - time.perf_counter(), 0))
+        recorder.measuring = True
+        measured_from = time.perf_counter()
+        await asyncio.gather(*users)
+        elapsed = time.perf_counter() - measured_from
+
+    operations = {}
+    for name in sorted(recorder.latencies):
+        samples = recorder.latencies[name]
+        statuses = recorder.statuses[name]
+        operations[name] = {
+            **latency_summary(samples),
+            "rps": round(len(samples) / elapsed, 1),
+            "statuses": dict(sorted(statuses.items())),
+            "errors": sum(count for status, count in statuses.items() if not status.isdigit() or int(status) >= 500),
+        }
+    everything = [sample for samples in recorder.latencies.values() for sample in samples]
+    total = {
+        **latency_summary(everything),
+        "rps": round(len(everything) / elapsed, 1),
+        "errors": sum(op["errors"] for op in operations.values()),
+    }
+    return total, operations, round(elapsed, 2)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, timeout):
+    # A separate uvicorn process on the same database; the environment set up
+    # in main() carries DATABASE_URL and the other settings over. uvicorn only
+    # listens once the app's startup (warming every seat map) is done.
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with {server.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError(f"uvicorn did not start listening within {timeout}s")
+
+
+async def run_inprocess(args, fixtures):
+    # Same startup and shutdown as under uvicorn (the lifespan), then requests
+    # straight into the ASGI app.
+    import httpx
+
+    from app.main import app
+
+    started = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        startup = round(time.perf_counter() - started, 2)
+        total, operations, elapsed = await drive(args, fixtures, "http://bench", httpx.ASGITransport(app=app))
+    return total, operations, elapsed, startup
+
+
+def run_http(args, fixtures):
+    import httpx
+
+    server = None
+    startup = None
+    base_url = args.base_url
+    try:
+        if base_url is None:
+            port = free_port()
+            started = time.perf_counter()
+            server = start_server(port, args.startup_timeout)
+            startup = round(time.perf_counter() - started, 2)
+            base_url = f"http://127.0.0.1:{port}"
+        transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=args.concurrency))
+        return (*asyncio.run(drive(args, fixtures, base_url, transport)), startup)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(10)
+
+
+def compare(baseline, candidate, tolerance):
+    # Per operation present in both: throughput ratio and p99 ratio.
+    regressions = []
+    operations = {}
+    for name, base in baseline["operations"].items():
+        new = candidate["operations"].get(name)
+        if new is None or not base["count"] or not new["count"]:
+            continue
+        rps = new["rps"] / base["rps"] if base["rps"] else None
+        p99 = new["p99_ms"] / base["p99_ms"] if base["p99_ms"] else None
+        worse = (rps is not None and rps < 1 - tolerance) or (p99 is not None and p99 > 1 + tolerance)
+        operations[name] = {"rps_ratio": round(rps, 3) if rps else None, "p99_ratio": round(p99, 3) if p99 else None, "regressed": worse}
+        if worse:
+            regressions.append(name)
+    # Runs of a different scenario, transport or load are not comparable.
+    setup = ("scenario", "transport", "concurrency")
+    return {
+        "comparable": all(baseline.get(key) == candidate.get(key) for key in setup),
+        "baseline_commit": baseline.get("git_commit"),
+        "candidate_commit": candidate.get("git_commit"),
+        "tolerance": tolerance,
+        "regressions": regressions,
+        "operations": operations,
+    }
+
+
+def main():
+    args = parse_args()
+    if args.candidate:
+        if not args.compare:
+            sys.exit("--candidate needs --compare")
+        with open(args.compare) as base, open(args.candidate) as new:
+            result = compare(json.load(base), json.load(new), args.tolerance)
+        print(json.dumps(result, indent=2))
+        sys.exit(1 if result["regressions"] else 0)
+
+    # Settings are read when app.config is imported, so set them first.
+    path = os.path.abspath(args.db) if args.db else os.path.join(tempfile.mkdtemp(prefix="bench_harness_"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("DB_POOL_SIZE", str(max(args.concurrency + 8, 10)))
+    os.environ.setdefault("DB_MAX_OVERFLOW", "0")
+    # The scheduler would close events and expire orders under the load test.
+    os.environ.setdefault("BACKGROUND_JOBS_ENABLED", "false")
+
+    fixtures, dataset = prepare_database(args)
+    if args.transport == "http":
+        total, operations, elapsed, startup = run_http(args, fixtures)
+    else:
+        total, operations, elapsed, startup = asyncio.run(run_inprocess(args, fixtures))
+
+    report = {
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "scenario": args.scenario,
+        "transport": args.transport,
+        "concurrency": args.concurrency,
+        "duration_s": elapsed,
+        "startup_s": startup,
+        "seed": args.seed,
+        "dataset": dataset,
+        "total": total,
+        "operations": operations,
+    }
+    if args.out:
+        with open(args.out, "w") as out:
+            json.dump(report, out, indent=2)
+    if args.compare:
+        with open(args.compare) as base:
+            report["comparison"] = compare(json.load(base), report, args.tolerance)
+    print(json.dumps(report, indent=2))
+    if args.compare and report["comparison"]["regressions"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Client retry storm on POST /customer/orders with Idempotency-Key.
+
+Every logical order is sent --retries times at once (a client that timed out
+and retried, or a double-clicked button). With keys, each order should commit
+exactly once and every copy should get the same order back; without keys the
+copies race and all but one are rejected by the seat hold (409).
+
+    python -m benchmarks.idempotency_storm --orders 200 --retries 5 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import uuid
+
+# Point the app at a scratch database before app.config reads the environment.
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='bench_idempotency_')}/bench.db"
+os.environ.setdefault("DB_POOL_SIZE", "300")
+os.environ.setdefault("DB_MAX_OVERFLOW", "0")
+
+import httpx
+from sqlalchemy import func
+
+from app.database import SessionLocal, async_engine, engine, init_db
+from app.main import app
+from app.models.models import Order, Seat, SeatStatus
+from app.services.idempotency import idempotency_store
+from benchmarks.common import latency_summary, seed_event, seed_users
+from benchmarks.query_counter import count_queries
+
+WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE")
+
+
+def seed(seats, users):
+    init_db()
+    db = SessionLocal()
+    event_id = seed_event(db, seats, max_tickets_per_user=seats).id
+    db.execute(Seat.__table__.insert(), [
+        {"event_id": event_id, "seat_number": f"S-{n}", "status": SeatStatus.AVAILABLE.value}
+        for n in range(1, seats + 1)
+    ])
+    db.commit()
+    seed_users(db, users)
+    db.close()
+    return event_id
+
+
+async def storm(client, event_id, args, seat_ids, use_keys):
+    latencies = []
+    statuses = {}
+    replayed = 0
+
+    async def send(n, seats, key):
+        nonlocal replayed
+        headers = {"X-User-Email": f"bench{n % args.users}@bench.local"}
+        if key:
+            headers["Idempotency-Key"] = key
+        t0 = time.perf_counter()
+        response = await client.post("/customer/orders", headers=headers,
+                                     json={"event_id": event_id, "seat_ids": seats, "payment_mode": "Card"})
+        latencies.append(time.perf_counter() - t0)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        replayed += response.headers.get("idempotent-replayed") == "true"
+
+    async def order(n):
+        # All copies of one order go out together; --concurrency orders at a time.
+        async with slots:
+            seats = seat_ids[n * args.seats_per_order:(n + 1) * args.seats_per_order]
+            key = str(uuid.uuid4()) if use_keys else None
+            await asyncio.gather(*[send(n, seats, key) for _ in range(args.retries)])
+
+    slots = asyncio.Semaphore(args.concurrency)
+    started = time.perf_counter()
+    with count_queries(engine, async_engine) as counter:
+        await asyncio.gather(*[order(n) for n in range(args.orders)])
+    elapsed = time.perf_counter() - started
+    writes = sum(statement.lstrip().upper().startswith(WRITE_PREFIXES) for statement in counter.statements)
+    return {
+        "requests": args.orders * args.retries,
+        "requests_per_sec": round(args.orders * args.retries / elapsed, 1),
+        "statuses": statuses,
+        "replayed": replayed,
+        "statements": counter.count,
+        "write_statements": writes,
+        "latency": latency_summary(latencies),
+    }
+
+
+async def run(args):
+    per_mode = args.orders * args.seats_per_order
+    event_id = seed(2 * per_mode, args.users)
+    seat_ids = list(range(1, 2 * per_mode + 1))
+    report = {"orders": args.orders, "retries": args.retries, "seats_per_order": args.seats_per_order}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        # Warm the user cache so lookups don't count towards the storm.
+        for n in range(args.users):
+            await client.get("/customer/events/upcoming", headers={"X-User-Email": f"bench{n}@bench.local"})
+        report["without_keys"] = await storm(client, event_id, args, seat_ids[:per_mode], use_keys=False)
+        report["with_keys"] = await storm(client, event_id, args, seat_ids[per_mode:], use_keys=True)
+    db = SessionLocal()
+    report["orders_in_db"] = db.query(func.count(Order.id)).scalar()
+    db.close()
+    report["store"] = idempotency_store.stats()
+    await async_engine.dispose()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--retries", type=int, default=5, help="concurrent copies of each order")
+    parser.add_argument("--seats-per-order", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=32, help="orders in flight at once")
+    parser.add_argument("--users", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
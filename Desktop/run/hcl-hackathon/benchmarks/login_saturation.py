@@ -0,0 +1,101 @@
+"""Measure booking latency while logins saturate the password hashing pool.
+
+    python -m benchmarks.login_saturation --login-clients 64 --bookings 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+# Point the app at a scratch database before app.config reads the environment.
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='bench_login_')}/bench.db"
+
+import httpx
+
+from app.main import app
+from app.database import SessionLocal, init_db
+from app.models.models import Seat, SeatStatus, User, UserRole
+from app.utils.security import get_password_hash, shutdown_password_pool
+from benchmarks.common import seed_event, seed_users, latency_summary
+
+LOGIN_EMAIL = "login@bench.local"
+LOGIN_PASSWORD = "benchpassword"
+
+
+def seed(seat_count):
+    init_db()
+    db = SessionLocal()
+    event_id = seed_event(db, seat_count, max_tickets_per_user=seat_count).id
+    db.execute(Seat.__table__.insert(), [
+        {"event_id": event_id, "seat_number": f"S-{n}", "status": SeatStatus.AVAILABLE.value}
+        for n in range(1, seat_count + 1)
+    ])
+    db.add(User(name="Login Bench", email=LOGIN_EMAIL, password=get_password_hash(LOGIN_PASSWORD), role=UserRole.CUSTOMER.value))
+    db.commit()
+    seed_users(db, 1)
+    seat_ids = [row[0] for row in db.query(Seat.id).filter(Seat.event_id == event_id).order_by(Seat.id)]
+    db.close()
+    return event_id, seat_ids
+
+
+async def book_sequentially(client, event_id, seat_ids, count):
+    headers = {"X-User-Email": "bench0@bench.local", "X-Role": "customer"}
+    latencies = []
+    for _ in range(count):
+        seat_id = seat_ids.pop()
+        started = time.perf_counter()
+        response = await client.post("/customer/orders", headers=headers,
+                                     json={"event_id": event_id, "seat_ids": [seat_id], "payment_mode": "Credit Card"})
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.text
+    return latencies
+
+
+async def login_loop(client, stop, counts):
+    while not stop.is_set():
+        response = await client.post("/auth/login", json={"email": LOGIN_EMAIL, "password": LOGIN_PASSWORD})
+        counts[response.status_code] = counts.get(response.status_code, 0) + 1
+        if response.status_code == 503:
+            # Well-behaved clients honour Retry-After; scaled down to keep pressure on the pool.
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)) / 10)
+
+
+async def run(login_clients, bookings, seat_count):
+    event_id, seat_ids = seed(seat_count)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        baseline = await book_sequentially(client, event_id, seat_ids, bookings)
+
+        stop = asyncio.Event()
+        login_counts = {}
+        loaders = [asyncio.create_task(login_loop(client, stop, login_counts)) for _ in range(login_clients)]
+        await asyncio.sleep(1.0)  # let the pool saturate
+        started = time.perf_counter()
+        under_load = await book_sequentially(client, event_id, seat_ids, bookings)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(*loaders)
+    shutdown_password_pool()
+
+    return {
+        "login_clients": login_clients,
+        "booking_baseline": latency_summary(baseline),
+        "booking_under_login_load": latency_summary(under_load),
+        "login_responses": {str(code): count for code, count in sorted(login_counts.items())},
+        "logins_per_sec": round(login_counts.get(200, 0) / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--login-clients", type=int, default=64)
+    parser.add_argument("--bookings", type=int, default=200)
+    args = parser.parse_args()
+    report = asyncio.run(run(args.login_clients, args.bookings, seat_count=args.bookings * 2))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
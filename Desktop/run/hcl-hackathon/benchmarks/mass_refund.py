@@ -0,0 +1,126 @@
+"""Refunding every order of a cancelled event: one support refund per order vs the mass refund job.
+
+    per_order    a RefundRequest per order, approved through process_refund (the
+                 support endpoint's ORM path); timed on --sample orders and
+                 extrapolated to the whole event
+    mass_refund  cancel the event and start the mass refund job (what PATCH
+                 /admin/events/{id}/status does), then wait for it to finish
+
+Both runs end with the event's counters checked against a live recount.
+
+    python -m benchmarks.mass_refund --tickets 50000 --tickets-per-order 4 --sample 1000
+"""
+import argparse
+import datetime
+import json
+import os
+import tempfile
+import time
+import uuid
+
+# Point the app at a scratch database before app.config reads the environment.
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='bench_mass_refund_')}/bench.db"
+
+from app.database import SessionLocal, init_db
+from app.models.models import (
+    Event, EventCounter, EventStatus, MassRefundJob, MassRefundStatus, Order, OrderStatus, RefundRequest, RefundStatus,
+    Seat, SeatStatus, Ticket, TicketStatus,
+)
+from app.services import event_counters
+from app.services.booking_service import process_refund
+from app.services.mass_refund import mass_refunds
+from benchmarks.common import seed_event, seed_users
+
+
+def seed(db, tickets, per_order, user_id):
+    event_id = seed_event(db, tickets, max_tickets_per_user=tickets).id
+    event_counters.create_counter(db, event_id)
+    now = datetime.datetime.utcnow()
+    db.execute(Seat.__table__.insert(), [
+        {"event_id": event_id, "seat_number": f"S-{n}", "status": SeatStatus.BOOKED.value} for n in range(1, tickets + 1)
+    ])
+    seat_ids = [row[0] for row in db.query(Seat.id).filter(Seat.event_id == event_id).order_by(Seat.id)]
+    db.execute(Order.__table__.insert(), [
+        {"user_id": user_id, "event_id": event_id, "total_amount": 50.0 * per_order, "payment_mode": "Card",
+         "order_status": OrderStatus.CONFIRMED.value, "booking_time": now} for _ in range(0, tickets, per_order)
+    ])
+    order_ids = [row[0] for row in db.query(Order.id).filter(Order.event_id == event_id).order_by(Order.id)]
+    db.execute(Ticket.__table__.insert(), [
+        {"order_id": order_ids[n // per_order], "seat_id": seat_id, "ticket_code": str(uuid.uuid4()),
+         "status": TicketStatus.ACTIVE.value, "generated_at": now}
+        for n, seat_id in enumerate(seat_ids)
+    ])
+    db.commit()
+    event_counters.rebuild_counters(db, [event_id])
+    return event_id, order_ids
+
+
+def counters_match(db, event_id):
+    live = event_counters.live_summary(db, event_id)
+    counter = db.query(EventCounter).filter_by(event_id=event_id).one()
+    return (counter.seats_booked, counter.refunds_approved) == (live["seats_booked"], live["refunds_approved"])
+
+
+def per_order(db, args, user_id):
+    event_id, order_ids = seed(db, args.tickets, args.tickets_per_order, user_id)
+    sample = order_ids[:args.sample]
+    db.execute(RefundRequest.__table__.insert(), [
+        {"order_id": order_id, "reason": "Event cancelled", "status": RefundStatus.PENDING.value} for order_id in sample
+    ])
+    db.commit()
+    refund_ids = [row[0] for row in db.query(RefundRequest.id).filter(RefundRequest.order_id.in_(sample)).order_by(RefundRequest.id)]
+    started = time.perf_counter()
+    for refund_id in refund_ids:
+        process_refund(db, refund_id, RefundStatus.APPROVED, "Event cancelled")
+    elapsed = time.perf_counter() - started
+    return {
+        "orders_timed": len(refund_ids),
+        "orders_per_sec": round(len(refund_ids) / elapsed),
+        "estimated_seconds_for_event": round(elapsed / len(refund_ids) * len(order_ids), 1),
+        "counters_match": counters_match(db, event_id),
+    }
+
+
+def mass_refund(db, args, user_id):
+    event_id, order_ids = seed(db, args.tickets, args.tickets_per_order, user_id)
+    event = db.get(Event, event_id)
+    event.status = EventStatus.CANCELLED
+    db.commit()
+    started = time.perf_counter()
+    job_id = mass_refunds.start(db, event_id).id
+    while True:
+        time.sleep(0.01)
+        job = db.get(MassRefundJob, job_id, populate_existing=True)
+        if job.status != MassRefundStatus.RUNNING:
+            break
+    elapsed = time.perf_counter() - started
+    db.commit()
+    return {
+        "status": job.status,
+        "orders": job.orders_refunded,
+        "tickets": job.tickets_cancelled,
+        "seconds": round(elapsed, 2),
+        "orders_per_sec": round(job.orders_refunded / elapsed),
+        "tickets_left_active": db.query(Ticket.id).join(Order).filter(Order.event_id == event_id, Ticket.status != TicketStatus.CANCELLED).count(),
+        "counters_match": counters_match(db, event_id),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=50000)
+    parser.add_argument("--tickets-per-order", type=int, default=4)
+    parser.add_argument("--sample", type=int, default=1000, help="orders refunded one by one in the per_order run")
+    args = parser.parse_args()
+    init_db()
+    db = SessionLocal()
+    user_id = seed_users(db, 1)[0]
+    report = {"tickets": args.tickets, "orders": -(-args.tickets // args.tickets_per_order)}
+    report["per_order"] = per_order(db, args, user_id)
+    report["mass_refund"] = mass_refund(db, args, user_id)
+    db.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
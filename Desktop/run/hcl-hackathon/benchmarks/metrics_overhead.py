@@ -0,0 +1,117 @@
+"""Cost of the request metrics on the booking path.
+
+Places orders one at a time through the app in pairs of rounds, one with
+request metrics on and one off (request_metrics.enabled, order alternating),
+and reports the median on/off ratio. "Off" still runs the disabled hooks: one
+context variable read per statement and per endpoint call. Timing noise on a
+busy box is of the same order as the overhead, so the hooks are also timed on
+their own: what one order's worth of instrumentation costs (middleware, one
+listener pair per statement, one histogram update).
+
+    python -m benchmarks.metrics_overhead --rounds 20 --orders-per-round 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+# Point the app at a scratch database before app.config reads the environment.
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='bench_metrics_')}/bench.db"
+
+import httpx
+
+from app.database import SessionLocal, async_engine, init_db
+from app.main import app
+from app.models.models import Seat, SeatStatus
+from app.services.seat_availability import seat_availability
+from app.utils.metrics import RequestStats, _current, request_metrics
+from benchmarks.common import seed_event, seed_users
+
+
+def seed(seats):
+    db = SessionLocal()
+    event_id = seed_event(db, seats, max_tickets_per_user=seats).id
+    db.execute(Seat.__table__.insert(), [
+        {"event_id": event_id, "seat_number": f"S-{n}", "status": SeatStatus.AVAILABLE.value} for n in range(1, seats + 1)
+    ])
+    db.commit()
+    seat_ids = [row[0] for row in db.query(Seat.id).filter(Seat.event_id == event_id).order_by(Seat.id)]
+    seat_availability.rebuild_event(db, event_id)
+    seed_users(db, 1)
+    db.close()
+    return event_id, seat_ids
+
+
+async def run(args):
+    init_db()
+    event_id, seat_ids = seed(args.rounds * 2 * args.orders_per_round + args.warmup)
+    seats = iter(seat_ids)
+    headers = {"X-User-Email": "bench0@bench.local"}
+    ratios = []
+    per_order = {True: [], False: []}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def orders(count):
+            started = time.perf_counter()
+            for _ in range(count):
+                response = await client.post("/customer/orders", headers=headers,
+                                             json={"event_id": event_id, "seat_ids": [next(seats)], "payment_mode": "Card"})
+                assert response.status_code == 200, response.text
+            return (time.perf_counter() - started) / count
+
+        await orders(args.warmup)
+        for n in range(args.rounds):
+            timed = {}
+            for enabled in ((True, False) if n % 2 == 0 else (False, True)):
+                request_metrics.enabled = enabled
+                timed[enabled] = await orders(args.orders_per_round)
+                per_order[enabled].append(timed[enabled])
+            ratios.append(timed[True] / timed[False])
+    request_metrics.enabled = True
+    await async_engine.dispose()
+    off = statistics.median(per_order[False])
+    hooks = hook_cost(statements=9)
+    return {
+        "orders_per_mode": args.rounds * args.orders_per_round,
+        "metrics_off_ms": round(off * 1000, 3),
+        "metrics_on_ms": round(statistics.median(per_order[True]) * 1000, 3),
+        "overhead_pct": round((statistics.median(ratios) - 1) * 100, 2),
+        "hooks_per_order_us": round(hooks * 1e6, 1),
+        "hooks_pct_of_order": round(hooks / off * 100, 2),
+    }
+
+
+def hook_cost(statements, repeat=20000):
+    # One order's worth of hook calls: middleware context, a listener pair per
+    # statement and the histogram update.
+    class Conn:
+        info = {}
+
+    conn = Conn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        stats = RequestStats()
+        token = _current.set(stats)
+        t0 = time.perf_counter()
+        for _ in range(statements):
+            request_metrics._before_execute(conn, None, "", (), None, False)
+            request_metrics._after_execute(conn, None, "", (), None, False)
+        stats.endpoint_done = stats.response_started = time.perf_counter()
+        _current.reset(token)
+        request_metrics.observe("POST", "/bench/hooks", 200, stats, time.perf_counter() - t0)
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=20, help="rounds per mode, alternating")
+    parser.add_argument("--orders-per-round", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=100)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
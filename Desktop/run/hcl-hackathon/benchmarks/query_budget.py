@@ -0,0 +1,138 @@
+"""Fail if an endpoint's SQL statement count grows with the size of its result.
+
+Each endpoint is called twice through the app, once on a small case and once
+on a large one (more tickets, bigger orders, bigger scan batches). Both runs
+must stay within the endpoint's budget and issue the same number of
+statements. Exits non-zero otherwise.
+
+    python -m benchmarks.query_budget --large 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+# Point the app at a scratch database before app.config reads the environment.
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='bench_queries_')}/bench.db"
+
+from fastapi.testclient import TestClient
+
+from app.database import SessionLocal, async_engine, engine, init_db
+from app.main import app
+from app.models.models import Seat, SeatStatus, UserRole
+from app.services import event_counters
+from app.utils.catalogue_cache import catalogue_cache
+from benchmarks.common import seed_event, seed_users
+from benchmarks.query_counter import count_queries
+
+# Statements per request. Users are already in the user cache. Writes include
+# one change log insert.
+BUDGETS = {
+    "GET /customer/events/upcoming": 1,
+    "GET /customer/events/{id}/seats/available": 1,
+    "GET /customer/tickets": 1,
+    "POST /customer/orders": 10,
+    "POST /customer/orders (quantity)": 10,
+    "POST /customer/refunds": 3,
+    "GET /support/refunds": 1,
+    "POST /support/refunds/{id}/process": 8,
+    "GET /organizer/events/{id}/booking-summary": 1,
+    "POST /entry-manager/gate/scan-batch": 4,
+}
+
+
+def header(prefix, n=0):
+    return {"X-User-Email": f"{prefix}{n}@bench.local"}
+
+
+def seed(seats):
+    init_db()
+    db = SessionLocal()
+    event_id = seed_event(db, seats, max_tickets_per_user=seats).id
+    event_counters.create_counter(db, event_id)
+    db.execute(Seat.__table__.insert(), [
+        {"event_id": event_id, "seat_number": f"S-{n}", "status": SeatStatus.AVAILABLE.value}
+        for n in range(1, seats + 1)
+    ])
+    db.commit()
+    seed_users(db, 2, prefix="customer")
+    seed_users(db, 1, role=UserRole.SUPPORT, prefix="support")
+    seed_users(db, 1, role=UserRole.ORGANIZER, prefix="organizer")
+    seed_users(db, 1, role=UserRole.ENTRY_MANAGER, prefix="entry")
+    db.close()
+    return event_id
+
+
+def measure(client, method, url, **kwargs):
+    with count_queries(engine, async_engine) as counter:
+        response = client.request(method, url, **kwargs)
+    assert response.status_code == 200, f"{method} {url}: {response.status_code} {response.text}"
+    return counter, response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--large", type=int, default=50, help="tickets per order / codes per batch in the large case")
+    parser.add_argument("--verbose", action="store_true", help="print the statements of failing endpoints")
+    args = parser.parse_args()
+
+    event_id = seed(6 * args.large + 10)
+    sizes = {"small": 1, "large": args.large}
+    seats = iter(range(1, 4 * args.large + 10))
+    results = {}
+
+    with TestClient(app) as client:
+        for n, prefix in enumerate(["customer", "customer", "support", "organizer", "entry"]):
+            client.get("/customer/events/upcoming", headers=header(prefix, n % 2 if prefix == "customer" else 0))
+
+        def record(name, case, counter):
+            results.setdefault(name, {})[case] = counter
+
+        for case, size in sizes.items():
+            # customer0 keeps the small history, customer1 the large one.
+            customer = header("customer", 0 if case == "small" else 1)
+            orders = []
+            for _ in range(2):
+                counter, response = measure(client, "POST", "/customer/orders", headers=customer,
+                                            json={"event_id": event_id, "seat_ids": [next(seats) for _ in range(size)], "payment_mode": "Card"})
+                orders.append(response.json()["id"])
+            record("POST /customer/orders", case, counter)
+            record("GET /customer/tickets", case, measure(client, "GET", "/customer/tickets", headers=customer)[0])
+            catalogue_cache.bump()  # measure the uncached path
+            record("GET /customer/events/upcoming", case, measure(client, "GET", "/customer/events/upcoming", headers=customer)[0])
+            record("GET /customer/events/{id}/seats/available", case,
+                   measure(client, "GET", f"/customer/events/{event_id}/seats/available", headers=customer)[0])
+
+            counter, _ = measure(client, "POST", "/customer/refunds", headers=customer, json={"order_id": orders[0], "reason": "bench"})
+            record("POST /customer/refunds", case, counter)
+            record("GET /support/refunds", case, measure(client, "GET", "/support/refunds", headers=header("support"))[0])
+            refund_id = client.get("/support/refunds", headers=header("support")).json()[-1]["id"]
+            record("POST /support/refunds/{id}/process", case,
+                   measure(client, "POST", f"/support/refunds/{refund_id}/process", headers=header("support"), json={"status": "approved"})[0])
+            record("GET /organizer/events/{id}/booking-summary", case,
+                   measure(client, "GET", f"/organizer/events/{event_id}/booking-summary", headers=header("organizer"))[0])
+
+            codes = [ticket["ticket_code"] for ticket in client.get("/customer/tickets", headers=customer).json() if ticket["status"] == "active"]
+            record("POST /entry-manager/gate/scan-batch", case,
+                   measure(client, "POST", "/entry-manager/gate/scan-batch", headers=header("entry"), json={"ticket_codes": codes})[0])
+
+        for case, size in sizes.items():
+            # Best available last, so the allocator's picks can't collide with the seat ids above.
+            record("POST /customer/orders (quantity)", case,
+                   measure(client, "POST", "/customer/orders", headers=header("customer", 0),
+                           json={"event_id": event_id, "quantity": size, "payment_mode": "Card"})[0])
+
+    failures = 0
+    for name, budget in BUDGETS.items():
+        small, large = results[name]["small"], results[name]["large"]
+        ok = large.count == small.count and large.count <= budget
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {name:45} small={small.count} large={large.count} budget={budget}")
+        if not ok and args.verbose:
+            for statement in large.statements:
+                print("       " + " ".join(statement.split()))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
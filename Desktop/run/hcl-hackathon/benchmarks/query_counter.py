@@ -0,0 +1,49 @@
+import threading
+from contextlib import contextmanager
+from typing import Any, List
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Counts SQL statements sent to the driver while the block runs. An executemany
+# counts once, like the single round trip it is. query_budget uses it to pin
+# endpoints to a fixed number of statements whatever the row count; other
+# benchmarks report statements per second with it.
+
+
+class QueryCount:
+    def __init__(self):
+        self.statements: List[str] = []
+        self.parameters: List[Any] = []  # as sent to the driver, per statement
+        self._lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self.statements.append(statement)
+            self.parameters.append(parameters)
+
+
+@contextmanager
+def count_queries(*engines):
+    counter = QueryCount()
+    targets = [engine.sync_engine if isinstance(engine, AsyncEngine) else engine for engine in engines]
+    for target in targets:
+        event.listen(target, "before_cursor_execute", counter._record)
+    try:
+        yield counter
+    finally:
+        for target in targets:
+            event.remove(target, "before_cursor_execute", counter._record)
+
+
+@contextmanager
+def assert_max_queries(limit: int, *engines):
+    with count_queries(*engines) as counter:
+        yield counter
+    if counter.count > limit:
+        listing = "\n".join(f"  {n}. {statement}" for n, statement in enumerate(counter.statements, 1))
+        raise AssertionError(f"{counter.count} SQL statements, expected at most {limit}:\n{listing}")
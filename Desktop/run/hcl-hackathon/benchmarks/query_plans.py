@@ -0,0 +1,212 @@
+"""Fail if a statement the app issues falls back to a full table scan.
+
+Seeds a scratch SQLite database and runs ANALYZE. It then drives the hot
+endpoints through the app and calls the background jobs, recording every
+statement they send to the driver (benchmarks/query_counter.py). Each distinct
+statement goes through EXPLAIN QUERY PLAN with the parameters it was sent with.
+Exits non-zero on a plain "SCAN <table>" step.
+
+    python -m benchmarks.query_plans --events 200 --seats-per-event 500
+"""
+import argparse
+import datetime
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+
+# Point the app at a scratch database before app.config reads the environment.
+SCRATCH_DIR = tempfile.mkdtemp(prefix="bench_plans_")
+os.environ["DATABASE_URL"] = f"sqlite:///{SCRATCH_DIR}/bench.db"
+os.environ.setdefault("BACKGROUND_JOBS_ENABLED", "false")  # job statements are recorded below, on purpose
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+
+from app.database import SessionLocal, async_engine, engine, init_db
+from app.main import app
+from app.models.models import (
+    Event, EventStatus, Seat, SeatStatus, Order, OrderStatus, Ticket, TicketStatus,
+    RefundRequest, SupportCase, EntryLog, UserRole, Venue,
+)
+from app.services import event_counters, event_search, jobs
+from app.utils.catalogue_cache import catalogue_cache
+from benchmarks.common import seed_users
+from benchmarks.query_counter import count_queries
+
+# "SCAN t" without an index is a full table scan; "SCAN t USING [COVERING] INDEX",
+# a full-text lookup ("SCAN t VIRTUAL TABLE INDEX") and "SEARCH t ..." are fine.
+# So are scans of a subquery the plan materialized itself, and the first page of
+# a keyset listing (no WHERE, id order, LIMIT): it stops after the page.
+FULL_SCAN = re.compile(r"^SCAN (\w+)\b(?! USING (COVERING )?INDEX)(?! USING INTEGER PRIMARY KEY)(?! VIRTUAL TABLE)")
+SUBQUERY = re.compile(r"^(?:MATERIALIZE|CO-ROUTINE) (\w+)")
+FIRST_PAGE = re.compile(r"^SELECT .* FROM (\w+) ORDER BY \1\.id LIMIT \?")
+PLANNED = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+ROLES = {"customer": UserRole.CUSTOMER, "support": UserRole.SUPPORT, "organizer": UserRole.ORGANIZER, "entry": UserRole.ENTRY_MANAGER, "admin": UserRole.ADMIN}
+
+
+def seed(events, seats_per_event, users, orders, rng):
+    init_db()
+    db = SessionLocal()
+    user_ids = seed_users(db, users, prefix="customer")
+    for prefix, role in ROLES.items():
+        if role != UserRole.CUSTOMER:
+            seed_users(db, 1, role=role, prefix=prefix)
+    venues = max(1, events // 4)
+    db.execute(Venue.__table__.insert(), [
+        {"name": f"Plan Arena {n}", "city": f"Plan City {n % 10}", "address": f"{n} Plan Rd", "total_capacity": seats_per_event}
+        for n in range(venues)
+    ])
+    now = datetime.datetime.utcnow()
+    # Like production, most of the catalogue is history: only every 5th event is on sale.
+    db.execute(Event.__table__.insert(), [
+        {"name": f"Event {i}", "category": "Music",
+         "event_date": now + datetime.timedelta(days=i + 1) if i % 5 == 0 else now - datetime.timedelta(days=i + 1),
+         "ticket_price": 50.0, "max_tickets_per_user": 10,
+         "status": EventStatus.UPCOMING.value if i % 5 == 0 else EventStatus.CLOSED.value, "venue_id": i % venues + 1}
+        for i in range(events)
+    ])
+    event_ids = [row[0] for row in db.query(Event.id).order_by(Event.id)]
+    db.execute(Seat.__table__.insert(), [
+        {"event_id": event_id, "seat_number": f"S-{n}", "status": SeatStatus.AVAILABLE.value}
+        for event_id in event_ids for n in range(1, seats_per_event + 1)
+    ])
+    # The calls below book into one upcoming event, so its seats stay free;
+    # orders are capped at the seats of the others.
+    upcoming = event_ids[::5]
+    event_id = upcoming[len(upcoming) // 2]
+    seats = db.query(Seat.id, Seat.event_id).filter(Seat.event_id != event_id).all()
+    picked = rng.sample(seats, min(orders, len(seats)))
+    db.execute(Order.__table__.insert(), [
+        {"user_id": rng.choice(user_ids), "event_id": seat.event_id, "total_amount": 50.0,
+         "payment_mode": "Credit Card", "order_status": OrderStatus.CONFIRMED.value, "booking_time": now}
+        for seat in picked
+    ])
+    order_ids = [row[0] for row in db.query(Order.id).order_by(Order.id)]
+    db.execute(Ticket.__table__.insert(), [
+        {"order_id": order_id, "seat_id": seat.id, "ticket_code": f"code-{order_id}",
+         "status": TicketStatus.ACTIVE.value, "generated_at": now}
+        for order_id, seat in zip(order_ids, picked)
+    ])
+    db.query(Seat).filter(Seat.id.in_([seat.id for seat in picked])).update({"status": SeatStatus.BOOKED.value}, synchronize_session=False)
+    db.execute(RefundRequest.__table__.insert(), [{"order_id": order_id, "reason": "plan", "status": "pending"} for order_id in order_ids[::20]])
+    db.execute(SupportCase.__table__.insert(), [{"user_id": rng.choice(user_ids), "subject": "s", "description": "d", "status": "open"} for _ in range(max(1, len(order_ids) // 10))])
+    db.execute(EntryLog.__table__.insert(), [{"ticket_id": order_id, "validated_by": user_ids[0], "status": "valid", "validation_time": now} for order_id in order_ids[::5]])
+    event_counters.rebuild_counters(db, event_ids)
+    event_search.rebuild_index(db)
+    db.commit()
+    db.execute(text("ANALYZE"))
+    db.commit()
+    free = db.scalars(select(Seat.id).where(Seat.event_id == event_id, Seat.status == SeatStatus.AVAILABLE).order_by(Seat.id).limit(2)).all()
+    db.close()
+    return event_id, free
+
+
+def drive(client, event_id, free_seats):
+    # Calls the endpoints as their users would, recording (route, statements) per call.
+    recorded = []
+
+    def call(route, role, label=None, params=None, json=None, **path):
+        method, template = route.split(" ", 1)
+        with count_queries(engine, async_engine) as counter:
+            response = client.request(method, template.format(**path), headers={"X-User-Email": f"{role}0@bench.local"}, params=params, json=json)
+        assert response.status_code < 300, f"{route}: {response.status_code} {response.text}"
+        recorded.append((f"{route} ({label})" if label else route, counter))
+        return response.json() if response.content else None
+
+    call("GET /customer/events/upcoming", "customer")
+    catalogue_cache.bump()  # the search below rebuilds its facet snapshot
+    call("GET /customer/events/search", "customer", "text, facets", params={"q": "event mus", "category": ["Music"], "date_from": datetime.datetime.utcnow().isoformat()})
+    call("GET /customer/events/search", "customer", "filters", params={"city": ["Plan City 0"], "price_min": 10, "facets": "false"})
+    call("GET /customer/events/{id}/seats/available", "customer", id=event_id)
+    call("GET /customer/events/{id}/seats/available", "customer", "count", params={"view": "count"}, id=event_id)
+    refunded = call("POST /customer/orders", "customer", json={"event_id": event_id, "seat_ids": free_seats[:1], "payment_mode": "Card"})
+    call("POST /customer/orders", "customer", json={"event_id": event_id, "seat_ids": free_seats[1:2], "payment_mode": "Card"})
+    call("POST /customer/orders", "customer", "quantity", json={"event_id": event_id, "quantity": 2, "payment_mode": "Card"})
+    tickets = call("GET /customer/tickets", "customer")
+    call("POST /customer/refunds", "customer", json={"order_id": refunded["id"], "reason": "plans"})
+    call("GET /support/cases", "support")
+    db = SessionLocal()
+    refund_id = db.scalar(select(RefundRequest.id).where(RefundRequest.order_id == refunded["id"]))
+    db.close()
+    call("GET /support/refunds", "support", params={"after": refund_id - 1})
+    call("POST /support/refunds/{id}/process", "support", json={"status": "approved"}, id=refund_id)
+    call("GET /organizer/events/{id}/booking-summary", "organizer", id=event_id)
+    call("GET /organizer/events/{id}/booking-summary", "organizer", "live", params={"live": "true"}, id=event_id)
+
+    codes = [ticket["ticket_code"] for ticket in tickets if ticket["order_id"] != refunded["id"] and ticket["status"] == TicketStatus.ACTIVE.value]
+    call("POST /entry-manager/tickets/validate/{code}", "entry", code=codes[0])
+    call("POST /entry-manager/gate/scan/{code}", "entry", code=codes[0])
+    call("POST /entry-manager/gate/scan-batch", "entry", json={"ticket_codes": codes[1:]})
+    call("GET /admin/change-log", "admin", params={"after": 0})
+    call("GET /admin/change-log/consumers/{name}/batch", "admin", name="plans")
+
+    for job in (jobs.close_past_events, jobs.expire_pending_orders, jobs.archive_entry_logs, jobs.prune_change_log):
+        db = SessionLocal()
+        with count_queries(engine, async_engine) as counter:
+            job(db)
+        db.close()
+        recorded.append((f"jobs.{job.__name__}", counter))
+    return recorded
+
+
+def full_scans(sql, plan):
+    bounded = {match.group(1) for match in map(SUBQUERY.match, plan) if match}
+    page = FIRST_PAGE.match(sql)
+    if page:
+        bounded.add(page.group(1))
+    return [step for step in plan if (match := FULL_SCAN.match(step)) and match.group(1) not in bounded]
+
+
+def explain(conn, statement, parameters):
+    if isinstance(parameters, list):  # executemany: the plan is the same for every row
+        parameters = parameters[0]
+    return [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, tuple(parameters or ()))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--seats-per-event", type=int, default=500)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--orders", type=int, default=20000, help="capped at the seats of all but one event")
+    args = parser.parse_args()
+    if args.events < 5 or args.seats_per_event < 4:
+        parser.error("need at least 5 events (one on sale) and 4 seats per event")
+
+    event_id, free_seats = seed(args.events, args.seats_per_event, args.users, args.orders, random.Random(7))
+    with TestClient(app) as client:
+        recorded = drive(client, event_id, free_seats)
+
+    # Each distinct statement is explained once, under the first call that issued it.
+    failures, seen = [], set()
+    with engine.connect() as conn:
+        for name, counter in recorded:
+            steps = []
+            for statement, parameters in zip(counter.statements, counter.parameters):
+                if statement in seen or not statement.lstrip().upper().startswith(PLANNED):
+                    continue
+                seen.add(statement)
+                sql = " ".join(statement.split())
+                plan = explain(conn, statement, parameters)
+                steps.append((sql[:110], plan, full_scans(sql, plan)))
+            failed = any(scans for _, _, scans in steps)
+            print(f"{'FAIL' if failed else 'ok  '} {name}")
+            for sql, plan, _ in steps:
+                print(f"       {sql}")
+                for step in plan:
+                    print(f"         {step}")
+            if failed:
+                failures.append(name)
+    engine.dispose()
+    shutil.rmtree(SCRATCH_DIR, ignore_errors=True)
+
+    if failures:
+        print(f"\n{len(failures)} calls issue a full table scan: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Compare the per-object ORM seat loop with bulk_create_seats.
+
+    python -m benchmarks.seat_provisioning --sizes 1000 10000 100000
+"""
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+from app.models.models import Seat, SeatStatus
+from app.services.seat_service import bulk_create_seats, generate_seat_numbers
+from benchmarks.common import make_session_factory, seed_event
+
+
+def orm_loop(db, event_id, seat_count):
+    # The original organizer.create_seats implementation.
+    for i in range(1, seat_count + 1):
+        db.add(Seat(event_id=event_id, seat_number=f"S-{i}", status=SeatStatus.AVAILABLE))
+    db.commit()
+    return seat_count
+
+
+def bulk(db, event_id, seat_count):
+    return bulk_create_seats(db, event_id, generate_seat_numbers(seat_count))
+
+
+def _run_once(strategy, seat_count, trace_memory):
+    engine, SessionLocal, path = make_session_factory()
+    db = SessionLocal()
+    event_id = seed_event(db, seat_count).id
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    created = strategy(db, event_id, seat_count)
+    elapsed = time.perf_counter() - started
+    peak = 0
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    stored = db.query(Seat).filter(Seat.event_id == event_id).count()
+    db.close()
+    engine.dispose()
+    os.remove(path)
+    assert created == stored == seat_count
+    return elapsed, peak
+
+
+def measure(strategy, seat_count, trace_memory):
+    # tracemalloc slows allocation-heavy code a lot, so memory is measured in a separate run.
+    elapsed, _ = _run_once(strategy, seat_count, trace_memory=False)
+    result = {"seconds": round(elapsed, 3), "seats_per_sec": round(seat_count / elapsed)}
+    if trace_memory:
+        _, peak = _run_once(strategy, seat_count, trace_memory=True)
+        result["peak_mb"] = round(peak / 2**20, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--memory", action="store_true", help="also report peak Python memory")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        orm = measure(orm_loop, size, args.memory)
+        fast = measure(bulk, size, args.memory)
+        results.append({"seats": size, "orm_loop": orm, "bulk": fast, "speedup": round(orm["seconds"] / fast["seconds"], 1)})
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
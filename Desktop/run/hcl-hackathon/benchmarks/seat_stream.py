@@ -0,0 +1,189 @@
+"""Seat-map clients during an on-sale: polling the seat list vs the push stream.
+
+One booker places single-seat orders at --order-rate while seat-map clients
+watch the event:
+  poll  --poll-clients clients re-read the available seat list (all pages)
+        every --poll-interval seconds;
+  push  --clients clients hold a seat stream (seat_stream.open_stream, what
+        GET .../seats/stream serves) and apply the deltas.
+Polling costs a full seat-list read per client per interval, so it gets far
+fewer clients by default; compare cpu_per_client_ms_per_sec. Reports order throughput and
+latency, SQL statements issued and CPU used per second, and how stale the
+clients' view is: for polling, time from an order's commit to the end of the
+first poll that started after it; for push, time from the order response to
+the delta reaching each client.
+
+    python -m benchmarks.seat_stream --clients 1000 --poll-clients 10 --seats 5000
+"""
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import re
+import statistics
+import tempfile
+import time
+
+# Point the app at a scratch database before app.config reads the environment.
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='bench_seat_stream_')}/bench.db"
+os.environ.setdefault("BACKGROUND_JOBS_ENABLED", "false")
+# Every poller can be mid-request at once; the pool only opens what it uses.
+os.environ.setdefault("DB_POOL_SIZE", "4096")
+os.environ.setdefault("DB_MAX_OVERFLOW", "0")
+
+import httpx
+
+from app.database import AsyncSessionLocal, SessionLocal, async_engine, engine, init_db
+from app.main import app
+from app.models.models import Seat, SeatStatus
+from app.services import seat_stream
+from benchmarks.common import latency_summary, seed_event, seed_users
+from benchmarks.query_counter import count_queries
+
+HEADERS = {"X-User-Email": "bench0@bench.local"}
+SEQ = re.compile(rb"event: seats\nid: [^:\n]+:(\d+)")
+
+
+def seed(seats):
+    init_db()
+    db = SessionLocal()
+    event_id = seed_event(db, seats, max_tickets_per_user=seats).id
+    db.execute(Seat.__table__.insert(), [
+        {"event_id": event_id, "seat_number": f"S-{n}", "status": SeatStatus.AVAILABLE.value} for n in range(1, seats + 1)
+    ])
+    db.commit()
+    seat_ids = [row[0] for row in db.query(Seat.id).filter(Seat.event_id == event_id).order_by(Seat.id)]
+    seed_users(db, 1)
+    db.close()
+    return event_id, seat_ids
+
+
+async def book(client, event_id, seats, rate, duration):
+    # Paced single-seat orders; returns (response time, latency) per order.
+    done = []
+    started = time.perf_counter()
+    for n, seat_id in enumerate(seats):
+        due = started + n / rate
+        if due - started >= duration:
+            break
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        t0 = time.perf_counter()
+        response = await client.post("/customer/orders", headers=HEADERS, json={"event_id": event_id, "seat_ids": [seat_id], "payment_mode": "Card"})
+        assert response.status_code == 200, response.text
+        done.append((time.perf_counter(), time.perf_counter() - t0))
+    return done
+
+
+async def poller(client, event_id, interval, stop, polls):
+    url = f"/customer/events/{event_id}/seats/available"
+    while not stop.is_set():
+        started = time.perf_counter()
+        after = None
+        while True:
+            params = {"limit": 1000, **({"after": after} if after else {})}
+            response = await client.get(url, headers=HEADERS, params=params)
+            after = response.headers.get("x-next-cursor")
+            if not after:
+                break
+        polls.append((started, time.perf_counter()))
+        await asyncio.sleep(max(0.0, interval - (time.perf_counter() - started)))
+
+
+async def subscriber(event_id, received, connected):
+    async with AsyncSessionLocal() as db:
+        frames = await seat_stream.open_stream(db, event_id, None)
+    connected.append(1)
+    async for chunk in frames:
+        now = time.perf_counter()
+        for seq in SEQ.findall(chunk):
+            received[int(seq)] = now
+
+
+def poll_staleness(orders, clients):
+    samples = []
+    for polls in clients:
+        starts = [started for started, _ in polls]
+        for committed, _ in orders:
+            i = bisect.bisect_left(starts, committed)
+            if i < len(polls):
+                samples.append(polls[i][1] - committed)
+    return samples
+
+
+async def run_mode(mode, args, event_id, seats):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        stop = asyncio.Event()
+        tasks, views, connected = [], [], []
+        clients = args.poll_clients if mode == "poll" else args.clients
+        if mode == "poll":
+            for _ in range(clients):
+                views.append([])
+                tasks.append(asyncio.create_task(poller(client, event_id, args.poll_interval, stop, views[-1])))
+        else:
+            for _ in range(clients):
+                views.append({})
+                tasks.append(asyncio.create_task(subscriber(event_id, views[-1], connected)))
+        while mode == "push" and len(connected) < clients:
+            await asyncio.sleep(0.1)
+        await asyncio.sleep(args.warmup)
+        base_seq = seat_stream.seat_feed.position(event_id)[1]
+        with count_queries(engine, async_engine) as counter:
+            started, cpu_started = time.perf_counter(), time.process_time()
+            orders = await book(client, event_id, seats, args.order_rate, args.duration)
+            elapsed = time.perf_counter() - started
+            cpu = (time.process_time() - cpu_started) / elapsed
+            await asyncio.sleep(args.poll_interval if mode == "poll" else 0.5)  # let the last change reach everyone
+        stop.set()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if mode == "poll":
+        staleness = poll_staleness(orders, views)
+        delivered = len(staleness)
+        extra = {"polls_per_sec": round(sum(len(polls) for polls in views) / elapsed, 1)}
+    else:
+        staleness = [received[base_seq + n + 1] - committed for received in views for n, (committed, _) in enumerate(orders) if base_seq + n + 1 in received]
+        delivered = len(staleness)
+        extra = {}
+    return {
+        "clients": clients,
+        "orders": len(orders),
+        "orders_per_sec": round(len(orders) / elapsed, 1),
+        "order_latency": latency_summary([latency for _, latency in orders]),
+        "sql_statements_per_sec": round(counter.count / elapsed, 1),
+        "cpu_utilisation": round(cpu, 2),
+        "cpu_per_client_ms_per_sec": round(cpu * 1000 / clients, 2),
+        "client_view_lag": latency_summary(staleness),
+        "changes_seen": f"{delivered}/{len(orders) * clients}",
+        **extra,
+    }
+
+
+async def run(args):
+    event_id, seat_ids = seed(args.seats)
+    per_mode = int(args.order_rate * args.duration) + 1
+    report = {"seats": args.seats, "order_rate": args.order_rate, "poll_interval_s": args.poll_interval}
+    for n, mode in enumerate(args.modes):
+        report[mode] = await run_mode(mode, args, event_id, seat_ids[n * per_mode:(n + 1) * per_mode])
+    await async_engine.dispose()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=1000, help="push clients")
+    parser.add_argument("--poll-clients", type=int, default=10)
+    parser.add_argument("--seats", type=int, default=5000)
+    parser.add_argument("--order-rate", type=float, default=20.0, help="orders per second")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of booking per mode")
+    parser.add_argument("--poll-interval", type=float, default=2.0)
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds for clients to connect before booking starts")
+    parser.add_argument("--modes", nargs="+", default=["poll", "push"], choices=["poll", "push"])
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""On-sale burst with and without the waiting room.
+
+--users customers arrive within --burst-seconds for one event. Each customer
+reads the available seat ranges, picks --seats-per-order random free seats and
+orders, retrying with other seats up to --attempts times; once nothing is left
+they give up as sold out.
+
+    direct        every customer goes straight to POST /customer/orders
+    waiting_room  customers join the event's queue; the head of the line is
+                  admitted at --admit-rate and orders with its admission token
+
+Queue joins and position polls call the waiting room service in-process (a
+real deployment would see one poll per customer every poll_after_seconds);
+seat reads and orders go through the app. Reports order throughput, request
+latency, time from arrival to a confirmed order, and fairness: of the K
+customers who got seats, the share that were among the first K to arrive.
+
+The direct run collapses under the burst and takes minutes per few thousand
+customers, so it replays --direct-users (default 5000) instead of --users.
+
+    python -m benchmarks.waiting_room_sim --users 50000 --seats 2000 --admit-rate 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+# Point the app at a scratch database before app.config reads the environment.
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='bench_waiting_room_')}/bench.db"
+os.environ.setdefault("DB_POOL_SIZE", "300")
+os.environ.setdefault("DB_MAX_OVERFLOW", "0")
+
+import httpx
+
+from app.database import SessionLocal, async_engine, init_db
+from app.main import app
+from app.models.models import Seat, SeatStatus
+from app.services.seat_availability import seat_availability
+from app.services.waiting_room import waiting_rooms
+from benchmarks.common import latency_summary, percentile, seed_event, seed_users
+
+TICK_SECONDS = 0.01
+
+
+def seed(seats):
+    db = SessionLocal()
+    event_id = seed_event(db, seats, max_tickets_per_user=seats).id
+    db.execute(Seat.__table__.insert(), [
+        {"event_id": event_id, "seat_number": f"S-{n}", "status": SeatStatus.AVAILABLE.value}
+        for n in range(1, seats + 1)
+    ])
+    db.commit()
+    seat_availability.rebuild_event(db, event_id)
+    db.close()
+    return event_id
+
+
+class Run:
+    def __init__(self, client, event_id, args, mode, users):
+        self.client = client
+        self.event_id = event_id
+        self.args = args
+        self.mode = mode
+        self.users = users
+        self.order_latencies = []
+        self.statuses = {}
+        self.buyers = []  # (arrival index, seconds from arrival to confirmed order)
+        self.sold_out = 0
+        self.gave_up = 0
+        self.errors = 0  # failed availability reads
+        self.started = 0.0
+        self.last_order_at = 0.0
+
+    def arrival_time(self, n):
+        return self.started + self.args.burst_seconds * n / self.users
+
+    async def shop(self, n, token=None):
+        # One customer: read availability, pick seats, order; retry on conflicts.
+        headers = {"X-User-Email": f"bench{n}@bench.local"}
+        if token:
+            headers["X-Admission-Token"] = token
+        for _ in range(self.args.attempts):
+            try:
+                response = await self.client.get(f"/customer/events/{self.event_id}/seats/available", params={"view": "ranges"}, headers=headers)
+            except Exception:
+                # Unhandled server error (e.g. DB pool timeout): a 500 for a real client.
+                self.errors += 1
+                continue
+            if response.status_code != 200:
+                self.errors += 1
+                continue
+            free = [seat_id for first, last in response.json()["ranges"] for seat_id in range(first, last + 1)]
+            if len(free) < self.args.seats_per_order:
+                self.sold_out += 1
+                return False
+            seats = random.sample(free, self.args.seats_per_order)
+            t0 = time.perf_counter()
+            try:
+                response = await self.client.post("/customer/orders", headers=headers,
+                                                  json={"event_id": self.event_id, "seat_ids": seats, "payment_mode": "Card"})
+                status_code = response.status_code
+            except Exception:
+                status_code = 500
+            now = time.perf_counter()
+            self.order_latencies.append(now - t0)
+            self.statuses[status_code] = self.statuses.get(status_code, 0) + 1
+            if status_code == 200:
+                self.buyers.append((n, now - self.arrival_time(n)))
+                self.last_order_at = now
+                return True
+        self.gave_up += 1
+        return False
+
+    async def direct(self):
+        async def customer(n):
+            await asyncio.sleep(max(self.arrival_time(n) - time.perf_counter(), 0))
+            await self.shop(n)
+
+        await asyncio.gather(*[customer(n) for n in range(self.users)])
+
+    async def waiting_room(self):
+        waiting_rooms.open(self.event_id, self.args.admit_rate, token_ttl_seconds=60)
+        joined = 0
+        head = 0
+        shoppers = set()
+        while head < self.users and not self.sold_out:
+            now = time.perf_counter()
+            while joined < self.users and self.arrival_time(joined) <= now:
+                waiting_rooms.join(self.event_id, joined + 1)  # user ids start at 1
+                joined += 1
+            # Customers poll; the ones at the head of the line find their token.
+            while head < joined:
+                position = waiting_rooms.status(self.event_id, head + 1)
+                if position["state"] != "admitted":
+                    break
+                shoppers.add(asyncio.create_task(self.shop(head, position["admission_token"])))
+                head += 1
+            shoppers = {task for task in shoppers if not task.done()}
+            await asyncio.sleep(TICK_SECONDS)
+        await asyncio.gather(*shoppers)
+        self.sold_out += self.users - head  # still in line when the event sold out
+        waiting_rooms.close(self.event_id)
+
+    async def run(self):
+        self.started = time.perf_counter()
+        await (self.direct() if self.mode == "direct" else self.waiting_room())
+        selling_seconds = self.last_order_at - self.started
+        buyers = len(self.buyers)
+        first_come = sum(1 for n, _ in self.buyers if n < buyers)
+        waits = [seconds for _, seconds in self.buyers]
+        return {
+            "users": self.users,
+            "orders": buyers,
+            "selling_seconds": round(selling_seconds, 2),
+            "orders_per_sec": round(buyers / selling_seconds, 1) if selling_seconds else 0.0,
+            "order_statuses": self.statuses,
+            "order_latency": latency_summary(self.order_latencies),
+            "arrival_to_order": {
+                "p50_s": round(percentile(waits, 50), 2),
+                "p99_s": round(percentile(waits, 99), 2),
+                "max_s": round(max(waits), 2) if waits else 0.0,
+            },
+            "first_come_share": round(first_come / buyers, 3) if buyers else 0.0,
+            "sold_out": self.sold_out,
+            "gave_up": self.gave_up,
+            "read_errors": self.errors,
+        }
+
+
+async def run(args):
+    report = {"seats": args.seats, "seats_per_order": args.seats_per_order,
+              "burst_seconds": args.burst_seconds, "admit_rate": args.admit_rate}
+    limits = httpx.Limits(max_connections=None)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None, limits=limits) as client:
+        for mode in args.modes:
+            # Each mode sells its own copy of the event.
+            event_id = seed(args.seats)
+            random.seed(args.seed)
+            users = args.direct_users if mode == "direct" else args.users
+            report[mode] = await Run(client, event_id, args, mode, users).run()
+    await async_engine.dispose()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--seats", type=int, default=2000)
+    parser.add_argument("--seats-per-order", type=int, default=2)
+    parser.add_argument("--burst-seconds", type=float, default=2.0, help="all customers arrive within this window")
+    parser.add_argument("--direct-users", type=int, default=5000, help="customers replayed in the direct run")
+    parser.add_argument("--admit-rate", type=float, default=50.0, help="waiting room admissions per second")
+    parser.add_argument("--attempts", type=int, default=3, help="orders a customer tries before giving up")
+    parser.add_argument("--modes", nargs="+", default=["direct", "waiting_room"], choices=["direct", "waiting_room"])
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    init_db()
+    db = SessionLocal()
+    seed_users(db, max(args.users, args.direct_users))
+    db.close()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()